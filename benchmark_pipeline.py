@@ -0,0 +1,244 @@
+# Pipeline benchmark
+# Measures the capture -> encode -> vision -> detect -> decide path of
+# IntelligentTrafficSystem end to end: synthetic NumPy frames stand in for the
+# cameras, a local stub server answers vision and Supabase requests with a
+# configurable latency and GPIO is mocked. Per-stage latency percentiles come
+# from the metrics recorded by the pipeline itself. With --baseline the run
+# exits non-zero when a stage regresses, so it can gate a rollout.
+
+import sys
+import json
+import time
+import logging
+import argparse
+import itertools
+import numpy as np
+from logic.direction import Direction
+from logic.metrics import STAGE_SECONDS
+from tests.stubs import StubVisionServer, install_mock_gpio
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = list(Direction)
+PERCENTILES = (50, 95, 99)
+MIN_REGRESSION = 0.001  # Seconds; smaller p95 increases are treated as noise
+
+
+class SyntheticCamera:
+    """
+    cv2.VideoCapture stand-in: bright boxes (vehicles) move down a noisy road
+    at a fixed frame rate, so frames change between reads and every stage
+    downstream does its real work. The capture loop calls wait_frame() before
+    its timed read, so the capture stage measures rendering, not frame pacing.
+    """
+    def __init__(self, width=1280, height=720, fps=15.0, vehicles=8, seed=0):
+        rng = np.random.default_rng(seed)
+        self.height = height
+        self.frame_interval = 1.0 / fps
+        self.background = rng.integers(40, 80, (height, width, 3), dtype=np.uint8)
+        sizes = rng.integers(height // 16, height // 6, size=(vehicles, 2))
+        self.vehicles = [(int(rng.integers(0, width - w)), float(rng.uniform(0, height)),
+                          float(rng.uniform(0.2, 0.6) * height), int(w), int(h),
+                          tuple(int(c) for c in rng.integers(120, 255, 3)))
+                         for w, h in sizes]  # (x, y0, pixels/second, width, height, BGR)
+        self.started = None
+        self.next_frame = None
+        self.waited = False  # wait_frame() already ran for the next read
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def wait_frame(self):
+        """Sleep until the next frame is due"""
+        now = time.perf_counter()
+        if self.started is None:
+            self.started = self.next_frame = now
+        elif now < self.next_frame:
+            time.sleep(self.next_frame - now)
+        self.waited = True
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        if not self.waited:
+            self.wait_frame()
+        self.waited = False
+        self.next_frame += self.frame_interval
+        elapsed = self.next_frame - self.started
+        frame = self.background.copy()
+        for x, y0, speed, w, h, color in self.vehicles:
+            y = int(y0 + speed * elapsed) % self.height
+            frame[y:y + h, x:x + w] = color
+        return True, frame
+
+    def release(self):
+        self.opened = False
+
+
+def summarize_samples(samples):
+    values = np.asarray(samples, dtype=np.float64)
+    summary = {"count": int(len(values)), "mean": float(values.mean())}
+    for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f"p{p}"] = float(value)
+    return summary
+
+
+def run_scenario(directions, junctions, server, duration=10.0, fps=15.0, width=1280, height=720,
+                 workers=None, batch_vision=False, local_counting=False, seed=0, gpio=None,
+                 min_analysis_interval=0.0):
+    """Run junctions x directions synthetic cameras for duration seconds and return the measurements"""
+    from app import IntelligentTrafficSystem, PIPELINE_LATENCY, VISION_FRAMES
+    from vision.client import VisionModelClient
+    from vision.encoder import FrameEncoder
+    from multi_junction import JunctionController
+
+    cameras_per_junction = DIRECTIONS[:directions]
+    workers = workers or directions * junctions
+    systems = {}
+    for j in range(junctions):
+        junction_id = f"bench-{j}"
+        cameras = {direction: SyntheticCamera(width, height, fps, seed=seed + j * len(DIRECTIONS) + i)
+                   for i, direction in enumerate(cameras_per_junction)}
+        client = VisionModelClient(api_url=f"{server.url}/v1/chat/completions", api_key="benchmark",
+                                   encoder=FrameEncoder(max_width=960, jpeg_quality=80),
+                                   max_concurrency=workers, structured=True)
+        systems[junction_id] = IntelligentTrafficSystem(
+            cameras, "benchmark", junction_id=junction_id, shared_workers=True, vision_client=client,
+            batch_vision=batch_vision, local_counting=local_counting,
+            min_analysis_interval=min_analysis_interval)
+    controller = JunctionController(systems, num_workers=workers, max_inflight=max(2, directions))
+
+    STAGE_SECONDS.record_samples()
+    PIPELINE_LATENCY.record_samples()
+    analysed_before = sum(VISION_FRAMES.labels(junction_id, "analyzed").value for junction_id in systems)
+    writes_before = gpio.writes if gpio is not None else 0
+    requests_before = server.requests
+    started = time.perf_counter()
+    controller.start()
+    try:
+        time.sleep(duration)
+    finally:
+        controller.stop()
+    elapsed = time.perf_counter() - started
+
+    stages = {key[0]: summarize_samples(samples) for key, samples in STAGE_SECONDS.samples().items()}
+    latencies = list(itertools.chain.from_iterable(PIPELINE_LATENCY.samples().values()))
+    analysed = sum(VISION_FRAMES.labels(junction_id, "analyzed").value for junction_id in systems)
+    STAGE_SECONDS.record_samples(False)
+    PIPELINE_LATENCY.record_samples(False)
+    return {
+        "directions": directions,
+        "junctions": junctions,
+        "workers": workers,
+        "duration": elapsed,
+        "frames_analyzed_per_s": (analysed - analysed_before) / elapsed,
+        "vision_requests_per_s": (server.requests - requests_before) / elapsed,
+        "decisions_per_s": stages.get("decide", {}).get("count", 0) / elapsed,
+        "gpio_writes": (gpio.writes if gpio is not None else 0) - writes_before,
+        "pipeline": summarize_samples(latencies) if latencies else None,
+        "stages": stages,
+    }
+
+
+def format_result(result):
+    lines = [f"{result['directions']} directions x {result['junctions']} junctions, {result['workers']} workers: "
+             f"{result['frames_analyzed_per_s']:.1f} frames/s analysed, "
+             f"{result['vision_requests_per_s']:.1f} vision requests/s, "
+             f"{result['decisions_per_s']:.1f} decisions/s, {result['gpio_writes']} GPIO writes"]
+    rows = [("pipeline", result["pipeline"])] if result["pipeline"] else []
+    rows += sorted(result["stages"].items())
+    lines.append(f"  {'stage':<18}{'count':>8}" + "".join(f"{f'p{p} ms':>11}" for p in PERCENTILES))
+    for name, summary in rows:
+        lines.append(f"  {name:<18}{summary['count']:>8}" +
+                     "".join(f"{summary[f'p{p}'] * 1000:>11.2f}" for p in PERCENTILES))
+    return "\n".join(lines)
+
+
+def compare(baseline, results, tolerance=0.25):
+    """Regressions of results against a baseline run: p95 latencies up or throughput down by more than tolerance"""
+    previous = {(r["directions"], r["junctions"]): r for r in baseline["scenarios"]}
+    regressions = []
+    for result in results["scenarios"]:
+        name = f"{result['directions']}x{result['junctions']}"
+        base = previous.get((result["directions"], result["junctions"]))
+        if base is None:
+            continue
+        if result["frames_analyzed_per_s"] < base["frames_analyzed_per_s"] * (1 - tolerance):
+            regressions.append(f"{name} throughput {result['frames_analyzed_per_s']:.1f} frames/s "
+                               f"(baseline {base['frames_analyzed_per_s']:.1f})")
+        pairs = [("pipeline", result["pipeline"], base["pipeline"])]
+        pairs += [(stage, summary, base["stages"].get(stage)) for stage, summary in result["stages"].items()]
+        for stage, summary, base_summary in pairs:
+            if not summary or not base_summary:
+                continue
+            limit = max(base_summary["p95"] * (1 + tolerance), base_summary["p95"] + MIN_REGRESSION)
+            if summary["p95"] > limit:
+                regressions.append(f"{name} {stage} p95 {summary['p95'] * 1000:.2f} ms "
+                                   f"(baseline {base_summary['p95'] * 1000:.2f} ms)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the capture -> vision -> decision pipeline")
+    parser.add_argument("--directions", type=int, nargs="+", default=[1, 4], help="Cameras per junction")
+    parser.add_argument("--junctions", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--latency", type=float, default=0.3, help="Mean stub vision latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of vision requests failing with 503")
+    parser.add_argument("--workers", type=int, help="Shared analysis workers (default one per camera)")
+    parser.add_argument("--batch", action="store_true", help="One batched vision request per junction")
+    parser.add_argument("--local-counting", action="store_true", help="Count vehicles on-device at frame rate")
+    parser.add_argument("--min-interval", type=float, default=0.0,
+                        help="Seconds between analyses of one direction (0 measures full pipeline capacity)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    gpio = install_mock_gpio()
+    import app
+
+    server = StubVisionServer(args.latency, args.jitter, args.error_rate, seed=args.seed)
+    server.start()
+    # Alerts raised during the run are posted to the stub instead of Supabase
+    app.event_sink.base_url = server.url
+    app.event_sink.start()
+    scenarios = []
+    try:
+        for junctions, directions in itertools.product(args.junctions, args.directions):
+            result = run_scenario(directions, junctions, server, args.duration, args.fps, args.width,
+                                  args.height, args.workers, args.batch, args.local_counting, args.seed, gpio,
+                                  args.min_interval)
+            scenarios.append(result)
+            print(format_result(result))
+    finally:
+        server.stop()
+        app.event_sink.stop()
+
+    results = {"config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+               "scenarios": scenarios}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(json.load(baseline), results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,39 +1,39 @@
 import logging
+from vision.analysis import VisionAnalysis
+from detection.history import DirectionHistory
+from logic.direction import Direction
+from logic.metrics import timed
 logger = logging.getLogger(__name__)
 
 class AccidentDetector:
     """Detects potential accidents using vision model"""
-    def __init__(self, confidence_threshold=0.6):
+    def __init__(self, confidence_threshold=0.6, history_length=5, confirmations=3):
         self.confidence_threshold = confidence_threshold
-        self.accident_history = []
-        self.history_length = 5  # Number of frames to keep in history
+        self.history_length = history_length  # Number of frames to keep in history
+        self.confirmations = confirmations  # Detections within the window needed to confirm
+        # One row per direction; the None row serves callers that don't pass a direction
+        self.accident_history = DirectionHistory(self.history_length, keys=[*Direction, None])
         
-    def detect_accident(self, frame, vision_response):
+    @timed("detect_accident")
+    def detect_accident(self, frame, vision_response, direction=None):
         """
         Analyzes vision model response to detect potential accidents
-        Returns True if accident indicators are detected
+        Returns True if accident indicators are detected consistently for the direction
         """
         if not vision_response:
             return False
             
-        # Check if the model mentions accident indicators
-        accident_terms = ['collision', 'crash', 'accident', 'vehicles colliding', 
-                         'damaged vehicle', 'overturned vehicle', 'debris on road']
-        
-        is_accident = False
-        for term in accident_terms:
-            if term in vision_response.lower():
-                is_accident = True
-                logger.warning(f"Potential accident detected: {term}")
-                break
+        # Check if the model reports accident indicators
+        analysis = VisionAnalysis.parse(vision_response)
+        is_accident = analysis.accident
+        if is_accident:
+            logger.warning(f"Potential accident detected: {', '.join(analysis.accident_indicators)}")
                 
         # Add to history and check for consistent detection
-        self.accident_history.append(is_accident)
-        if len(self.accident_history) > self.history_length:
-            self.accident_history.pop(0)
+        self.accident_history.append(direction, is_accident)
             
         # Only report accident if detected multiple times (reduces false positives)
-        if sum(self.accident_history) >= 3:  # At least 3 detections in history
+        if self.accident_history.sum(direction) >= self.confirmations:
             logger.critical("ACCIDENT CONFIRMED - Alert triggered")
             return True
             
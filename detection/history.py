@@ -0,0 +1,71 @@
+import numpy as np
+from logic.direction import Direction
+
+
+class DirectionHistory:
+    """
+    Fixed-window ring buffers, one row per key (by default one per Direction).
+    Appends are O(1): the rolling sum and an exponential moving average are
+    updated incrementally instead of re-summing a list.
+    """
+    def __init__(self, window, keys=None, ema_alpha=0.5):
+        self.window = window
+        self.keys = list(keys) if keys is not None else list(Direction)
+        self.index = {key: row for row, key in enumerate(self.keys)}
+        self.ema_alpha = ema_alpha
+        rows = len(self.keys)
+        self.values = np.zeros((rows, window))
+        self.heads = np.zeros(rows, dtype=np.int64)  # Next write position per row
+        self.counts = np.zeros(rows, dtype=np.int64)  # Filled slots per row
+        self.sums = np.zeros(rows)
+        self.emas = np.zeros(rows)
+
+    def append(self, key, value):
+        """Add a sample for a key and return the new rolling mean"""
+        row = self.index[key]
+        head = self.heads[row]
+        if self.counts[row] == self.window:
+            self.sums[row] -= self.values[row, head]
+        else:
+            self.counts[row] += 1
+        self.values[row, head] = value
+        self.sums[row] += value
+        self.heads[row] = (head + 1) % self.window
+        if self.counts[row] == 1:
+            self.emas[row] = value
+        else:
+            self.emas[row] += self.ema_alpha * (value - self.emas[row])
+        return float(self.sums[row] / self.counts[row])
+
+    def sum(self, key):
+        return float(self.sums[self.index[key]])
+
+    def mean(self, key):
+        row = self.index[key]
+        return float(self.sums[row] / self.counts[row]) if self.counts[row] else 0.0
+
+    def ema(self, key):
+        return float(self.emas[self.index[key]])
+
+    def count(self, key):
+        return int(self.counts[self.index[key]])
+
+    def recent(self, key):
+        """Samples for a key, oldest first"""
+        row = self.index[key]
+        n = self.counts[row]
+        order = (self.heads[row] - n + np.arange(n)) % self.window
+        return self.values[row, order]
+
+    def means(self):
+        """Rolling means for every key as an array in key order"""
+        return np.divide(self.sums, self.counts, out=np.zeros_like(self.sums), where=self.counts > 0)
+
+    def reset(self, key=None):
+        """Clear one key's buffer, or every buffer"""
+        rows = slice(None) if key is None else self.index[key]
+        self.values[rows] = 0
+        self.heads[rows] = 0
+        self.counts[rows] = 0
+        self.sums[rows] = 0
+        self.emas[rows] = 0
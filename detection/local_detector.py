@@ -0,0 +1,144 @@
+import os
+import logging
+import cv2
+import numpy as np
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+logger = logging.getLogger(__name__)
+
+# COCO class ids counted as vehicles: car, motorcycle, bus, truck
+COCO_VEHICLE_CLASSES = {2, 3, 5, 7}
+
+
+class BackgroundSubtractionDetector:
+    """
+    Fallback detector: MOG2 background subtraction and contour bounding boxes.
+    Needs no model file and runs comfortably at frame rate on a Raspberry Pi.
+    One instance per camera, since it learns that camera's background.
+    Pixels covered by a detection are kept out of the background model for up
+    to hold_frames frames, so vehicles queued at a red light are still counted
+    instead of fading into the background after a few hundred frames.
+    """
+    def __init__(self, min_area=400, process_width=320, history=500, var_threshold=16,
+                 learning_rate=0.001, hold_frames=9000):
+        self.min_area = min_area  # Minimum blob area in full-resolution pixels
+        self.process_width = process_width  # Frames are downscaled to this width first
+        self.learning_rate = learning_rate  # Background adaptation per frame (MOG2 default is 1/history)
+        self.hold_frames = hold_frames  # Frames a pixel may stay foreground before it is learned anyway
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(
+            history=history, varThreshold=var_threshold, detectShadows=True)
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        self.held = None  # Consecutive foreground frames per pixel
+
+    def detect(self, frame):
+        """Return a list of (x, y, w, h, score) boxes in frame coordinates"""
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.process_width / width)
+        small = cv2.resize(frame, (int(width * scale), int(height * scale)),
+                           interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+
+        if self.held is None or self.held.shape != small.shape[:2]:
+            # First frame initialises the model; there is no background to compare it with yet
+            self.subtractor.apply(small)
+            self.held = np.zeros(small.shape[:2], dtype=np.uint16)
+            return []
+        mask = self.subtractor.apply(small, learningRate=0)
+        # Shadows are marked 127 by MOG2; keep only confident foreground
+        _, mask = cv2.threshold(mask, 200, 255, cv2.THRESH_BINARY)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+        mask = cv2.dilate(mask, self.kernel, iterations=2)
+        self._learn(small, mask > 0)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        boxes = []
+        min_area = self.min_area * scale * scale
+        for contour in contours:
+            if cv2.contourArea(contour) < min_area:
+                continue
+            x, y, w, h = cv2.boundingRect(contour)
+            boxes.append((int(x / scale), int(y / scale), int(w / scale), int(h / scale), 1.0))
+        return boxes
+
+    def _learn(self, small, foreground):
+        """Update the background model everywhere except recently detected vehicles"""
+        self.held = np.where(foreground, np.minimum(self.held + 1, self.hold_frames), 0).astype(np.uint16)
+        frozen = foreground & (self.held < self.hold_frames)
+        if frozen.any():
+            # Show the model its own background where vehicles are, so it learns nothing there
+            small = small.copy()
+            small[frozen] = self.subtractor.getBackgroundImage()[frozen]
+        self.subtractor.apply(small, learningRate=self.learning_rate)
+
+
+class DnnDetector:
+    """
+    Small single-shot detector (YOLOv5/YOLOv8-style ONNX export) run on the CPU
+    through OpenCV DNN, or ONNX Runtime when it is installed and requested
+    """
+    def __init__(self, model_path, input_size=640, conf_threshold=0.4, nms_threshold=0.45,
+                 vehicle_classes=COCO_VEHICLE_CLASSES, backend="opencv"):
+        self.input_size = input_size
+        self.conf_threshold = conf_threshold
+        self.nms_threshold = nms_threshold
+        self.vehicle_classes = set(vehicle_classes)
+        self.session = None
+        self.net = None
+        if backend == "onnxruntime" and onnxruntime is not None:
+            self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+            self.input_name = self.session.get_inputs()[0].name
+        else:
+            if backend == "onnxruntime":
+                logger.warning("onnxruntime not installed, falling back to OpenCV DNN")
+            self.net = cv2.dnn.readNet(model_path)
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def detect(self, frame):
+        """Return a list of (x, y, w, h, score) vehicle boxes in frame coordinates"""
+        height, width = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 1 / 255.0, (self.input_size, self.input_size),
+                                     swapRB=True, crop=False)
+        if self.session is not None:
+            output = self.session.run(None, {self.input_name: blob})[0]
+        else:
+            self.net.setInput(blob)
+            output = self.net.forward()
+
+        predictions = output[0]
+        # YOLOv8 exports are (4 + classes, N); YOLOv5 exports are (N, 5 + classes)
+        if predictions.shape[0] < predictions.shape[1]:
+            predictions = predictions.T
+            class_scores = predictions[:, 4:]
+        else:
+            class_scores = predictions[:, 5:] * predictions[:, 4:5]
+
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        keep = (scores >= self.conf_threshold) & np.isin(class_ids, list(self.vehicle_classes))
+        if not keep.any():
+            return []
+
+        cx, cy, w, h = predictions[keep, :4].T
+        sx, sy = width / self.input_size, height / self.input_size
+        rects = np.stack([(cx - w / 2) * sx, (cy - h / 2) * sy, w * sx, h * sy], axis=1)
+        kept_scores = scores[keep]
+        indices = cv2.dnn.NMSBoxes(rects.tolist(), kept_scores.tolist(),
+                                   self.conf_threshold, self.nms_threshold)
+        return [(int(rects[i, 0]), int(rects[i, 1]), int(rects[i, 2]), int(rects[i, 3]),
+                 float(kept_scores[i])) for i in np.array(indices).ravel()]
+
+
+def create_detector(model_path=None, **kwargs):
+    """Return a DNN detector if a model file is available, else background subtraction"""
+    if model_path and os.path.exists(model_path):
+        try:
+            return DnnDetector(model_path, **kwargs)
+        except cv2.error as e:
+            logger.error(f"Failed to load detector model {model_path}: {e}")
+    elif model_path:
+        logger.warning(f"Detector model {model_path} not found, using background subtraction")
+    return BackgroundSubtractionDetector()
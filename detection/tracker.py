@@ -0,0 +1,166 @@
+import logging
+import threading
+from collections import deque
+import numpy as np
+from logic.direction import Direction
+from logic.clock import MonotonicClock
+from logic.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU of two (N, 4) and (M, 4) arrays of (x, y, w, h) boxes"""
+    ax1, ay1 = boxes_a[:, 0:1], boxes_a[:, 1:2]
+    ax2, ay2 = ax1 + boxes_a[:, 2:3], ay1 + boxes_a[:, 3:4]
+    bx1, by1 = boxes_b[:, 0], boxes_b[:, 1]
+    bx2, by2 = bx1 + boxes_b[:, 2], by1 + boxes_b[:, 3]
+    inter_w = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    inter_h = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = inter_w * inter_h
+    union = boxes_a[:, 2:3] * boxes_a[:, 3:4] + boxes_b[:, 2] * boxes_b[:, 3] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class Track:
+    """A vehicle followed across frames"""
+    def __init__(self, track_id, box, timestamp):
+        self.id = track_id
+        self.box = np.asarray(box[:4], dtype=np.float64)
+        self.centroid = self.box[:2] + self.box[2:] / 2
+        self.velocity = np.zeros(2)  # Pixels per second, exponentially smoothed
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.hits = 1
+        self.misses = 0
+        self.counted = False
+
+    @property
+    def speed(self):
+        return float(np.hypot(*self.velocity))
+
+
+class VehicleTracker:
+    """
+    IoU/centroid tracker for one camera. Associates per-frame detections with
+    existing tracks and derives throughput across a virtual line, queue length
+    (confirmed tracks that are stationary) and mean speed. Timestamps are the
+    frames' capture times; the clock's wall time stands in when none is given.
+    """
+    def __init__(self, iou_threshold=0.3, max_distance=0.5, max_misses=5, min_hits=2,
+                 line_position=0.6, stationary_speed=15.0, flow_window=60.0, velocity_smoothing=0.5,
+                 clock=None):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance  # Centroid gate as a fraction of the box diagonal
+        self.max_misses = max_misses  # Frames a track survives without a detection
+        self.min_hits = min_hits  # Detections before a track is confirmed
+        self.line_position = line_position  # Virtual counting line as a fraction of frame height
+        self.stationary_speed = stationary_speed  # Pixels/second below which a vehicle is queued
+        self.flow_window = flow_window  # Seconds of line crossings used for throughput
+        self.velocity_smoothing = velocity_smoothing
+        self.clock = clock or MonotonicClock()
+        self.tracks = []
+        self.crossings = deque()
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def update(self, boxes, timestamp=None, frame_height=None):
+        """Associate a frame's (x, y, w, h[, score]) detections with tracks"""
+        timestamp = self.clock.wall_time() if timestamp is None else timestamp
+        detections = np.asarray([b[:4] for b in boxes], dtype=np.float64).reshape(-1, 4)
+        with self.lock:
+            matched_tracks, matched_dets = self._associate(detections)
+
+            line_y = frame_height * self.line_position if frame_height else None
+            for t, d in zip(matched_tracks, matched_dets):
+                self._advance(self.tracks[t], detections[d], timestamp, line_y)
+
+            unmatched = set(range(len(self.tracks))) - set(matched_tracks)
+            for t in unmatched:
+                self.tracks[t].misses += 1
+            self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+            for d in set(range(len(detections))) - set(matched_dets):
+                self.tracks.append(Track(self.next_id, detections[d], timestamp))
+                self.next_id += 1
+
+            while self.crossings and timestamp - self.crossings[0] > self.flow_window:
+                self.crossings.popleft()
+
+    def _associate(self, detections):
+        """Greedy assignment on IoU, falling back to a centroid-distance gate"""
+        if not self.tracks or not len(detections):
+            return [], []
+        track_boxes = np.array([track.box for track in self.tracks])
+        score = iou_matrix(track_boxes, detections)
+
+        track_centres = track_boxes[:, :2] + track_boxes[:, 2:] / 2
+        det_centres = detections[:, :2] + detections[:, 2:] / 2
+        distance = np.linalg.norm(track_centres[:, None, :] - det_centres[None, :, :], axis=2)
+        gate = self.max_distance * np.hypot(track_boxes[:, 2], track_boxes[:, 3])[:, None]
+        # Weak candidates (no overlap but close centroids) rank below every IoU match
+        near = (score < self.iou_threshold) & (distance < gate)
+        score = np.where(score >= self.iou_threshold, score,
+                         np.where(near, self.iou_threshold * (1 - distance / np.maximum(gate, 1e-9)), 0.0))
+
+        matched_tracks, matched_dets = [], []
+        used_tracks, used_dets = set(), set()
+        for flat in np.argsort(score, axis=None)[::-1]:
+            t, d = np.unravel_index(flat, score.shape)
+            if score[t, d] <= 0:
+                break
+            if t in used_tracks or d in used_dets:
+                continue
+            used_tracks.add(t)
+            used_dets.add(d)
+            matched_tracks.append(int(t))
+            matched_dets.append(int(d))
+        return matched_tracks, matched_dets
+
+    def _advance(self, track, box, timestamp, line_y):
+        centroid = box[:2] + box[2:] / 2
+        dt = timestamp - track.last_seen
+        if dt > 0:
+            velocity = (centroid - track.centroid) / dt
+            track.velocity = (self.velocity_smoothing * velocity
+                              + (1 - self.velocity_smoothing) * track.velocity)
+        if line_y is not None and not track.counted:
+            if (track.centroid[1] - line_y) * (centroid[1] - line_y) < 0 or centroid[1] == line_y:
+                track.counted = True
+                self.crossings.append(timestamp)
+        track.box = box
+        track.centroid = centroid
+        track.last_seen = timestamp
+        track.hits += 1
+        track.misses = 0
+
+    def metrics(self, now=None):
+        """Return throughput (vehicles/min), queue length, mean speed (px/s) and active track count"""
+        now = self.clock.wall_time() if now is None else now
+        with self.lock:
+            confirmed = [t for t in self.tracks if t.hits >= self.min_hits and t.misses == 0]
+            crossings = sum(1 for ts in self.crossings if now - ts <= self.flow_window)
+            speeds = np.array([t.speed for t in confirmed]) if confirmed else np.zeros(0)
+        return {
+            "throughput": crossings * 60.0 / self.flow_window,
+            "queue_length": int(np.count_nonzero(speeds < self.stationary_speed)),
+            "mean_speed": float(speeds.mean()) if len(speeds) else 0.0,
+            "active": len(confirmed),
+        }
+
+
+class FlowTracker:
+    """One VehicleTracker per Direction, sharing one clock"""
+    def __init__(self, clock=None, **tracker_options):
+        self.trackers = {direction: VehicleTracker(clock=clock, **tracker_options) for direction in Direction}
+
+    @timed("track")
+    def update(self, direction, boxes, timestamp=None, frame_height=None):
+        self.trackers[direction].update(boxes, timestamp, frame_height)
+
+    def metrics(self, direction, now=None):
+        return self.trackers[direction].metrics(now)
+
+    def metrics_all(self, now=None):
+        """Direction -> metrics dict for every approach"""
+        return {direction: tracker.metrics(now) for direction, tracker in self.trackers.items()}
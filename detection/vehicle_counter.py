@@ -1,57 +1,54 @@
 from logic.direction import Direction
+from vision.analysis import VisionAnalysis
+from detection.history import DirectionHistory
+from logic.metrics import timed
 
 class VehicleCounter:
     """Counts vehicles in each direction using vision model"""
-    def __init__(self):
+    def __init__(self, model_path=None, history_length=3):
         self.vehicle_counts = {direction: 0 for direction in Direction}
-        self.count_history = {direction: [] for direction in Direction}
-        self.history_length = 3  # Number of frames to keep for smoothing
+        self.history_length = history_length  # Number of frames to keep for smoothing
+        self.count_history = DirectionHistory(self.history_length)
+        self.model_path = model_path  # Optional ONNX detector for on-device counting
+        self.detectors = {}  # Direction (or None) -> local detector, created on first use
+        self.last_detections = {}  # Direction (or None) -> latest bounding boxes
         
     def extract_count(self, vision_response):
         """Extract vehicle count from vision model response"""
         if not vision_response:
             return 0
-            
-        # Look for patterns like "5 cars", "10 vehicles", etc.
-        import re
-        count_patterns = [
-            r"(\d+)\s+(?:cars|vehicles|automobiles)",
-            r"(?:count|total of|counted)\s+(\d+)",
-            r"(\d+)\s+(?:cars|vehicles|automobiles)\s+(?:detected|identified|found|present)"
-        ]
-        
-        for pattern in count_patterns:
-            match = re.search(pattern, vision_response.lower())
-            if match:
-                try:
-                    return int(match.group(1))
-                except ValueError:
-                    pass
-                    
-        # If no specific count is found, estimate from the text
-        if "no cars" in vision_response.lower() or "empty" in vision_response.lower():
-            return 0
-        elif "few cars" in vision_response.lower() or "light traffic" in vision_response.lower():
-            return 2
-        elif "moderate" in vision_response.lower():
-            return 5
-        elif "heavy traffic" in vision_response.lower() or "congested" in vision_response.lower():
-            return 10
-            
-        # Default fallback
-        return 0
+        return VisionAnalysis.parse(vision_response).vehicle_count
         
+    @timed("local_detect")
+    def detect_vehicles(self, frame, direction=None):
+        """
+        Detect vehicles on-device, without a vision API round-trip
+        Returns a list of (x, y, w, h, score) bounding boxes
+        """
+        detector = self.detectors.get(direction)
+        if detector is None:
+            from detection.local_detector import create_detector
+            # Each camera gets its own detector (background models are per scene)
+            detector = self.detectors[direction] = create_detector(self.model_path)
+        boxes = detector.detect(frame)
+        self.last_detections[direction] = boxes
+        return boxes
+
+    def count_vehicles(self, frame, direction=None):
+        """Count vehicles in a frame with the local detector; updates the smoothed count if direction is given"""
+        count = len(self.detect_vehicles(frame, direction))
+        if direction is None:
+            return count
+        return self._record(direction, count)
+
     def update_count(self, direction, vision_response):
         """Update the vehicle count for a given direction"""
-        count = self.extract_count(vision_response)
-        
-        # Add to history
-        self.count_history[direction].append(count)
-        if len(self.count_history[direction]) > self.history_length:
-            self.count_history[direction].pop(0)
-            
-        # Use average for smoother counts
-        self.vehicle_counts[direction] = int(sum(self.count_history[direction]) / len(self.count_history[direction]))
+        return self._record(direction, self.extract_count(vision_response))
+
+    def _record(self, direction, count):
+        """Add a raw count to the direction's history and return the smoothed count"""
+        # Add to history and use the rolling average for smoother counts
+        self.vehicle_counts[direction] = int(self.count_history.append(direction, count))
         return self.vehicle_counts[direction]
         
     def get_count(self, direction):
@@ -60,4 +57,4 @@ class VehicleCounter:
 
     def reset(self):
         self.vehicle_counts = {direction: 0 for direction in Direction}
-        self.count_history = {direction: [] for direction in Direction}
+        self.count_history.reset()
@@ -1,14 +1,9 @@
-try:
-    import serial
-except ImportError:
-    import types
-    serial = types.SimpleNamespace()
-    serial.Serial = lambda *args, **kwargs: None
-import time
 import logging
 from datetime import datetime
 from logic.direction import Direction
-import requests
+from logic.event_sink import EventSink
+from logic.sms_dispatcher import SmsDispatcher
+from logic.clock import MonotonicClock
 import os
 try:
     from dotenv import load_dotenv
@@ -19,33 +14,51 @@ except ImportError:
 logger = logging.getLogger(__name__)
 load_dotenv()
 
+SMS_ALERT_INTERVAL = 300.0  # Seconds before an SMS for the same event type and direction is repeated
+
 
 class AlertSystem:
     """Handles traffic alerts for accident, emergency, congestion etc."""
 
-    def __init__(self, gsm_port=None):
+    def __init__(self, gsm_port=None, event_sink=None, clock=None, sms_interval=SMS_ALERT_INTERVAL):
         self.gsm_port = gsm_port
-        self.gsm_connected = False
+        self.clock = clock or MonotonicClock()
         self.emergency_contacts = ["+2348107471505"]
+        # A persisting incident is texted once per interval, not on every detection
+        self.sms_interval = sms_interval
+        self.last_sms = {}  # (event_type, direction) -> clock time of its last SMS
 
         self.supabase_url = os.getenv("SUPABASE_URL")
         self.supabase_api_key = os.getenv("SUPABASE_API_KEY")
         self.supabase_table = os.getenv("SUPABASE_TABLE_NAME", "traffic_alerts")
 
+        # Supabase rows are delivered in the background so alerts never wait on the network
+        if event_sink is None:
+            event_sink = EventSink(self.supabase_url, self.supabase_api_key,
+                                   spool_path=os.getenv("EVENT_SPOOL_PATH"))
+            event_sink.start()
+        self.event_sink = event_sink
+
+        # The dispatcher owns the serial port and sends from its own thread,
+        # reconnecting to the modem as needed
+        self.sms = None
         if gsm_port:
-            try:
-                self.gsm = serial.Serial(gsm_port, 9600, timeout=1)
-                self.gsm_connected = True
-                logger.info("Connected to GSM module")
-            except Exception as e:
-                logger.error(f"Failed to connect to GSM module: {e}")
+            self.sms = SmsDispatcher(gsm_port, clock=self.clock)
+            if self.sms.open():
+                logger.info(f"SMS dispatcher started on {gsm_port}")
+            self.sms.start()
+
+    @property
+    def gsm_connected(self):
+        """True while the dispatcher has the modem's serial port open"""
+        return self.sms is not None and self.sms.connected
 
     def send_traffic_alert(self, event_type, direction, confidence=None):
         """
         Unified method to handle alerts.
         Logs all alerts to Supabase and sends SMS only for 'accident' or 'emergency'.
         """
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        timestamp = datetime.fromtimestamp(self.clock.wall_time()).strftime('%Y-%m-%d %H:%M:%S')
         message = f"ALERT: {event_type.upper()} detected at {direction.name} direction. Time: {timestamp}"
         if confidence is not None:
             message += f" (Confidence: {confidence:.2f})"
@@ -54,48 +67,38 @@ class AlertSystem:
         self._log_to_supabase(event_type, direction.name, timestamp, confidence)
 
         # 2. Send SMS only for accident or emergency
-        if event_type in ["accident", "emergency"] and self.gsm_connected:
-            try:
-                for contact in self.emergency_contacts:
-                    self._send_sms(contact, message)
-                logger.info(f"{event_type.capitalize()} SMS alert sent to {len(self.emergency_contacts)} contacts")
-            except Exception as e:
-                logger.error(f"Failed to send {event_type} SMS: {e}")
+        if event_type in ["accident", "emergency"] and not self._sms_due(event_type, direction):
+            logger.info(f"{event_type.capitalize()} SMS for {direction.name} already sent recently")
+        elif event_type in ["accident", "emergency"] and self.gsm_connected:
+            self.last_sms[(event_type, direction)] = self.clock.now()
+            for contact in self.emergency_contacts:
+                self._send_sms(contact, message)
+            logger.info(f"{event_type.capitalize()} SMS alert queued for {len(self.emergency_contacts)} contacts")
         elif event_type in ["accident", "emergency"]:
             logger.warning(f"GSM not connected. Would have sent: {message}")
         else:
             logger.info(f"{event_type.capitalize()} alert logged to Supabase only.")
 
+    def _sms_due(self, event_type, direction):
+        """True if no SMS for this event type and direction went out within sms_interval"""
+        last = self.last_sms.get((event_type, direction))
+        return last is None or self.clock.now() - last >= self.sms_interval
+
     def _send_sms(self, number, message):
-        """Send SMS using GSM module."""
-        self.gsm.write(b'AT+CMGF=1\r')
-        time.sleep(0.5)
-        self.gsm.write(f'AT+CMGS="{number}"\r'.encode())
-        time.sleep(0.5)
-        self.gsm.write(message.encode() + b'\x1A')  # Ctrl+Z to send
-        time.sleep(2)
+        """Queue an SMS on the GSM dispatcher; returns the SmsJob tracking delivery."""
+        return self.sms.send(number, message)
+
+    def stop(self):
+        """Stop the SMS dispatcher."""
+        if self.sms is not None:
+            self.sms.stop()
 
     def _log_to_supabase(self, event_type, direction, timestamp, confidence):
-        """Send alert data to Supabase table."""
-        url = f"{self.supabase_url}/rest/v1/{self.supabase_table}"
-        headers = {
-            "apikey": self.supabase_api_key,
-            "Authorization": f"Bearer {self.supabase_api_key}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation"
-        }
+        """Queue alert data for the Supabase table."""
         data = {
             "event_type": event_type,
             "direction": direction,
             "timestamp": timestamp,
             "confidence": confidence
         }
-
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            if response.status_code in [200, 201]:
-                logger.info("Alert logged to Supabase successfully.")
-            else:
-                logger.error(f"Failed to log alert to Supabase: {response.status_code} {response.text}")
-        except Exception as e:
-            logger.error(f"Exception logging to Supabase: {e}")
+        self.event_sink.submit(self.supabase_table, data)
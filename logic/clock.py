@@ -0,0 +1,92 @@
+import time
+import heapq
+import itertools
+import threading
+
+
+class MonotonicClock:
+    """
+    Real time: now() is time.monotonic(), sleep() blocks and call_later()
+    runs the callback on a daemon threading.Timer
+    """
+    def now(self):
+        return time.monotonic()
+
+    def wall_time(self):
+        """Seconds since the epoch, for timestamps"""
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def call_later(self, delay, callback):
+        """Run callback after delay seconds; returns a handle with cancel()"""
+        timer = threading.Timer(max(0.0, delay), callback)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+
+class VirtualTimer:
+    """Pending VirtualClock callback"""
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class VirtualClock:
+    """
+    Simulated time that only moves when advanced. sleep() advances the clock
+    instead of blocking, and call_later() callbacks run in deadline order as
+    the clock passes them, so control logic can be stepped at full CPU speed.
+    """
+    def __init__(self, start=0.0, epoch=None):
+        self._now = start
+        self.epoch = time.time() - start if epoch is None else epoch  # Wall time at virtual zero
+        self._timers = []  # Heap of (deadline, sequence, VirtualTimer)
+        self._sequence = itertools.count()
+        self.lock = threading.RLock()
+
+    def now(self):
+        return self._now
+
+    def wall_time(self):
+        return self.epoch + self._now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def call_later(self, delay, callback):
+        with self.lock:
+            timer = VirtualTimer(self._now + max(0.0, delay), callback)
+            heapq.heappush(self._timers, (timer.deadline, next(self._sequence), timer))
+            return timer
+
+    def advance(self, seconds):
+        """Move the clock forward, firing every callback that falls due on the way"""
+        self.advance_to(self._now + seconds)
+
+    def advance_to(self, target):
+        # Callbacks run outside the lock: they may take their own locks and
+        # schedule further callbacks from other threads
+        while True:
+            with self.lock:
+                if not self._timers or self._timers[0][0] > target:
+                    self._now = max(self._now, target)
+                    return
+                deadline, _, timer = heapq.heappop(self._timers)
+                if timer.cancelled:
+                    continue
+                self._now = max(self._now, deadline)
+            timer.callback()
+
+    def next_deadline(self):
+        """Deadline of the earliest pending callback, or None"""
+        with self.lock:
+            while self._timers and self._timers[0][2].cancelled:
+                heapq.heappop(self._timers)
+            return self._timers[0][0] if self._timers else None
@@ -0,0 +1,106 @@
+import logging
+from logic.direction import Direction
+from logic.policy import SATURATION_FLOW, estimate_flows, green_splits, phase_flow_ratios, webster_cycle
+
+logger = logging.getLogger(__name__)
+
+
+class PhasePlan:
+    """
+    Fixed-time coordinated plan for one junction: a common cycle length, an
+    offset for the coordinated (arterial) green and a green time per phase of
+    the junction's policy, served in order starting with the arterial's phase.
+    """
+    def __init__(self, cycle, offset, greens, intergreen, reference=0.0):
+        self.cycle = cycle  # Seconds
+        self.offset = offset  # Seconds from the corridor reference to the arterial green start
+        self.greens = greens  # [(phase, green seconds)], arterial phase first
+        self.intergreen = intergreen  # Yellow + all-red seconds between greens
+        self.reference = reference  # Monotonic time the corridor's cycles are counted from
+
+    def phase_at(self, now):
+        """Phase whose switch window contains now (switches are issued one intergreen early)"""
+        position = (now - self.reference - self.offset + self.intergreen) % self.cycle
+        for phase, green in self.greens:
+            window = green + self.intergreen
+            if position < window:
+                return phase
+            position -= window
+        return self.greens[-1][0]
+
+    def __repr__(self):
+        greens = ", ".join(f"{'+'.join(d.name for d in phase)}={g:.0f}s" for phase, g in self.greens)
+        return f"PhasePlan(cycle={self.cycle:.0f}s, offset={self.offset:.0f}s, {greens})"
+
+
+class CorridorCoordinator:
+    """
+    Computes green waves along a corridor of adjacent junctions. From aggregated
+    flows it picks a common Webster cycle length, splits green time across each
+    junction's policy phases by critical flow ratio (the same helpers as
+    WebsterPolicy) and offsets the arterial greens by the travel time between
+    junctions, then pushes the resulting PhasePlan to every DecisionModule.
+    """
+    def __init__(self, decision_modules, travel_times, arterial=Direction.NORTH,
+                 min_cycle=40, max_cycle=150, min_green=7, saturation_flow=SATURATION_FLOW, clock=None):
+        self.decision_modules = decision_modules  # Ordered [(junction_id, DecisionModule)] along the corridor
+        self.travel_times = travel_times  # Seconds from each junction to the next (len = junctions - 1)
+        self.arterial = arterial  # Approach whose green is coordinated
+        self.min_cycle = min_cycle
+        self.max_cycle = max_cycle
+        self.min_green = min_green
+        self.saturation_flow = saturation_flow
+        # Plans are evaluated against the junctions' clock, so the reference must share it
+        clock = clock or decision_modules[0][1].clock
+        self.reference = clock.now()
+        self.plans = {}
+        if len(travel_times) != len(decision_modules) - 1:
+            raise ValueError("travel_times needs one entry per pair of adjacent junctions")
+
+    def phase_order(self, module):
+        """The junction policy's phases, rotated so the arterial's phase comes first"""
+        phases = list(module.policy.phases)
+        arterial_phase = module.policy.phase_for(self.arterial)
+        if arterial_phase not in phases:
+            logger.warning(f"No phase of {type(module.policy).__name__} serves {self.arterial.name}")
+            return phases
+        start = phases.index(arterial_phase)
+        return phases[start:] + phases[:start]
+
+    def compute_plans(self, flows_by_junction=None):
+        """Return junction_id -> PhasePlan for the corridor"""
+        if flows_by_junction is None:
+            flows_by_junction = {junction_id: estimate_flows(module)
+                                 for junction_id, module in self.decision_modules}
+
+        layouts = {}  # junction_id -> (phase order, flow ratios, intergreen, lost time)
+        cycle = self.min_cycle
+        for junction_id, module in self.decision_modules:
+            order = self.phase_order(module)
+            ratios = phase_flow_ratios(flows_by_junction[junction_id], order, self.saturation_flow)
+            intergreen = module.yellow_time + module.all_red_time
+            lost_time = intergreen * len(order)
+            layouts[junction_id] = (order, ratios, intergreen, lost_time)
+            # The junction needing the longest cycle sets the common cycle, which
+            # must also leave every phase its minimum green
+            cycle = max(cycle, webster_cycle(ratios.values(), lost_time, self.min_cycle, self.max_cycle),
+                        lost_time + self.min_green * len(order))
+
+        plans = {}
+        offset = 0.0
+        for index, (junction_id, _) in enumerate(self.decision_modules):
+            order, ratios, intergreen, lost_time = layouts[junction_id]
+            splits = green_splits(ratios, cycle - lost_time, self.min_green)
+            greens = [(phase, splits[phase]) for phase in order]
+            plans[junction_id] = PhasePlan(cycle, offset % cycle, greens, intergreen, self.reference)
+            if index < len(self.travel_times):
+                offset += self.travel_times[index]
+        return plans
+
+    def update(self, flows_by_junction=None):
+        """Recompute plans and push them to every junction's decision module"""
+        self.plans = self.compute_plans(flows_by_junction)
+        for junction_id, module in self.decision_modules:
+            module.set_phase_plan(self.plans[junction_id])
+            logger.info(f"[{junction_id}] {self.plans[junction_id]}")
+        return self.plans
@@ -1,37 +1,88 @@
-import time
 import logging
+import threading
 from enum import Enum  # If Direction enum is used here
 from components.traffic_lights import TrafficLight
 from logic.direction import Direction
+from logic.policy import GreedyPolicy
+from logic.clock import MonotonicClock
+from logic.metrics import REGISTRY, timed
 # from detection.direction import Direction  # Assuming you defined Direction enum elsewhere
 
 logger = logging.getLogger(__name__)
 
+# Signal phases of the junction
+GREEN = "green"
+YELLOW = "yellow"
+ALL_RED = "all_red"
+
+PHASE_SWITCHES = REGISTRY.counter("traffic_phase_switches_total",
+                                  "Transitions started towards a new green phase, by reason", ("reason",))
 
 
 class DecisionModule:
     """
     Processes perception data and makes traffic control decisions
     """
-    def __init__(self, traffic_lights):
+    def __init__(self, traffic_lights, use_timers=True, policy=None, clock=None, forecaster=None):
         self.traffic_lights = traffic_lights  # Dictionary of direction -> TrafficLight
-        self.current_green = Direction.NORTH  # Start with North as green
+        self.clock = clock or MonotonicClock()
+        self.policy = policy if policy is not None else GreedyPolicy()
+        self.current_phase = self.policy.phase_for(Direction.NORTH)  # Start with North as green
         self.min_green_time = 20  # Minimum green time in seconds
         self.yellow_time = 3  # Yellow light duration in seconds
-        self.last_switch_time = time.time()
+        self.all_red_time = 1  # All-red clearance interval in seconds
+        self.last_switch_time = self.clock.now()
         self.emergency_override = False
         self.emergency_direction = None
         self.accident_detected = False
         self.accident_location = None
         self.max_green_time = 120  # Maximum green time in seconds
-        
+        self.flow_metrics = {}  # Direction -> tracker metrics (throughput, queue_length, mean_speed, active)
+        self.last_vehicle_counts = {}
+        self.phase_plan = None  # Optional coordinated PhasePlan pushed by a CorridorCoordinator
+        # Optional ArrivalForecaster: predicted arrivals over the next phase are added to demand
+        # so green is allocated before queues build
+        self.forecaster = forecaster
+        self.forecast = {}  # Direction -> expected arrivals over the forecast horizon
+        self.forecast_rates = {}  # Direction -> expected arrivals per second
+        self.last_forecast_time = None
+
+        # Phase scheduler: transitions are due at clock deadlines and advanced by
+        # tick(), either from a timer or by the caller, so nothing here ever sleeps
+        self.phase = GREEN
+        self.pending_phase = None
+        self.phase_deadline = None
+        self.use_timers = use_timers
+        self.timer = None
+        self.lock = threading.RLock()
+
+    @property
+    def current_green(self):
+        """First direction of the green phase"""
+        return self.current_phase[0]
+
+    @current_green.setter
+    def current_green(self, direction):
+        self.current_phase = self.policy.phase_for(direction)
+
+    @timed("decide")
     def process_perception_data(self, vehicle_counts, emergency_detected, emergency_direction, 
-                               accident_detected, accident_location):
+                               accident_detected, accident_location, flow_metrics=None, now=None,
+                               arrivals=None):
         """
         Process perception data and decide on traffic light changes
+        flow_metrics optionally maps Direction -> tracker metrics; when present, queued
+        vehicles rather than raw counts decide which approach is served next
+        arrivals optionally maps Direction -> vehicles that arrived since the previous call
+        and feeds the forecaster; otherwise it estimates arrivals from the counts
         """
-        current_time = time.time()
-        time_since_switch = current_time - self.last_switch_time
+        if flow_metrics is not None:
+            self.flow_metrics = flow_metrics
+        self.last_vehicle_counts = dict(vehicle_counts)
+        current_time = self.clock.now() if now is None else now
+        if self.forecaster is not None:
+            self._update_forecast(vehicle_counts, flow_metrics, arrivals)
+        self.tick(current_time)
         
         # Update internal state
         if emergency_detected:
@@ -44,71 +95,163 @@ class DecisionModule:
             self.accident_location = accident_location
             logger.critical(f"Accident detected in {accident_location.name} direction")
         
-        # Decision logic
-        should_switch = False
-        next_green = self.current_green
-        
-        # Handle emergency vehicle with highest priority
-        if self.emergency_override:
-            if self.current_green != self.emergency_direction:
-                should_switch = True
-                next_green = self.emergency_direction
-            # Reset after emergency vehicle has likely passed
-            if time_since_switch > 60:  # 1 minute timeout for emergency
-                self.emergency_override = False
-                self.emergency_direction = None
-                
-        # Regular traffic flow logic
-        elif not should_switch and time_since_switch >= self.min_green_time:
-            # Find direction with highest vehicle count that isn't current green
-            max_count = -1
-            max_direction = None
-            
-            for direction, count in vehicle_counts.items():
-                if direction != self.current_green and count > max_count:
-                    max_count = count
-                    max_direction = direction
-            
-            # Switch if another direction has significantly more vehicles
-            # or if maximum green time exceeded
-            current_count = vehicle_counts[self.current_green]
-            if (max_count > current_count * 1.5 or 
-                time_since_switch >= self.max_green_time):
-                should_switch = True
-                next_green = max_direction
-        
-        # Execute switch if needed
-        if should_switch:
-            self._switch_lights(next_green)
+        # The timer thread's tick() may finish a transition at any moment, so phase,
+        # pending_phase and the switch are read and changed under the lock
+        with self.lock:
+            time_since_switch = current_time - self.last_switch_time
+
+            # Decision logic
+            should_switch = False
+            next_phase = self.current_phase
+
+            # Handle emergency vehicle with highest priority
+            if self.emergency_override:
+                if self.phase != GREEN:
+                    # Preempt a transition already under way so it ends on the emergency direction
+                    if self.pending_phase is not None and self.emergency_direction not in self.pending_phase:
+                        self.pending_phase = self.policy.phase_for(self.emergency_direction)
+                        logger.warning(f"Pending transition retargeted to {self.emergency_direction.name}")
+                elif self.emergency_direction not in self.current_phase:
+                    should_switch = True
+                    next_phase = self.policy.phase_for(self.emergency_direction)
+                # Reset after emergency vehicle has likely passed
+                if time_since_switch > 60:  # 1 minute timeout for emergency
+                    self.emergency_override = False
+                    self.emergency_direction = None
+
+            # Coordinated plan: follow the corridor's fixed-time schedule
+            elif self.phase_plan is not None:
+                planned = self.phase_plan.phase_at(current_time)
+                if self.phase == GREEN and planned != self.current_phase:
+                    should_switch = True
+                    next_phase = planned
+
+            # Regular traffic flow logic (never interrupts a transition in progress)
+            elif self.phase == GREEN:
+                chosen = self.policy.choose(self, vehicle_counts, time_since_switch)
+                if chosen is not None and chosen != self.current_phase:
+                    should_switch = True
+                    next_phase = chosen
+
+            # Execute switch if needed
+            if should_switch:
+                reason = "emergency" if self.emergency_override else "plan" if self.phase_plan is not None else "policy"
+                PHASE_SWITCHES.labels(reason).inc()
+                self._switch_lights(next_phase, current_time)
             
         return self.current_green
     
-    def _switch_lights(self, new_green):
-        """Handle the transition to a new green direction"""
-        # First, set current green to yellow
-        self.traffic_lights[self.current_green].set_yellow()
-        time.sleep(self.yellow_time)
-        
-        # Then set all to red briefly
-        for light in self.traffic_lights.values():
-            light.set_red()
-        time.sleep(1)
-        
-        # Set new direction to green
-        self.traffic_lights[new_green].set_green()
-        
-        # Update state
-        self.current_green = new_green
-        self.last_switch_time = time.time()
-        logger.info(f"Switched green light to {new_green.name} direction")
+    def set_phase_plan(self, plan):
+        """Follow a coordinated PhasePlan (None returns to local actuated control)"""
+        with self.lock:
+            self.phase_plan = plan
+
+    def _update_forecast(self, vehicle_counts, flow_metrics, arrivals):
+        """Feed the forecaster and predict arrivals over roughly one phase"""
+        timestamp = self.clock.wall_time()
+        if arrivals is not None:
+            if self.last_forecast_time is not None:
+                self.forecaster.observe(arrivals, timestamp - self.last_forecast_time, timestamp)
+        elif flow_metrics:
+            # Tracker throughput is vehicles/minute crossing the counting line
+            if self.last_forecast_time is not None:
+                interval = timestamp - self.last_forecast_time
+                self.forecaster.observe({d: m["throughput"] / 60 * interval for d, m in flow_metrics.items()},
+                                        interval, timestamp)
+        else:
+            self.forecaster.observe_counts(vehicle_counts, timestamp)
+        self.last_forecast_time = timestamp
+
+        horizon = self.min_green_time + self.yellow_time + self.all_red_time
+        rates = self.forecaster.rates(timestamp, horizon)
+        self.forecast_rates = dict(zip(self.forecaster.directions, rates.tolist()))
+        self.forecast = {direction: rate * horizon for direction, rate in self.forecast_rates.items()}
+
+    def demand(self, direction, vehicle_counts):
+        """
+        Vehicles to serve on an approach: with tracker metrics, the stopped queue on red
+        approaches and every tracked vehicle on the green one; otherwise the smoothed count.
+        With a forecaster, arrivals expected over the next phase are added.
+        """
+        expected = self.forecast.get(direction, 0.0)
+        metrics = self.flow_metrics.get(direction)
+        if metrics is None:
+            return vehicle_counts.get(direction, 0) + expected
+        if direction in self.current_phase:
+            return metrics["active"] + expected
+        return metrics["queue_length"] + expected
+
+    @timed("switch_lights")
+    def _switch_lights(self, new_phase, now=None):
+        """Start the transition to a new green phase (or single direction) without blocking"""
+        now = self.clock.now() if now is None else now
+        if isinstance(new_phase, Direction):
+            new_phase = self.policy.phase_for(new_phase)
+        with self.lock:
+            if self.phase != GREEN:
+                self.pending_phase = new_phase
+                return
+            # First, set current green to yellow; all-red and green follow from tick()
+            for direction in self.current_phase:
+                self.traffic_lights[direction].set_yellow()
+            self.phase = YELLOW
+            self.pending_phase = new_phase
+            self.phase_deadline = now + self.yellow_time
+            self._arm_timer(now)
+
+    def tick(self, now=None):
+        """Apply every phase transition that is due; returns the current green direction"""
+        now = self.clock.now() if now is None else now
+        with self.lock:
+            while self.phase != GREEN and now >= self.phase_deadline:
+                if self.phase == YELLOW:
+                    # Then set all to red briefly
+                    for light in self.traffic_lights.values():
+                        light.set_red()
+                    self.phase = ALL_RED
+                    self.phase_deadline += self.all_red_time
+                else:
+                    # Set new phase to green
+                    for direction in self.pending_phase:
+                        self.traffic_lights[direction].set_green()
+                    self.current_phase = self.pending_phase
+                    self.pending_phase = None
+                    self.phase = GREEN
+                    self.last_switch_time = self.phase_deadline
+                    self.phase_deadline = None
+                    names = "+".join(direction.name for direction in self.current_phase)
+                    logger.info(f"Switched green light to {names} direction")
+            if self.phase != GREEN:
+                self._arm_timer(now)
+            return self.current_green
+
+    def _arm_timer(self, now):
+        """Schedule tick() for the next phase deadline"""
+        if not self.use_timers:
+            return
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = self.clock.call_later(self.phase_deadline - now, self.tick)
+
+    def in_transition(self):
+        """True while a yellow or all-red interval is running"""
+        return self.phase != GREEN
+
+    def cancel_timers(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
         
-    def initialize_lights(self):
+    def initialize_lights(self, now=None):
         """Set initial traffic light state"""
-        # All red first
-        for light in self.traffic_lights.values():
-            light.set_red()
-        time.sleep(1)
-        
-        # Set initial direction to green
-        self.traffic_lights[self.current_green].set_green()
-        logger.info(f"Initialized with {self.current_green.name} direction as green")
+        now = self.clock.now() if now is None else now
+        with self.lock:
+            # All red first; the initial direction turns green after the clearance interval
+            for light in self.traffic_lights.values():
+                light.set_red()
+            self.phase = ALL_RED
+            self.pending_phase = self.current_phase
+            self.phase_deadline = now + self.all_red_time
+            self._arm_timer(now)
+        names = "+".join(direction.name for direction in self.current_phase)
+        logger.info(f"Initializing with {names} direction as green")
@@ -0,0 +1,246 @@
+import os
+import json
+import queue
+import logging
+import threading
+from collections import defaultdict
+import requests
+from requests.adapters import HTTPAdapter
+from vision.resilience import CircuitBreaker, backoff_delay
+from logic.metrics import REGISTRY, stage_timer
+
+logger = logging.getLogger(__name__)
+
+ROWS = REGISTRY.counter("traffic_event_rows_total",
+                        "Supabase rows by outcome (sent, dropped, spooled)", ("outcome",))
+POSTS = REGISTRY.counter("traffic_supabase_posts_total",
+                         "Supabase bulk-insert attempts by result", ("result",))
+
+# Rows the API rejected as invalid would fail the same way on replay, so they are dropped
+REJECTED_STATUSES = (400, 409, 422)
+# A rotated or revoked key is not fixed by retrying at once; the rows are spooled for a later replay
+AUTH_STATUSES = (401, 403)
+
+
+class EventSink:
+    """
+    Background sink for Supabase rows. Callers enqueue rows without blocking;
+    a worker thread bulk-inserts them once per flush interval over a pooled
+    session, retries with backoff and spools undeliverable rows to an
+    append-only JSON-lines file that is replayed once the uplink recovers.
+    While the circuit breaker is open rows go straight to the spool, and
+    rows overflowing a full queue are spooled by the worker, not the caller.
+    """
+    def __init__(self, base_url, api_key, flush_interval=2.0, max_batch=100, max_queue=1000,
+                 spool_path=None, timeout=5, max_retries=3, breaker=None):
+        self.base_url = base_url
+        self.flush_interval = flush_interval  # Seconds between bulk inserts
+        self.max_batch = max_batch  # Rows per flush
+        self.spool_path = spool_path  # Append-only file for rows that could not be sent
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflow = []  # Rows the queue had no room for, spooled by the worker thread
+        self.max_overflow = max_queue
+        self.overflow_lock = threading.Lock()
+        self.breaker = breaker or CircuitBreaker(failure_threshold=3, name="Supabase")
+        self.stop_event = threading.Event()
+        self.spool_lock = threading.Lock()
+        self.thread = None
+        self.sent = 0
+        self.spooled = 0
+        self.dropped = 0
+
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.headers.update({
+            "apikey": api_key or "",
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Prefer": "return=minimal"
+        })
+
+    def start(self):
+        """Start the background flush thread"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="event-sink", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=10):
+        """Flush what is queued and stop the worker; anything unsent is spooled"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+    def submit(self, table, row):
+        """Queue a row for insertion into a table without blocking the caller"""
+        try:
+            self.queue.put_nowait((table, row))
+            return
+        except queue.Full:
+            pass
+        with self.overflow_lock:
+            if len(self.overflow) < self.max_overflow:
+                if not self.overflow:
+                    logger.warning("Event queue full, spooling further rows to disk")
+                self.overflow.append((table, row))
+                return
+        logger.error(f"Event queue and overflow full, dropping {table} row")
+        ROWS.labels("dropped").inc()
+        self.dropped += 1
+
+    def _spool_overflow(self):
+        with self.overflow_lock:
+            rows, self.overflow = self.overflow, []
+        self._spool(rows)
+
+    def _run(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+        # Final drain on shutdown: one attempt per batch, the rest goes to the spool
+        while not self.queue.empty():
+            self.flush(retry=False)
+        self._spool_overflow()
+
+    def flush(self, retry=True):
+        """Send queued rows (and then any spooled rows) as bulk inserts"""
+        self._spool_overflow()
+        rows = []
+        while len(rows) < self.max_batch:
+            try:
+                rows.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        delivered = self._send(rows, retry) if rows else True
+        if delivered and not self.queue.qsize():
+            self._replay_spool(retry)
+
+    def _send(self, rows, retry=True, spool=True):
+        """
+        Bulk-insert rows grouped by table and column set. Returns True when
+        every group was handled; failed groups are spooled, or with spool=False
+        returned as a list of rows instead.
+        """
+        # PostgREST bulk inserts require every object in the array to share the same keys
+        groups = defaultdict(list)
+        for table, row in rows:
+            groups[(table, tuple(sorted(row)))].append(row)
+
+        failed = []
+        for (table, _), batch in groups.items():
+            if not self._post(table, batch, retry):
+                failed.extend((table, row) for row in batch)
+        if not spool:
+            return failed
+        self._spool(failed)
+        return not failed
+
+    def _post(self, table, batch, retry=True):
+        """Return True once the batch is handled (inserted, or rejected as invalid)"""
+        if not self.breaker.allow():
+            POSTS.labels("circuit_open").inc()
+            logger.debug(f"Supabase circuit open, not posting to {table}")
+            return False
+        url = f"{self.base_url}/rest/v1/{table}"
+        attempts = self.max_retries + 1 if retry else 1
+        for attempt in range(attempts):
+            try:
+                with stage_timer("supabase_post"):
+                    response = self.session.post(url, json=batch, timeout=self.timeout)
+                if response.status_code in (200, 201, 204):
+                    self.breaker.record_success()
+                    POSTS.labels("success").inc()
+                    ROWS.labels("sent").inc(len(batch))
+                    self.sent += len(batch)
+                    logger.debug(f"Inserted {len(batch)} rows into {table}")
+                    return True
+                logger.warning(f"Failed to insert into {table}: {response.status_code} - {response.text}")
+                POSTS.labels("error").inc()
+                if response.status_code in REJECTED_STATUSES:
+                    self.breaker.record_success()
+                    ROWS.labels("dropped").inc(len(batch))
+                    self.dropped += len(batch)
+                    return True
+                if response.status_code in AUTH_STATUSES:
+                    break
+            except requests.exceptions.RequestException as e:
+                POSTS.labels("error").inc()
+                logger.error(f"Exception inserting into {table}: {e}")
+            if attempt + 1 < attempts and not self.stop_event.wait(backoff_delay(attempt)):
+                continue
+            break
+        self.breaker.record_failure()
+        return False
+
+    def _spool(self, rows):
+        if not rows:
+            return
+        if not self.spool_path:
+            logger.error(f"Dropping {len(rows)} undeliverable events (no spool configured)")
+            ROWS.labels("dropped").inc(len(rows))
+            self.dropped += len(rows)
+            return
+        with self.spool_lock:
+            with open(self.spool_path, "a") as spool:
+                for table, row in rows:
+                    spool.write(json.dumps({"table": table, "row": row}) + "\n")
+                spool.flush()
+                os.fsync(spool.fileno())
+            self.spooled += len(rows)
+        ROWS.labels("spooled").inc(len(rows))
+
+    @property
+    def replay_path(self):
+        """Spool rows are moved here while being re-sent, so new failures never mix with them"""
+        return self.spool_path + ".replay"
+
+    def _replay_spool(self, retry=True):
+        """
+        Re-send spooled rows. The spool is renamed aside first and that file is
+        deleted only once every row was sent; if the uplink drops again the
+        unsent rows are written back to it and retried on the next replay.
+        """
+        if not self.spool_path:
+            return
+        with self.spool_lock:
+            # A replay file left by an earlier failure or crash goes first
+            if not os.path.exists(self.replay_path):
+                if not os.path.exists(self.spool_path) or os.path.getsize(self.spool_path) == 0:
+                    return
+                os.replace(self.spool_path, self.replay_path)
+            with open(self.replay_path) as spool:
+                lines = spool.readlines()
+
+        rows = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                rows.append((entry["table"], entry["row"]))
+            except (ValueError, KeyError):
+                logger.error(f"Skipping corrupt spool line: {line.strip()}")
+        if rows:
+            logger.info(f"Replaying {len(rows)} spooled events")
+        for i in range(0, len(rows), self.max_batch):
+            batch = rows[i:i + self.max_batch]
+            failed = self._send(batch, retry, spool=False)
+            if failed:
+                # Still offline: keep the unsent rows for the next replay (the
+                # file is already right when nothing at all got through)
+                if i or len(failed) < len(batch):
+                    self._write_replay(failed + rows[i + self.max_batch:])
+                return
+        os.remove(self.replay_path)
+
+    def _write_replay(self, rows):
+        temp_path = self.replay_path + ".tmp"
+        with open(temp_path, "w") as spool:
+            for table, row in rows:
+                spool.write(json.dumps({"table": table, "row": row}) + "\n")
+            spool.flush()
+            os.fsync(spool.fileno())
+        os.replace(temp_path, self.replay_path)
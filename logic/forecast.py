@@ -0,0 +1,88 @@
+import logging
+import numpy as np
+from logic.direction import Direction
+
+logger = logging.getLogger(__name__)
+
+WEEK = 7 * 86400
+DAY = 86400
+
+
+class ArrivalForecaster:
+    """
+    Short-term arrival forecast per direction. A seasonal profile of arrival
+    rates by time-of-day (and day-of-week when weekly) is learned with a slow
+    per-slot EWMA; a fast EWMA tracks recent arrivals. The forecast is the
+    profile ahead plus today's deviation from it, decaying with a time constant
+    of persistence seconds. Slots with no history fall back to the recent rate.
+    """
+    def __init__(self, slot_seconds=900, weekly=True, profile_alpha=0.1, recent_alpha=0.3,
+                 persistence=900.0, utc_offset=0.0):
+        self.directions = list(Direction)
+        self.slot_seconds = slot_seconds
+        self.season = WEEK if weekly else DAY
+        self.slots = int(self.season // slot_seconds)
+        self.profile_alpha = profile_alpha  # Weight of a new observation in its seasonal slot
+        self.recent_alpha = recent_alpha  # Weight of a new observation in the recent rate
+        self.persistence = persistence  # Seconds for a deviation from the profile to fade by 1/e
+        self.utc_offset = utc_offset  # Seconds added to epoch time to get local time of day
+        self.profile = np.zeros((len(self.directions), self.slots))  # Vehicles/second
+        self.samples = np.zeros((len(self.directions), self.slots))  # Observations per slot
+        self.recent = np.zeros(len(self.directions))  # Vehicles/second
+        self.observed = False
+        self.last_counts = None
+        self.last_time = None
+
+    def slot(self, timestamp):
+        return int(((timestamp + self.utc_offset) % self.season) // self.slot_seconds)
+
+    def observe(self, arrivals, interval, timestamp):
+        """Fold in vehicles that arrived per direction (array or Direction mapping) over interval seconds"""
+        if interval <= 0:
+            return
+        if isinstance(arrivals, dict):
+            arrivals = [arrivals.get(direction, 0) for direction in self.directions]
+        rates = np.asarray(arrivals, dtype=np.float64) / interval
+
+        slot = self.slot(timestamp)
+        # Plain running mean until a slot has enough samples, then an EWMA
+        weight = np.maximum(self.profile_alpha, 1.0 / (self.samples[:, slot] + 1))
+        self.profile[:, slot] += weight * (rates - self.profile[:, slot])
+        self.samples[:, slot] += 1
+
+        if self.observed:
+            self.recent += self.recent_alpha * (rates - self.recent)
+        else:
+            self.recent = rates.copy()
+            self.observed = True
+
+    def observe_counts(self, vehicle_counts, timestamp):
+        """
+        Estimate arrivals from successive vehicle counts when no direct arrival
+        measurement exists: count increases are taken as arrivals, which
+        undercounts approaches that are discharging on green
+        """
+        counts = np.array([vehicle_counts.get(direction, 0) for direction in self.directions], dtype=np.float64)
+        if self.last_counts is not None and timestamp > self.last_time:
+            self.observe(np.maximum(counts - self.last_counts, 0), timestamp - self.last_time, timestamp)
+        self.last_counts = counts
+        self.last_time = timestamp
+
+    def rates(self, timestamp, horizon):
+        """Expected arrival rate per direction (vehicles/second) averaged over the next horizon seconds"""
+        steps = max(1, int(np.ceil(horizon / self.slot_seconds)) * 2)
+        offsets = (np.arange(steps) + 0.5) * max(horizon, 0.0) / steps
+        now_slot = self.slot(timestamp)
+        ahead_slots = ((timestamp + offsets + self.utc_offset) % self.season // self.slot_seconds).astype(np.int64)
+
+        known_now = self.samples[:, now_slot] > 0
+        deviation = np.where(known_now, self.recent - self.profile[:, now_slot], 0.0)
+        decay = np.exp(-offsets / self.persistence)
+        ahead = self.profile[:, ahead_slots] + deviation[:, None] * decay  # (directions, steps)
+        seasonal = np.where(self.samples[:, ahead_slots] > 0, ahead, self.recent[:, None])
+        return np.maximum(seasonal, 0.0).mean(axis=1)
+
+    def predict(self, timestamp, horizon):
+        """Direction -> expected arrivals over the next horizon seconds"""
+        expected = self.rates(timestamp, horizon) * horizon
+        return {direction: float(value) for direction, value in zip(self.directions, expected)}
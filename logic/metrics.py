@@ -0,0 +1,260 @@
+import bisect
+import functools
+import threading
+from abc import ABC, abstractmethod
+from time import perf_counter
+
+# Seconds; spans a cached encode (~1 ms) up to a retried vision request
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_MIMETYPE = "text/plain; version=0.0.4"  # Flask appends the utf-8 charset
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    def set(self, value):
+        self.value = float(value)
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    def __init__(self, bounds, samples=None):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Per bucket, not cumulative; last is +Inf
+        self.sum = 0.0
+        self.samples = samples  # Raw observations, kept only while record_samples() is on
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            if self.samples is not None:
+                self.samples.append(value)
+
+    def time(self):
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(perf_counter() - self.start)
+        return False
+
+
+class Metric(ABC):
+    """
+    One metric family. Label values select a child (created on first use);
+    a metric without labels forwards inc/set/observe to its single child.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        """Create the child holding one label combination's value"""
+
+    def labels(self, *values):
+        """Child for one combination of label values (Directions are stored by name)"""
+        key = tuple(getattr(value, "name", value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def _children(self):
+        with self.lock:
+            return list(self.children.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._children():
+            lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_format_value(child.value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self.keep_samples = False
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds, [] if self.keep_samples else None)
+
+    def record_samples(self, enabled=True):
+        """
+        Keep every raw observation (for exact percentiles in benchmarks) or stop
+        keeping them; samples kept so far are discarded either way
+        """
+        with self.lock:
+            self.keep_samples = enabled
+            for child in self.children.values():
+                with child.lock:
+                    child.samples = [] if enabled else None
+
+    def samples(self):
+        """Label values -> raw observations kept since record_samples()"""
+        result = {}
+        for key, child in self._children():
+            with child.lock:
+                if child.samples:
+                    result[key] = list(child.samples)
+        return result
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._children():
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                labels = _label_text(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metric families, rendered in the Prometheus text exposition format"""
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **options):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, documentation, labelnames, **options)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered as a different {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry served at /metrics
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "traffic_stage_seconds", "Seconds spent in each pipeline stage", ("stage",))
+
+
+def timed(stage, histogram=None):
+    """Decorator recording each call's duration under a stage label of traffic_stage_seconds"""
+    child = (histogram or STAGE_SECONDS).labels(stage)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def stage_timer(stage):
+    """Context manager form of timed() for blocks inside a function"""
+    return STAGE_SECONDS.labels(stage).time()
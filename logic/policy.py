@@ -0,0 +1,190 @@
+import logging
+from abc import ABC, abstractmethod
+from logic.direction import Direction
+
+logger = logging.getLogger(__name__)
+
+# A phase is a tuple of directions that are green together
+NORTH_SOUTH = (Direction.NORTH, Direction.SOUTH)
+EAST_WEST = (Direction.EAST, Direction.WEST)
+SINGLE_PHASES = tuple((direction,) for direction in Direction)
+CONCURRENT_PHASES = (NORTH_SOUTH, EAST_WEST)
+
+SATURATION_FLOW = 1800  # Vehicles per hour of green per approach
+COUNT_TO_FLOW = 60  # Vehicles/hour assumed per vehicle in view when no tracker flow is available
+
+
+def estimate_flows(decision_module):
+    """Estimate per-direction arrival flow (veh/h) from a DecisionModule's latest observations"""
+    flows = {}
+    for direction in Direction:
+        metrics = decision_module.flow_metrics.get(direction)
+        if metrics is not None:
+            flows[direction] = metrics["throughput"] * 60 + metrics["queue_length"] * COUNT_TO_FLOW
+        else:
+            flows[direction] = decision_module.last_vehicle_counts.get(direction, 0) * COUNT_TO_FLOW
+    # Vehicles expected over the next phase count like vehicles already waiting
+    for direction, expected in getattr(decision_module, "forecast", {}).items():
+        flows[direction] += expected * COUNT_TO_FLOW
+    return flows
+
+
+def webster_cycle(flow_ratios, lost_time, min_cycle=40, max_cycle=150):
+    """Webster optimum cycle (1.5L + 5) / (1 - Y), clamped to [min_cycle, max_cycle]"""
+    y_total = sum(flow_ratios)
+    if y_total >= 0.95:
+        return max_cycle
+    cycle = (1.5 * lost_time + 5) / (1 - y_total)
+    return min(max_cycle, max(min_cycle, cycle))
+
+
+def phase_flow_ratios(flows, phases, saturation_flow=SATURATION_FLOW):
+    """Critical flow ratio of each phase: its busiest approach's flow over the saturation flow"""
+    return {phase: max(flows.get(d, 0) for d in phase) / saturation_flow for phase in phases}
+
+
+def green_splits(ratios, effective_green, min_green):
+    """
+    Share effective_green seconds across phases in proportion to their flow
+    ratios, each phase getting at least min_green. The greens add up to
+    effective_green unless the minimums alone exceed it.
+    """
+    spare = max(0.0, effective_green - min_green * len(ratios))
+    total = sum(ratios.values())
+    return {phase: min_green + spare * (ratio / total if total > 0 else 1 / len(ratios))
+            for phase, ratio in ratios.items()}
+
+
+class Policy(ABC):
+    """
+    Decides which phase should be green next. Subclasses implement choose(),
+    returning a phase (tuple of directions) to switch to, or None to keep the
+    current one.
+    """
+    phases = SINGLE_PHASES
+
+    def phase_for(self, direction):
+        """The phase that serves a direction"""
+        for phase in self.phases:
+            if direction in phase:
+                return phase
+        return (direction,)
+
+    @abstractmethod
+    def choose(self, module, vehicle_counts, time_since_switch):
+        """Phase to switch to given the module's state and latest counts, or None to hold"""
+
+
+class GreedyPolicy(Policy):
+    """
+    Serves one approach at a time and switches to the busiest other approach
+    once it has 1.5x the current demand, or when the maximum green expires
+    """
+    phases = SINGLE_PHASES
+
+    def choose(self, module, vehicle_counts, time_since_switch):
+        if time_since_switch < module.min_green_time:
+            return None
+
+        # Find direction with highest demand that isn't current green
+        max_count = -1
+        max_direction = None
+        for direction in vehicle_counts:
+            count = module.demand(direction, vehicle_counts)
+            if direction not in module.current_phase and count > max_count:
+                max_count = count
+                max_direction = direction
+
+        # Switch if another direction has significantly more vehicles
+        # or if maximum green time exceeded
+        current_count = module.demand(module.current_green, vehicle_counts)
+        if max_direction is not None and (max_count > current_count * 1.5 or
+                                          time_since_switch >= module.max_green_time):
+            return (max_direction,)
+        return None
+
+
+class MaxPressurePolicy(Policy):
+    """
+    Max-pressure control over compatible phases: after the minimum green, serve
+    the phase whose approaches hold the most waiting vehicles. Downstream
+    occupancy is not observed, so pressure is the upstream demand of the phase.
+    """
+    def __init__(self, phases=CONCURRENT_PHASES, hysteresis=1.2):
+        self.phases = tuple(phases)
+        self.hysteresis = hysteresis  # Required pressure ratio over the current phase to switch
+
+    def pressure(self, module, phase, vehicle_counts):
+        return sum(module.demand(direction, vehicle_counts) for direction in phase
+                   if direction in vehicle_counts)
+
+    def choose(self, module, vehicle_counts, time_since_switch):
+        if time_since_switch < module.min_green_time:
+            return None
+        pressures = {phase: self.pressure(module, phase, vehicle_counts) for phase in self.phases}
+        current = pressures.get(module.current_phase, 0)
+        others = [(p, phase) for phase, p in pressures.items() if phase != module.current_phase]
+        if not others:
+            return None
+        best_pressure, best_phase = max(others, key=lambda item: item[0])
+        if best_pressure > current * self.hysteresis:
+            return best_phase
+        if time_since_switch >= module.max_green_time and best_pressure > 0:
+            return best_phase
+        return None
+
+
+class WebsterPolicy(Policy):
+    """
+    Cyclic service of compatible phases with Webster green splits: the cycle is
+    computed from the critical flow ratio of each phase and each phase gets
+    green in proportion to its ratio. Phases with no demand are skipped.
+    """
+    def __init__(self, phases=CONCURRENT_PHASES, saturation_flow=SATURATION_FLOW,
+                 min_cycle=40, max_cycle=150, min_green=7):
+        self.phases = tuple(phases)
+        self.saturation_flow = saturation_flow
+        self.min_cycle = min_cycle
+        self.max_cycle = max_cycle
+        self.min_green = min_green
+        self.cycle = None
+        self.splits = {}  # phase -> green seconds from the latest computation
+
+    def compute_splits(self, module):
+        ratios = phase_flow_ratios(estimate_flows(module), self.phases, self.saturation_flow)
+        lost_time = (module.yellow_time + module.all_red_time) * len(self.phases)
+        self.cycle = webster_cycle(ratios.values(), lost_time, self.min_cycle, self.max_cycle)
+        self.splits = green_splits(ratios, self.cycle - lost_time, self.min_green)
+        return self.splits
+
+    def choose(self, module, vehicle_counts, time_since_switch):
+        if time_since_switch < self.min_green:
+            return None
+        splits = self.compute_splits(module)
+        if time_since_switch < splits.get(module.current_phase, self.min_green):
+            return None
+        # Next phase in cyclic order that has any demand
+        start = self.phases.index(module.current_phase) if module.current_phase in self.phases else -1
+        for step in range(1, len(self.phases) + 1):
+            phase = self.phases[(start + step) % len(self.phases)]
+            if phase == module.current_phase:
+                break
+            if any(module.demand(d, vehicle_counts) > 0 for d in phase if d in vehicle_counts):
+                return phase
+        return None
+
+
+POLICIES = {
+    "greedy": GreedyPolicy,
+    "max_pressure": MaxPressurePolicy,
+    "webster": WebsterPolicy,
+}
+
+
+def create_policy(name, **options):
+    """Build a policy by its config name ("greedy", "max_pressure" or "webster")"""
+    try:
+        policy_class = POLICIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown signal policy '{name}', expected one of {sorted(POLICIES)}") from None
+    return policy_class(**options)
@@ -0,0 +1,270 @@
+try:
+    import serial
+except ImportError:
+    import types
+    serial = types.SimpleNamespace()
+    serial.Serial = lambda *args, **kwargs: None
+import time
+import queue
+import logging
+import threading
+from logic.clock import MonotonicClock
+from logic.metrics import REGISTRY, timed
+
+logger = logging.getLogger(__name__)
+
+# Final result codes that end an AT command exchange
+FINAL_OK = ("OK",)
+FINAL_ERROR = ("ERROR", "+CMS ERROR", "+CME ERROR")
+
+SMS_MESSAGES = REGISTRY.counter("traffic_sms_messages_total",
+                                "SMS by final status (sent, failed, deduplicated)", ("status",))
+
+
+class SmsJob:
+    """A queued SMS and its delivery status"""
+    QUEUED = "queued"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    def __init__(self, number, message, created_at=None):
+        self.number = number
+        self.message = message
+        self.status = self.QUEUED
+        self.reference = None  # Message reference returned by +CMGS
+        self.error = None
+        self.attempts = 0
+        self.created_at = time.monotonic() if created_at is None else created_at
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the job is sent or has failed; returns True if it was sent"""
+        self.done.wait(timeout)
+        return self.status == self.SENT
+
+
+class SmsDispatcher:
+    """
+    Dedicated worker that owns the GSM modem's serial port and sends queued SMS
+    with an AT-command state machine: each step waits for the modem's '>' prompt
+    or final result code instead of sleeping for a fixed time.
+    """
+    # Modem states
+    DISCONNECTED = "disconnected"
+    READY = "ready"
+    AWAIT_PROMPT = "await_prompt"
+    AWAIT_RESULT = "await_result"
+
+    def __init__(self, port, baudrate=9600, response_timeout=5.0, send_timeout=60.0,
+                 dedup_window=300.0, max_attempts=2, max_queue=100, on_status=None, clock=None):
+        self.port = port  # Device path, or an already-open serial-like object
+        self.baudrate = baudrate
+        self.response_timeout = response_timeout  # Seconds to wait for OK / '>'
+        self.send_timeout = send_timeout  # Seconds to wait for +CMGS after the message body
+        self.dedup_window = dedup_window  # Identical messages within this window are sent once
+        self.max_attempts = max_attempts
+        self.on_status = on_status  # Optional callback(job) on every status change
+        self.clock = clock or MonotonicClock()  # Times the dedup window; modem timeouts stay on real time
+
+        self.serial = None
+        self.state = self.DISCONNECTED
+        self.buffer = ""
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.recent = {}  # (number, message) -> SmsJob
+        self.recent_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start the worker thread"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="sms-dispatcher", daemon=True)
+        self.thread.start()
+
+    @property
+    def connected(self):
+        """True while the serial port is open"""
+        return self.serial is not None
+
+    def open(self):
+        """Open the serial port if it is not open yet; returns True once it is"""
+        try:
+            if self.serial is None:
+                if isinstance(self.port, str):
+                    self.serial = serial.Serial(self.port, self.baudrate, timeout=0.1)
+                else:
+                    self.serial = self.port
+            if self.serial is None:
+                raise IOError("serial support unavailable")
+        except Exception as e:
+            logger.error(f"Failed to open GSM modem on {self.port}: {e}")
+            return False
+        return True
+
+    def stop(self, timeout=5):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+        if self.serial is not None and self.serial is not self.port:
+            self.serial.close()
+        self.serial = None
+        self.state = self.DISCONNECTED
+
+    def send(self, number, message):
+        """
+        Queue an SMS without blocking. Returns the SmsJob tracking it; a duplicate
+        of a recent message returns the original job instead of sending again
+        """
+        key = (number, message)
+        now = self.clock.now()
+        with self.recent_lock:
+            self.recent = {k: job for k, job in self.recent.items()
+                           if now - job.created_at < self.dedup_window}
+            existing = self.recent.get(key)
+            if existing is not None and existing.status != SmsJob.FAILED:
+                SMS_MESSAGES.labels("deduplicated").inc()
+                logger.info(f"Duplicate SMS to {number} suppressed")
+                return existing
+            job = SmsJob(number, message, created_at=now)
+            self.recent[key] = job
+
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            self._set_status(job, SmsJob.FAILED, "SMS queue full")
+        return job
+
+    def _set_status(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        if status in (SmsJob.SENT, SmsJob.FAILED):
+            SMS_MESSAGES.labels(status).inc()
+            job.done.set()
+        if status == SmsJob.FAILED:
+            logger.error(f"SMS to {job.number} failed: {error}")
+        elif status == SmsJob.SENT:
+            logger.info(f"SMS to {job.number} sent (ref {job.reference})")
+        if self.on_status:
+            try:
+                self.on_status(job)
+            except Exception as e:
+                logger.error(f"SMS status callback failed: {e}")
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            if self.state == self.DISCONNECTED and not self._initialize():
+                self.stop_event.wait(self.response_timeout)
+                continue
+            try:
+                job = self.jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._deliver(job)
+
+    def _initialize(self):
+        """Open the port and put the modem in text mode"""
+        if not self.open():
+            return False
+
+        self.buffer = ""
+        for command in ("AT", "ATE0", "AT+CMGF=1"):
+            ok, lines = self._command(command)
+            if not ok:
+                logger.error(f"GSM modem did not accept {command}: {lines}")
+                return False
+        self.state = self.READY
+        logger.info("GSM modem ready")
+        return True
+
+    def _deliver(self, job):
+        while job.attempts < self.max_attempts and not self.stop_event.is_set():
+            job.attempts += 1
+            self._set_status(job, SmsJob.SENDING)
+            error = self._send_once(job)
+            if error is None:
+                self._set_status(job, SmsJob.SENT)
+                return
+            logger.warning(f"SMS attempt {job.attempts} to {job.number} failed: {error}")
+            if self.state == self.DISCONNECTED and not self._initialize():
+                break
+        self._set_status(job, SmsJob.FAILED, job.error or "delivery failed")
+
+    @timed("sms_send")
+    def _send_once(self, job):
+        """Run one AT+CMGS exchange; returns None on success or an error string"""
+        self.buffer = ""
+        self.state = self.AWAIT_PROMPT
+        self._write(f'AT+CMGS="{job.number}"\r')
+        if self._read_until(lambda buf: ">" in buf or self._final_code(buf), self.response_timeout) is None:
+            return self._fail(job, "no '>' prompt from modem")
+        if ">" not in self.buffer:
+            return self._fail(job, f"modem rejected recipient: {self.buffer.strip()}")
+
+        self.buffer = ""
+        self.state = self.AWAIT_RESULT
+        self._write(job.message + "\x1a")  # Ctrl+Z submits the message
+        if self._read_until(self._final_code, self.send_timeout) is None:
+            # Cancel the pending submission so the next command starts clean
+            self._write("\x1b")
+            return self._fail(job, "timed out waiting for +CMGS")
+
+        lines = self._lines(self.buffer)
+        self.state = self.READY
+        if self._final_code(self.buffer) != "OK":
+            job.error = next((line for line in lines if line.startswith(FINAL_ERROR)), "ERROR")
+            return job.error
+        for line in lines:
+            if line.startswith("+CMGS:"):
+                job.reference = line.split(":", 1)[1].strip()
+        return None
+
+    def _fail(self, job, error):
+        # An unresponsive modem is re-initialised before the next attempt
+        self.state = self.DISCONNECTED
+        job.error = error
+        return error
+
+    def _command(self, command, timeout=None):
+        """Send an AT command and wait for its final result code"""
+        self.buffer = ""
+        self._write(command + "\r")
+        if self._read_until(self._final_code, timeout or self.response_timeout) is None:
+            return False, self._lines(self.buffer)
+        return self._final_code(self.buffer) == "OK", self._lines(self.buffer)
+
+    def _write(self, text):
+        self.serial.write(text.encode())
+        if hasattr(self.serial, "flush"):
+            self.serial.flush()
+
+    def _read_until(self, predicate, timeout):
+        """Accumulate modem output until predicate(buffer) is truthy; None on timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            result = predicate(self.buffer)
+            if result:
+                return result
+            if time.monotonic() >= deadline or self.stop_event.is_set():
+                return None
+            waiting = getattr(self.serial, "in_waiting", 0)
+            chunk = self.serial.read(waiting or 1)
+            if chunk:
+                self.buffer += chunk.decode(errors="ignore")
+
+    @staticmethod
+    def _lines(buffer):
+        return [line.strip() for line in buffer.splitlines() if line.strip()]
+
+    @classmethod
+    def _final_code(cls, buffer):
+        """Return 'OK' or the error line if the buffer holds a final result code"""
+        for line in cls._lines(buffer):
+            if line in FINAL_OK:
+                return "OK"
+            if line.startswith(FINAL_ERROR):
+                return line
+        return None
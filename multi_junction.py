@@ -0,0 +1,237 @@
+# Multi-junction controller
+# Drives many intersections from one host process: each junction keeps its own
+# cameras, lights and decision state, while vision analysis runs on a shared
+# worker pool that serves junctions round-robin. The process serves the
+# metrics of every junction at /metrics.
+
+import sys
+import json
+import logging
+import threading
+from flask import Flask, Response
+from app import (IntelligentTrafficSystem, SUPABASE_API_KEY, MIN_ANALYSIS_INTERVAL, ENCODER_OPTIONS, LIGHT_PINS,
+                 event_sink, GPIO)
+from logic.direction import Direction
+from logic.corridor import CorridorCoordinator
+from logic.policy import create_policy
+from logic.forecast import ArrivalForecaster
+from logic.metrics import REGISTRY, METRICS_MIMETYPE
+from vision.encoder import FrameEncoder
+from recording.timeseries import TimeSeriesStore
+
+logger = logging.getLogger(__name__)
+
+IDLE_WAIT = 0.02  # Seconds a worker sleeps after a full pass with no pending work
+CORRIDOR_INTERVAL = 300  # Seconds between green-wave plan recomputations
+METRICS_PORT = 9100  # Port of the /metrics endpoint, unless the config sets "metrics_port"
+
+metrics_app = Flask(__name__)
+
+
+@metrics_app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint covering every junction of this process"""
+    return Response(REGISTRY.render(), mimetype=METRICS_MIMETYPE)
+
+
+def load_config(path):
+    """
+    Read a JSON junction config. Every junction of a multi-junction config
+    needs its own "lights" pins. Example:
+    {
+      "workers": 8,
+      "max_inflight_per_junction": 2,
+      "timeseries_db": "traffic_metrics.db",
+      "metrics_port": 9100,
+      "junctions": [
+        {"id": "main-1st",
+         "cameras": {"NORTH": 0, "EAST": 1, "SOUTH": 2, "WEST": 3},
+         "lights": {"NORTH": [2, 3, 4], "EAST": [17, 27, 22], "SOUTH": [10, 9, 11], "WEST": [5, 6, 13]},
+         "gsm_port": null, "batch_vision": true, "local_counting": false, "policy": "max_pressure",
+         "forecast": true}
+      ],
+      "corridors": [
+        {"junctions": ["main-1st", "main-2nd"], "travel_times": [35], "arterial": "NORTH"}
+      ]
+    }
+    """
+    with open(path) as config_file:
+        config = json.load(config_file)
+    for junction in config.get("junctions", []):
+        junction["cameras"] = {Direction[name.upper()]: port for name, port in junction["cameras"].items()}
+        if "lights" in junction:
+            junction["lights"] = {Direction[name.upper()]: tuple(pins) for name, pins in junction["lights"].items()}
+    for corridor in config.get("corridors", []):
+        corridor["arterial"] = Direction[corridor.get("arterial", "NORTH").upper()]
+    return config
+
+
+def check_light_pins(entries):
+    """
+    Raise ValueError unless every junction drives its own GPIO pins. Only a
+    lone junction may omit "lights" and fall back to the default LIGHT_PINS.
+    """
+    owners = {}
+    for entry in entries:
+        lights = entry.get("lights")
+        if lights is None:
+            if len(entries) > 1:
+                raise ValueError(f"Junction {entry['id']} needs its own \"lights\" pins")
+            lights = LIGHT_PINS
+        for direction, pins in lights.items():
+            for pin in pins:
+                owner = owners.setdefault(pin, (entry["id"], direction))
+                if owner != (entry["id"], direction):
+                    raise ValueError(f"GPIO pin {pin} of junction {entry['id']} {direction.name} "
+                                     f"is already used by junction {owner[0]} {owner[1].name}")
+
+
+class JunctionController:
+    """
+    Runs several IntelligentTrafficSystem junctions over one shared pool of
+    analysis workers. Workers take turns across junctions and each junction
+    may have at most max_inflight vision requests at once, so a busy junction
+    cannot starve the others.
+    """
+    def __init__(self, junctions, num_workers=4, max_inflight=2, corridors=None,
+                 corridor_interval=CORRIDOR_INTERVAL, timeseries=None):
+        self.junctions = junctions  # junction_id -> IntelligentTrafficSystem
+        self.order = list(junctions.values())
+        self.num_workers = num_workers
+        self.max_inflight = max_inflight
+        self.inflight = {junction.junction_id: 0 for junction in self.order}
+        self.served = {junction.junction_id: 0 for junction in self.order}
+        self.cursor = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.corridor_interval = corridor_interval
+        self.timeseries = timeseries  # Store shared by every junction, closed on stop()
+        # Optional green-wave coordination across adjacent junctions
+        self.coordinators = [
+            CorridorCoordinator([(junction_id, junctions[junction_id].decision_module)
+                                 for junction_id in corridor["junctions"]],
+                                corridor["travel_times"], arterial=corridor["arterial"])
+            for corridor in corridors or []
+        ]
+
+    @classmethod
+    def from_config(cls, config, api_key=SUPABASE_API_KEY):
+        check_light_pins(config["junctions"])
+        timeseries = TimeSeriesStore(config["timeseries_db"]) if config.get("timeseries_db") else None
+        junctions = {}
+        for entry in config["junctions"]:
+            junction = IntelligentTrafficSystem(
+                entry["cameras"], config.get("api_key", api_key),
+                gsm_port=entry.get("gsm_port"),
+                batch_vision=entry.get("batch_vision", False),
+                local_counting=entry.get("local_counting", False),
+                min_analysis_interval=entry.get("min_analysis_interval", MIN_ANALYSIS_INTERVAL),
+                detector_model=entry.get("detector_model"),
+                encoder=FrameEncoder(**ENCODER_OPTIONS),
+                light_pins=entry.get("lights"),
+                junction_id=entry["id"],
+                shared_workers=True,
+                policy=create_policy(entry.get("policy", "greedy")),
+                timeseries=timeseries,
+                forecaster=ArrivalForecaster() if entry.get("forecast") else None)
+            junctions[entry["id"]] = junction
+        return cls(junctions, config.get("workers", 4), config.get("max_inflight_per_junction", 2),
+                   corridors=config.get("corridors"),
+                   corridor_interval=config.get("corridor_interval", CORRIDOR_INTERVAL),
+                   timeseries=timeseries)
+
+    def _acquire_slot(self):
+        """Pick the next junction in round-robin order that is below its in-flight cap"""
+        with self.lock:
+            for _ in range(len(self.order)):
+                junction = self.order[self.cursor]
+                self.cursor = (self.cursor + 1) % len(self.order)
+                if self.inflight[junction.junction_id] < self.max_inflight:
+                    self.inflight[junction.junction_id] += 1
+                    return junction
+        return None
+
+    def _release_slot(self, junction, did_work):
+        with self.lock:
+            self.inflight[junction.junction_id] -= 1
+            if did_work:
+                self.served[junction.junction_id] += 1
+
+    def _worker(self):
+        idle_passes = 0
+        while not self.stop_event.is_set():
+            junction = self._acquire_slot()
+            did_work = False
+            if junction is not None:
+                try:
+                    did_work = junction.analyze_pending(timeout=0)
+                except Exception as e:
+                    logger.error(f"[{junction.junction_id}] Analysis failed: {e}")
+                finally:
+                    self._release_slot(junction, did_work)
+            idle_passes = 0 if did_work else idle_passes + 1
+            if idle_passes >= len(self.order):
+                idle_passes = 0
+                self.stop_event.wait(IDLE_WAIT)
+
+    def _coordinate(self):
+        """Push green-wave plans for every corridor at start, then recompute them periodically"""
+        while True:
+            for coordinator in self.coordinators:
+                try:
+                    coordinator.update()
+                except Exception as e:
+                    logger.error(f"Corridor coordination failed: {e}")
+            if self.stop_event.wait(self.corridor_interval):
+                return
+
+    def start(self):
+        if self.timeseries is not None:
+            self.timeseries.start()
+        for junction in self.order:
+            junction.start()
+        if self.coordinators:
+            thread = threading.Thread(target=self._coordinate, name="corridor-coordinator", daemon=True)
+            self.threads.append(thread)
+            thread.start()
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._worker, name=f"shared-analysis-{i}", daemon=True)
+            self.threads.append(thread)
+            thread.start()
+        logger.info(f"Controlling {len(self.order)} junctions with {self.num_workers} shared workers")
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.threads = []
+        for junction in self.order:
+            junction.stop(cleanup_gpio=False)
+        if self.timeseries is not None:
+            self.timeseries.close()
+        GPIO.cleanup()
+
+    def stats(self):
+        """Analyses completed and requests in flight per junction"""
+        with self.lock:
+            return {junction_id: {"served": self.served[junction_id], "inflight": self.inflight[junction_id]}
+                    for junction_id in self.served}
+
+
+def main(config_path):
+    config = load_config(config_path)
+    controller = JunctionController.from_config(config)
+    event_sink.start()
+    controller.start()
+    try:
+        metrics_app.run(host='0.0.0.0', port=config.get("metrics_port", METRICS_PORT), threaded=True)
+    except KeyboardInterrupt:
+        logger.info("Interrupted. Shutting down junctions...")
+    finally:
+        controller.stop()
+        event_sink.stop()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "junctions.json")
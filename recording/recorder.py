@@ -0,0 +1,129 @@
+import os
+import json
+import logging
+import threading
+import cv2
+from logic.clock import MonotonicClock
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+EVENTS = "events.jsonl"
+
+
+def chunk_name(direction_name, chunk):
+    return f"frames_{direction_name}_{chunk:05d}.jpgs"
+
+
+def index_name(direction_name):
+    return f"frames_{direction_name}.idx"
+
+
+class SessionRecorder:
+    """
+    Records a production run to a directory for offline replay.
+
+    Frames are JPEG-compressed and appended to chunk files per direction
+    (frames_<DIR>_<n>.jpgs), with one JSON line per frame in frames_<DIR>.idx
+    giving its timestamp, chunk, offset and length. Vision responses and
+    decisions go to events.jsonl as timestamped JSON lines.
+    """
+    def __init__(self, path, jpeg_quality=85, chunk_frames=500, frame_interval=0.0,
+                 record_frames=True, clock=None):
+        self.path = path
+        self.record_frames = record_frames  # False records only vision responses and decisions
+        self.jpeg_quality = jpeg_quality
+        self.chunk_frames = chunk_frames  # Frames per chunk file before rotating
+        self.frame_interval = frame_interval  # Minimum seconds between recorded frames per direction
+        self.clock = clock or MonotonicClock()
+        os.makedirs(path, exist_ok=True)
+
+        self.streams = {}  # Direction -> per-direction writer state
+        self.events = open(os.path.join(path, EVENTS), "a")
+        self.events_lock = threading.Lock()
+        self.closed = False
+        with open(os.path.join(path, MANIFEST), "w") as manifest:
+            json.dump({"version": 1, "created": self.clock.wall_time(),
+                       "jpeg_quality": jpeg_quality, "chunk_frames": chunk_frames}, manifest)
+
+    def _stream(self, direction):
+        stream = self.streams.get(direction)
+        if stream is None:
+            stream = self.streams.setdefault(direction, {
+                "lock": threading.Lock(),
+                "chunk": -1,
+                "file": None,
+                "frames": 0,
+                "offset": 0,
+                "last": None,
+                "index": open(os.path.join(self.path, index_name(direction.name)), "a"),
+            })
+        return stream
+
+    def record_frame(self, direction, frame, timestamp=None):
+        """Compress and append one camera frame; returns False if it was skipped"""
+        if not self.record_frames:
+            return False
+        timestamp = self.clock.wall_time() if timestamp is None else timestamp
+        stream = self._stream(direction)
+        with stream["lock"]:
+            if self.closed:
+                return False
+            if stream["last"] is not None and timestamp - stream["last"] < self.frame_interval:
+                return False
+            ok, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+            if not ok:
+                logger.warning(f"Failed to encode {direction.name} frame for recording")
+                return False
+            if stream["file"] is None or stream["frames"] >= self.chunk_frames:
+                self._rotate(direction, stream)
+            data = buffer.tobytes()
+            stream["file"].write(data)
+            stream["index"].write(json.dumps({"t": timestamp, "chunk": stream["chunk"],
+                                              "offset": stream["offset"], "length": len(data)}) + "\n")
+            stream["offset"] += len(data)
+            stream["frames"] += 1
+            stream["last"] = timestamp
+        return True
+
+    def _rotate(self, direction, stream):
+        if stream["file"] is not None:
+            stream["file"].close()
+        stream["chunk"] += 1
+        stream["file"] = open(os.path.join(self.path, chunk_name(direction.name, stream["chunk"])), "wb")
+        stream["frames"] = 0
+        stream["offset"] = 0
+
+    def _event(self, event):
+        with self.events_lock:
+            if not self.closed:
+                self.events.write(json.dumps(event) + "\n")
+
+    def record_vision(self, direction, response, captured_at=None, timestamp=None):
+        """Record a vision model response for the frame captured at captured_at"""
+        self._event({"type": "vision", "t": self.clock.wall_time() if timestamp is None else timestamp,
+                     "direction": direction.name, "frame_t": captured_at, "response": response})
+
+    def record_decision(self, decision_module, vehicle_counts, emergency_direction=None,
+                        accident_location=None, timestamp=None):
+        """Record the inputs and resulting signal state of one decision"""
+        self._event({
+            "type": "decision",
+            "t": self.clock.wall_time() if timestamp is None else timestamp,
+            "counts": {direction.name: count for direction, count in vehicle_counts.items()},
+            "emergency": emergency_direction.name if emergency_direction else None,
+            "accident": accident_location.name if accident_location else None,
+            "phase": decision_module.phase,
+            "green": [direction.name for direction in decision_module.current_phase],
+        })
+
+    def close(self):
+        with self.events_lock:
+            self.closed = True
+            self.events.close()
+        for stream in list(self.streams.values()):
+            with stream["lock"]:
+                if stream["file"] is not None:
+                    stream["file"].close()
+                stream["index"].close()
+        logger.info(f"Recording saved to {self.path}")
@@ -0,0 +1,276 @@
+import os
+import sys
+import json
+import mmap
+import bisect
+import logging
+import argparse
+import time
+import threading
+from collections import deque
+import numpy as np
+import cv2
+from logic.direction import Direction
+from logic.clock import MonotonicClock, VirtualClock
+from recording.recorder import MANIFEST, EVENTS, SessionRecorder, chunk_name, index_name
+
+logger = logging.getLogger(__name__)
+
+
+class Recording:
+    """Read-only view of a SessionRecorder directory; frame chunks are memory-mapped"""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as manifest:
+            self.manifest = json.load(manifest)
+        self.frames = {}  # Direction -> list of index entries, in timestamp order
+        for direction in Direction:
+            index_path = os.path.join(path, index_name(direction.name))
+            if os.path.exists(index_path):
+                with open(index_path) as index:
+                    entries = [json.loads(line) for line in index if line.strip()]
+                if entries:
+                    self.frames[direction] = entries
+        self.events = []
+        events_path = os.path.join(path, EVENTS)
+        if os.path.exists(events_path):
+            with open(events_path) as events:
+                self.events = [json.loads(line) for line in events if line.strip()]
+
+        # Vision responses per direction, ordered by the capture time of their frame
+        self.responses = {}
+        for event in self.events:
+            if event["type"] == "vision":
+                key = event["frame_t"] if event["frame_t"] is not None else event["t"]
+                self.responses.setdefault(Direction[event["direction"]], []).append((key, event["response"]))
+        for entries in self.responses.values():
+            entries.sort(key=lambda entry: entry[0])
+
+        self.maps = {}
+        self.maps_lock = threading.Lock()
+
+    @property
+    def directions(self):
+        return list(self.frames)
+
+    @property
+    def start_time(self):
+        return min(entries[0]["t"] for entries in self.frames.values()) if self.frames else 0.0
+
+    def decisions(self):
+        return [event for event in self.events if event["type"] == "decision"]
+
+    def _map(self, direction, chunk):
+        key = (direction, chunk)
+        with self.maps_lock:
+            mapped = self.maps.get(key)
+            if mapped is None:
+                with open(os.path.join(self.path, chunk_name(direction.name, chunk)), "rb") as chunk_file:
+                    mapped = mmap.mmap(chunk_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.maps[key] = mapped
+            return mapped
+
+    def frame(self, direction, i):
+        """Decode the i-th recorded frame of a direction"""
+        entry = self.frames[direction][i]
+        data = np.frombuffer(self._map(direction, entry["chunk"]), dtype=np.uint8,
+                             count=entry["length"], offset=entry["offset"])
+        return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+    def response_at(self, direction, timestamp):
+        """Latest vision response recorded for a frame captured at or before timestamp"""
+        entries = self.responses.get(direction)
+        if not entries:
+            return None
+        i = bisect.bisect_right(entries, timestamp, key=lambda entry: entry[0]) - 1
+        if i < 0:
+            # Every response was recorded for a later frame
+            return None
+        return entries[i][1]
+
+    def close(self):
+        with self.maps_lock:
+            for mapped in self.maps.values():
+                mapped.close()
+            self.maps = {}
+
+
+class ReplayTimeline:
+    """
+    Shared playback position of a recording's cameras. A camera returns its
+    next frame only when that frame is the earliest still pending across
+    directions, so directions stay in recorded order whatever their thread
+    timing; a direction that stops reading for stall_timeout seconds is
+    passed over. speed paces playback against a real clock (None plays as
+    fast as possible) and the optional virtual clock follows the recorded
+    timestamps, so control logic sees recorded time rather than playback time.
+    """
+    def __init__(self, recording, speed=1.0, clock=None, virtual_clock=None, stall_timeout=1.0):
+        self.recording = recording
+        self.speed = speed
+        self.clock = clock or MonotonicClock()
+        self.virtual_clock = virtual_clock
+        self.stall_timeout = stall_timeout
+        self.start_time = recording.start_time
+        self.started_at = None
+        self.next_times = {direction: entries[0]["t"] for direction, entries in recording.frames.items()}
+        self.condition = threading.Condition()
+
+    def wait_turn(self, direction, timestamp):
+        """Block until the frame recorded at timestamp is due, then move the clocks to it"""
+        deadline = time.monotonic() + self.stall_timeout
+        with self.condition:
+            while timestamp > min(self.next_times.values()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            if self.started_at is None:
+                self.started_at = self.clock.now()
+        if self.speed:
+            delay = self.started_at + (timestamp - self.start_time) / self.speed - self.clock.now()
+            if delay > 0:
+                self.clock.sleep(delay)
+        if self.virtual_clock is not None:
+            self.virtual_clock.advance_to(timestamp - self.start_time)
+
+    def advance(self, direction, next_timestamp):
+        """Record the next frame a direction will ask for (inf once it has finished)"""
+        with self.condition:
+            self.next_times[direction] = next_timestamp
+            self.condition.notify_all()
+
+
+class ReplayCamera:
+    """
+    cv2.VideoCapture stand-in that plays one direction of a Recording through
+    a ReplayTimeline shared by all cameras of the recording. timestamp is the
+    recorded capture time of the last frame returned, and frame_time() maps a
+    returned frame back to its recorded time. Playback pacing happens in
+    wait_frame(), which the capture loop calls outside its timed read.
+    """
+    def __init__(self, recording, direction, timeline):
+        self.recording = recording
+        self.direction = direction
+        self.timeline = timeline
+        self.position = 0
+        self.timestamp = None
+        self.waited = False  # wait_frame() already ran for the next read
+        self.recent = deque(maxlen=16)  # (frame, recorded time) of the latest frames returned
+        self.opened = direction in recording.frames
+
+    def isOpened(self):
+        return self.opened
+
+    def wait_frame(self):
+        """Block until the next recorded frame is due"""
+        entries = self.recording.frames.get(self.direction, [])
+        if self.opened and self.position < len(entries):
+            self.timeline.wait_turn(self.direction, entries[self.position]["t"])
+        self.waited = True
+
+    def read(self):
+        entries = self.recording.frames.get(self.direction, [])
+        if not self.opened or self.position >= len(entries):
+            self.release()
+            return False, None
+        if not self.waited:
+            self.wait_frame()
+        self.waited = False
+        timestamp = entries[self.position]["t"]
+        frame = self.recording.frame(self.direction, self.position)
+        self.position += 1
+        self.timeline.advance(self.direction, entries[self.position]["t"]
+                              if self.position < len(entries) else float("inf"))
+        self.timestamp = timestamp
+        if frame is not None:
+            self.recent.append((frame, timestamp))
+        return frame is not None, frame
+
+    def frame_time(self, frame):
+        """Recorded capture time of a frame this camera returned recently, or None"""
+        for returned, timestamp in reversed(self.recent):
+            if returned is frame:
+                return timestamp
+        return None
+
+    def release(self):
+        if self.opened:
+            self.opened = False
+            self.timeline.advance(self.direction, float("inf"))
+
+
+class ReplayVisionClient:
+    """
+    VisionModelClient stand-in that answers with the response recorded for the
+    frame it is given (looked up by that frame's recorded capture time), so no
+    API calls are made
+    """
+    def __init__(self, recording, cameras):
+        self.recording = recording
+        self.cameras = cameras  # Direction -> ReplayCamera
+
+    def analyze_frame(self, frame, direction):
+        camera = self.cameras.get(direction)
+        timestamp = camera.frame_time(frame) if camera is not None else None
+        if timestamp is None:
+            return None
+        return self.recording.response_at(direction, timestamp)
+
+    def analyze_frames(self, frames_by_direction):
+        return {direction: self.analyze_frame(frame, direction)
+                for direction, frame in frames_by_direction.items()}
+
+
+def replay_cameras(recording, speed=1.0, clock=None, virtual_clock=None):
+    timeline = ReplayTimeline(recording, speed, clock, virtual_clock)
+    return {direction: ReplayCamera(recording, direction, timeline) for direction in recording.directions}
+
+
+def replay(path, speed=1.0, output=None, use_recorded_responses=True, **system_options):
+    """
+    Run IntelligentTrafficSystem over a recording until every camera is
+    exhausted. The system runs on a VirtualClock that follows the recorded
+    frame times, so signal timing matches the recording at any speed. With
+    use_recorded_responses=False the live vision client is used instead, e.g.
+    to compare a new prompt or model against the recording.
+    Decisions of the replay are written to output (a new recording directory)
+    when given. Returns the Recording.
+    """
+    from app import IntelligentTrafficSystem, SUPABASE_API_KEY
+
+    recording = Recording(path)
+    clock = system_options.setdefault("clock", VirtualClock(epoch=recording.start_time))
+    cameras = replay_cameras(recording, speed, virtual_clock=clock)
+    if use_recorded_responses:
+        system_options.setdefault("vision_client", ReplayVisionClient(recording, cameras))
+    recorder = SessionRecorder(output, record_frames=False, clock=clock) if output else None
+    system = IntelligentTrafficSystem(cameras, SUPABASE_API_KEY, recorder=recorder, **system_options)
+    system.start()
+    try:
+        while any(camera.isOpened() for camera in cameras.values()):
+            system.stop_event.wait(0.1)
+        # Let the last results reach the decision stage
+        system.stop_event.wait(1.0)
+    finally:
+        system.stop()
+        if recorder is not None:
+            recorder.close()
+        recording.close()
+    logger.info(f"Replayed {sum(len(f) for f in recording.frames.values())} frames from {path}")
+    return recording
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded junction run")
+    parser.add_argument("path")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed; 0 for as fast as possible")
+    parser.add_argument("--output", help="Directory to record the replay's decisions into")
+    parser.add_argument("--live-vision", action="store_true", help="Call the vision API instead of recorded responses")
+    args = parser.parse_args(argv)
+    replay(args.path, speed=args.speed or None, output=args.output,
+           use_recorded_responses=not args.live_vision)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
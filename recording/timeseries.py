@@ -0,0 +1,177 @@
+import logging
+import sqlite3
+import threading
+from logic.clock import MonotonicClock
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = (1, 60, 3600)  # Seconds per bucket: raw 1 s samples, 1 min and 1 h rollups
+DEFAULT_RETENTION = {1: 2 * 86400, 60: 30 * 86400, 3600: None}  # Seconds kept per resolution (None = forever)
+AGGREGATES = {
+    "mean": "SUM(sum) / SUM(count)",
+    "sum": "SUM(sum)",
+    "min": "MIN(min)",
+    "max": "MAX(max)",
+    "count": "SUM(count)",
+}
+
+
+class TimeSeriesStore:
+    """
+    Embedded time-series store for per-junction, per-direction metrics in
+    SQLite (WAL mode). Samples are aggregated in memory into 1 s buckets and
+    flushed in one transaction that also upserts the 1 min and 1 h rollups,
+    so downsampled series are always current without a separate compaction.
+    Each bucket keeps count, sum, min and max.
+    """
+    def __init__(self, db_path, flush_interval=1.0, retention=None, clock=None):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        self.clock = clock or MonotonicClock()
+        self.pending = {}  # (second, junction, direction, metric) -> [count, sum, min, max]
+        self.lock = threading.Lock()
+        self.db_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_purge = 0.0
+
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS series ("
+            "resolution INTEGER NOT NULL, junction TEXT NOT NULL, direction TEXT NOT NULL, "
+            "metric TEXT NOT NULL, bucket INTEGER NOT NULL, "
+            "count INTEGER NOT NULL, sum REAL NOT NULL, min REAL NOT NULL, max REAL NOT NULL, "
+            "PRIMARY KEY (resolution, metric, junction, direction, bucket)) WITHOUT ROWID")
+        self.db.commit()
+
+    def start(self):
+        """Flush pending samples in the background"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="timeseries-flush", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+        self.flush()
+
+    def close(self):
+        self.stop()
+        with self.db_lock:
+            self.db.close()
+
+    def _run(self):
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Time-series flush failed: {e}")
+
+    def record(self, junction, direction, metric, value, timestamp=None):
+        """Add one sample; direction may be a Direction, a name or None for junction-wide metrics"""
+        timestamp = self.clock.wall_time() if timestamp is None else timestamp
+        name = getattr(direction, "name", direction) or ""
+        key = (int(timestamp), junction, name, metric)
+        value = float(value)
+        with self.lock:
+            bucket = self.pending.get(key)
+            if bucket is None:
+                self.pending[key] = [1, value, value, value]
+            else:
+                bucket[0] += 1
+                bucket[1] += value
+                bucket[2] = min(bucket[2], value)
+                bucket[3] = max(bucket[3], value)
+
+    def record_many(self, junction, metric, values, timestamp=None):
+        """Record a Direction -> value mapping under one timestamp"""
+        timestamp = self.clock.wall_time() if timestamp is None else timestamp
+        for direction, value in values.items():
+            self.record(junction, direction, metric, value, timestamp)
+
+    def flush(self):
+        """Write pending 1 s buckets and fold them into every rollup"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return 0
+        rows = [(resolution, junction, direction, metric, second - second % resolution, *stats)
+                for (second, junction, direction, metric), stats in pending.items()
+                for resolution in RESOLUTIONS]
+        with self.db_lock:
+            self.db.executemany(
+                "INSERT INTO series (resolution, junction, direction, metric, bucket, count, sum, min, max) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (resolution, metric, junction, direction, bucket) DO UPDATE SET "
+                "count = count + excluded.count, sum = sum + excluded.sum, "
+                "min = MIN(min, excluded.min), max = MAX(max, excluded.max)", rows)
+            self.db.commit()
+        now = self.clock.wall_time()
+        if now - self.last_purge >= 60:
+            self.last_purge = now
+            self.purge(now)
+        return len(pending)
+
+    def purge(self, now=None):
+        """Drop buckets older than each resolution's retention"""
+        now = self.clock.wall_time() if now is None else now
+        with self.db_lock:
+            for resolution, keep in self.retention.items():
+                if keep is not None:
+                    self.db.execute("DELETE FROM series WHERE resolution = ? AND bucket < ?",
+                                    (resolution, int(now - keep)))
+            self.db.commit()
+
+    def pick_resolution(self, start, end, max_points=500):
+        """Finest resolution that returns at most max_points buckets per series"""
+        for resolution in RESOLUTIONS:
+            if (end - start) / resolution <= max_points:
+                return resolution
+        return RESOLUTIONS[-1]
+
+    def _filters(self, metric, start, end, junction, direction, resolution):
+        clauses = ["resolution = ?", "metric = ?", "bucket >= ?", "bucket < ?"]
+        params = [resolution, metric, int(start) - int(start) % resolution, end]
+        if junction is not None:
+            clauses.append("junction = ?")
+            params.append(junction)
+        if direction is not None:
+            clauses.append("direction = ?")
+            params.append(getattr(direction, "name", direction))
+        return " AND ".join(clauses), params
+
+    def query(self, metric, start, end, junction=None, direction=None, resolution=None,
+              agg="mean", max_points=500):
+        """
+        Range query: returns [(bucket_start, direction, value)] ordered by time.
+        Without a resolution the finest one giving at most max_points buckets is used.
+        """
+        if agg not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{agg}', expected one of {sorted(AGGREGATES)}")
+        self.flush()
+        resolution = resolution or self.pick_resolution(start, end, max_points)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution}, expected one of {RESOLUTIONS}")
+        where, params = self._filters(metric, start, end, junction, direction, resolution)
+        with self.db_lock:
+            return self.db.execute(
+                f"SELECT bucket, direction, {AGGREGATES[agg]} FROM series WHERE {where} "
+                f"GROUP BY bucket, direction ORDER BY bucket, direction", params).fetchall()
+
+    def aggregate(self, metric, start, end, junction=None, direction=None, agg="mean"):
+        """Single aggregate over a range, read from the coarsest resolution that fits it exactly"""
+        if agg not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{agg}', expected one of {sorted(AGGREGATES)}")
+        self.flush()
+        resolution = next((r for r in reversed(RESOLUTIONS) if start % r == 0 and end % r == 0), RESOLUTIONS[0])
+        where, params = self._filters(metric, start, end, junction, direction, resolution)
+        with self.db_lock:
+            row = self.db.execute(f"SELECT {AGGREGATES[agg]} FROM series WHERE {where}", params).fetchone()
+        return row[0] if row else None
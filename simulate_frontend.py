@@ -5,7 +5,8 @@ import random
 import time
 import threading
 import math
-from flask import Flask, jsonify
+import json
+from flask import Flask, Response, request
 from flask_cors import CORS
 from enum import Enum
 from collections import deque
@@ -18,6 +19,8 @@ sys.modules['RPi.GPIO'] = MockGPIOModule
 # --- Mock Dependencies (Not used in the new dynamic simulation but kept for context) ---
 from logic.direction import Direction
 from components.traffic_lights import TrafficLight
+from logic.clock import MonotonicClock
+from recording.timeseries import TimeSeriesStore
 # The following imports are now effectively replaced by the new simulation logic
 # from detection.vehicle_counter import VehicleCounter
 # from detection.accident import AccidentDetector
@@ -33,8 +36,59 @@ class MockTrafficLight(TrafficLight):
     def set_green(self): pass
     def turn_off(self): pass
 
+SIMULATION_METRICS_DB = "simulation_metrics.db"  # History of every simulated cycle, with 1 min / 1 h rollups
+STREAM_HEARTBEAT_SECONDS = 15  # Comment line sent to idle SSE clients to keep proxies from closing them
+
+
+class LogFeed:
+    """
+    Thread-safe store of recent simulation logs for many dashboard clients.
+    Each entry gets an increasing id and is serialized to JSON once when it is
+    added; clients then fetch or stream only entries newer than their cursor,
+    plus per-direction state deltas.
+    """
+    STATE_FIELDS = ("cycle", "vehicle_count", "alerts", "is_accident", "is_emergency")
+
+    def __init__(self, maxlen=200):
+        self.entries = deque(maxlen=maxlen)  # (id, serialized log, serialized state delta), oldest first
+        self.last_id = 0
+        self.states = {}  # Direction name -> latest state fields
+        self.condition = threading.Condition()
+
+    def append(self, log):
+        direction = log["direction"]
+        previous = self.states.get(direction, {})
+        state = {field: log[field] for field in self.STATE_FIELDS}
+        delta = {field: value for field, value in state.items() if previous.get(field) != value}
+        delta["direction"] = direction
+        with self.condition:
+            self.last_id += 1
+            log = dict(log, id=self.last_id)
+            self.states[direction] = state
+            self.entries.append((self.last_id, json.dumps(log), json.dumps(delta)))
+            self.condition.notify_all()
+
+    def since(self, cursor=0):
+        """Return the latest id and the entries newer than cursor, oldest first"""
+        with self.condition:
+            if cursor >= self.last_id:
+                return self.last_id, []
+            return self.last_id, [entry for entry in self.entries if entry[0] > cursor]
+
+    def wait(self, cursor, timeout):
+        """Block until an entry newer than cursor exists or timeout passes"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.last_id > cursor, timeout)
+            return self.last_id
+
+    def snapshot(self):
+        with self.condition:
+            return self.last_id, json.dumps(self.states)
+
+
 # Thread-safe storage for simulation logs
-simulation_logs = deque(maxlen=200) # Increased maxlen for better history
+simulation_logs = LogFeed(maxlen=200) # Increased maxlen for better history
+metrics_store = None  # TimeSeriesStore holding the full history, opened by start_simulation()
 
 # --- New Dynamic Simulation Core ---
 
@@ -66,7 +120,9 @@ class SimulatedTrafficSystem:
     MAX_VEHICLES_ACCIDENT = 60  # The number of cars during an accident jam
     SIMULATION_DELAY_SECONDS = 2 # Slower simulation for more realistic pacing
 
-    def __init__(self):
+    def __init__(self, clock=None, metrics_store=None):
+        self.clock = clock or MonotonicClock()
+        self.metrics_store = metrics_store
         # Initialize a state for each direction
         self.lanes = {direction: LaneState(direction) for direction in Direction}
         self.cycle_count = 0
@@ -166,9 +222,14 @@ class SimulatedTrafficSystem:
                     "is_accident": lane.has_accident,
                     "is_emergency": lane.has_emergency
                 }
-                simulation_logs.appendleft(log)
+                simulation_logs.append(log)
+                if self.metrics_store is not None:
+                    now = self.clock.wall_time()
+                    self.metrics_store.record("simulation", direction, "vehicle_count", lane.vehicle_count, now)
+                    self.metrics_store.record("simulation", direction, "accident", lane.has_accident, now)
+                    self.metrics_store.record("simulation", direction, "emergency", lane.has_emergency, now)
             
-            time.sleep(self.SIMULATION_DELAY_SECONDS)
+            self.clock.sleep(self.SIMULATION_DELAY_SECONDS)
 
 # --- Flask App ---
 app = Flask(__name__)
@@ -176,15 +237,76 @@ CORS(app)
 
 @app.route('/logs')
 def logs():
-    return jsonify({"logs": list(simulation_logs)})
+    """Logs newest first; ?since=<cursor> returns only entries added after that cursor"""
+    cursor = request.args.get('since', default=0, type=int)
+    last_id, entries = simulation_logs.since(cursor)
+    # Entries are pre-serialized, so the body is assembled without re-encoding every log
+    body = '{"logs": [%s], "cursor": %d}' % (", ".join(log for _, log, _ in reversed(entries)), last_id)
+    return Response(body, mimetype='application/json')
+
+@app.route('/stream')
+def stream():
+    """
+    Server-Sent Events feed: a 'snapshot' of every direction's state, then a
+    'log' and a 'state' delta event per new entry. Reconnecting clients resume
+    from Last-Event-ID (or ?since) without missing entries still in the buffer.
+    """
+    cursor = request.headers.get('Last-Event-ID', type=int)
+    if cursor is None:
+        cursor = request.args.get('since', default=0, type=int)
+
+    def events(cursor):
+        snapshot_id, states = simulation_logs.snapshot()
+        yield f"event: snapshot\ndata: {states}\n\n"
+        while True:
+            _, entries = simulation_logs.since(cursor)
+            for entry_id, log, delta in entries:
+                yield f"id: {entry_id}\nevent: log\ndata: {log}\n\n"
+                # Buffered entries older than the snapshot are already reflected in it
+                if entry_id > snapshot_id:
+                    yield f"event: state\ndata: {delta}\n\n"
+                cursor = entry_id
+            if not entries and simulation_logs.wait(cursor, STREAM_HEARTBEAT_SECONDS) <= cursor:
+                yield ": heartbeat\n\n"
+
+    return Response(events(cursor), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/')
 def index():
     # A simple status page to confirm the server is running
     return "<h1>Traffic Simulation Backend is Running</h1><p>Access logs at the <a href='/logs'>/logs</a> endpoint.</p>"
 
+@app.route('/history')
+def history():
+    """
+    Range query over the metric history, e.g.
+    /history?metric=vehicle_count&direction=NORTH&start=<epoch>&end=<epoch>&agg=max
+    Defaults to the last hour; the bucket size is picked to keep the series short.
+    """
+    if metrics_store is None:
+        return Response('{"error": "history not enabled"}', status=503, mimetype='application/json')
+    end = request.args.get('end', default=time.time(), type=float)
+    start = request.args.get('start', default=end - 3600, type=float)
+    agg = request.args.get('agg', default='mean')
+    direction = request.args.get('direction')
+    if direction and direction.upper() not in Direction.__members__:
+        return Response('{"error": "unknown direction"}', status=400, mimetype='application/json')
+    try:
+        rows = metrics_store.query(request.args.get('metric', default='vehicle_count'), start, end,
+                                   direction=direction.upper() if direction else None,
+                                   resolution=request.args.get('resolution', type=int), agg=agg)
+    except ValueError as e:
+        return Response(json.dumps({"error": str(e)}), status=400, mimetype='application/json')
+    return Response(json.dumps({"points": [{"t": bucket, "direction": name, "value": value}
+                                           for bucket, name, value in rows]}),
+                    mimetype='application/json')
+
 def start_simulation():
-    sim = SimulatedTrafficSystem()
+    global metrics_store
+    metrics_store = TimeSeriesStore(SIMULATION_METRICS_DB)
+    metrics_store.start()
+    sim = SimulatedTrafficSystem(metrics_store=metrics_store)
     # Run the simulation in a daemon thread so it stops when the main app stops
     t = threading.Thread(target=sim.run_simulation, daemon=True)
     t.start()
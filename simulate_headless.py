@@ -0,0 +1,228 @@
+# Headless traffic simulator
+# Benchmarks decision policies without cameras, GPIO or wall-clock waits: the
+# real DecisionModule is driven on a virtual clock while vehicle arrivals,
+# departures on green, accidents and emergencies are simulated with NumPy for
+# many random seeds at once.
+
+import sys
+import time
+import logging
+import argparse
+import numpy as np
+from components.traffic_lights import TrafficLight
+from logic.decision import DecisionModule, GREEN
+from logic.direction import Direction
+from logic.policy import POLICIES, create_policy
+from logic.clock import VirtualClock
+from logic.forecast import ArrivalForecaster
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = list(Direction)
+
+
+class VirtualTrafficLight(TrafficLight):
+    """Traffic light that drives no pins"""
+    def __init__(self):
+        super().__init__(None, None, None)
+
+    def setup(self): pass
+    def set_red(self): pass
+    def set_yellow(self): pass
+    def set_green(self): pass
+    def turn_off(self): pass
+
+
+class HeadlessSimulation:
+    """
+    Fixed-step simulation of one junction per seed. Queues evolve as NumPy
+    arrays of shape (seeds, directions); each seed has its own DecisionModule,
+    which only runs at perception intervals and at its phase deadlines.
+    """
+    # --- Simulation Tuning Parameters ---
+    ARRIVAL_RATES = (0.12, 0.08, 0.10, 0.06)  # Mean vehicles/second per direction (NORTH, EAST, SOUTH, WEST)
+    PEAK_AMPLITUDE = 0.5  # Relative swing of the time-of-day demand wave
+    DAY_LENGTH = 86400  # Seconds in one period of the demand wave
+    SATURATION_RATE = 0.5  # Vehicles/second discharged by a green approach (1800 veh/h)
+    ACCIDENT_RATE = 1 / 36000  # Accidents per second per approach
+    ACCIDENT_DURATION = 900  # Seconds an accident restricts an approach
+    ACCIDENT_CAPACITY = 0.3  # Fraction of saturation flow left past an accident
+    EMERGENCY_RATE = 1 / 7200  # Emergency vehicles per second per approach
+    EMERGENCY_CLEAR = 8  # Seconds of green an emergency vehicle needs to pass
+
+    def __init__(self, policy="greedy", seeds=32, step=1.0, perception_interval=2.0, seed=0,
+                 forecast=False, warmup_days=0):
+        self.policy_name = policy
+        self.seeds = seeds
+        self.step = step
+        self.perception_interval = perception_interval
+        self.rng = np.random.default_rng(seed)
+        self.warmup_rng = np.random.default_rng(seed + 1)  # Separate stream keeps runs with and without forecasts paired
+        self.clock = VirtualClock(epoch=0.0)  # Shared by every seed's DecisionModule; day starts at 0
+        self.decision_modules = []
+        for _ in range(seeds):
+            lights = {direction: VirtualTrafficLight() for direction in Direction}
+            forecaster = ArrivalForecaster(weekly=False) if forecast else None
+            if forecaster is not None and warmup_days:
+                self._warm_up(forecaster, warmup_days)
+            module = DecisionModule(lights, use_timers=False, policy=create_policy(policy), clock=self.clock,
+                                    forecaster=forecaster)
+            module.initialize_lights()
+            self.decision_modules.append(module)
+
+        shape = (seeds, len(DIRECTIONS))
+        self.queues = np.zeros(shape)
+        self.arrivals = np.zeros(shape)  # Arrivals since the last perception, fed to forecasters
+        self.green = np.zeros(shape, dtype=bool)
+        self.accident_until = np.zeros(shape)
+        self.emergency_since = np.full(shape, np.nan)  # Arrival time of a waiting emergency vehicle
+        self.emergency_served = np.zeros(shape)  # Green seconds given to the waiting emergency vehicle
+        self.emergency_waits = []
+        self.arrived = np.zeros(seeds)
+        self.departed = np.zeros(seeds)
+        self.queue_seconds = np.zeros(seeds)  # Integral of queued vehicles over time
+
+    @property
+    def now(self):
+        return self.clock.now()
+
+    def _mean_rates(self, now):
+        """Expected arrival rate per direction at a simulated time"""
+        phase = 2 * np.pi * now / self.DAY_LENGTH + np.arange(len(DIRECTIONS))
+        return np.asarray(self.ARRIVAL_RATES) * (1 + self.PEAK_AMPLITUDE * np.sin(phase))
+
+    def _warm_up(self, forecaster, days):
+        """Give a forecaster a seasonal profile as if it had observed earlier days"""
+        for day in range(days):
+            for start in range(0, self.DAY_LENGTH, forecaster.slot_seconds):
+                now = start + forecaster.slot_seconds / 2
+                rates = self.warmup_rng.poisson(self._mean_rates(now) * forecaster.slot_seconds)
+                forecaster.observe(rates, forecaster.slot_seconds, now)
+
+    def _refresh_green(self, index):
+        module = self.decision_modules[index]
+        self.green[index] = False
+        if module.phase == GREEN:
+            for direction in module.current_phase:
+                self.green[index, direction.value] = True
+
+    def _perceive(self, index, counts, emergency, accident):
+        """Feed one seed's junction state to its DecisionModule"""
+        emergency_direction = DIRECTIONS[emergency[index]] if emergency[index] >= 0 else None
+        accident_direction = DIRECTIONS[accident[index]] if accident[index] >= 0 else None
+        module = self.decision_modules[index]
+        module.process_perception_data(
+            dict(zip(DIRECTIONS, counts[index])),
+            emergency_direction is not None, emergency_direction,
+            accident_direction is not None, accident_direction,
+            arrivals=dict(zip(DIRECTIONS, self.arrivals[index])) if module.forecaster is not None else None)
+
+    @staticmethod
+    def _first_active(mask):
+        """Index of the first active direction per seed, or -1"""
+        return np.where(mask.any(axis=1), mask.argmax(axis=1), -1).tolist()
+
+    def _advance(self):
+        """Advance vehicles and incidents by one step for every seed"""
+        dt = self.step
+        arrivals = self.rng.poisson(self._mean_rates(self.now) * dt, size=self.queues.shape)
+        self.arrivals += arrivals
+
+        capacity = np.where(self.accident_until > self.now, self.ACCIDENT_CAPACITY, 1.0) * self.SATURATION_RATE * dt
+        departures = np.where(self.green, np.minimum(self.queues, capacity), 0.0)
+        self.queues += arrivals - departures
+        self.arrived += arrivals.sum(axis=1)
+        self.departed += departures.sum(axis=1)
+        self.queue_seconds += self.queues.sum(axis=1) * dt
+
+        # New incidents
+        shape = self.queues.shape
+        new_accidents = (self.rng.random(shape) < self.ACCIDENT_RATE * dt) & (self.accident_until <= self.now)
+        self.accident_until[new_accidents] = self.now + self.ACCIDENT_DURATION
+        waiting = ~np.isnan(self.emergency_since)
+        new_emergencies = (self.rng.random(shape) < self.EMERGENCY_RATE * dt) & ~waiting
+        self.emergency_since[new_emergencies] = self.now
+        self.emergency_served[new_emergencies] = 0.0
+
+        # Emergency vehicles leave after enough green on their approach
+        self.emergency_served += np.where(self.green & waiting, dt, 0.0)
+        cleared = waiting & (self.emergency_served >= self.EMERGENCY_CLEAR)
+        if cleared.any():
+            self.emergency_waits.extend((self.now - self.emergency_since[cleared]).tolist())
+            self.emergency_since[cleared] = np.nan
+
+    def run(self, duration):
+        """Simulate duration seconds of traffic; returns per-seed results"""
+        end = self.now + duration
+        next_perception = self.now
+        deadlines = np.array([m.phase_deadline if m.phase_deadline is not None else np.inf
+                              for m in self.decision_modules])
+        while self.now < end:
+            perceive = self.now >= next_perception
+            if perceive:
+                next_perception += self.perception_interval
+                counts = self.queues.astype(int).tolist()
+                emergency = self._first_active(~np.isnan(self.emergency_since))
+                accident = self._first_active(self.accident_until > self.now)
+            due = np.arange(self.seeds) if perceive else np.flatnonzero(deadlines <= self.now)
+            for index in due:
+                module = self.decision_modules[index]
+                if perceive:
+                    self._perceive(index, counts, emergency, accident)
+                else:
+                    module.tick()
+                deadlines[index] = module.phase_deadline if module.phase_deadline is not None else np.inf
+                self._refresh_green(index)
+            if perceive:
+                self.arrivals[:] = 0
+            self._advance()
+            self.clock.advance(self.step)
+        return self.results()
+
+    def results(self):
+        elapsed = max(self.now, self.step)
+        return {
+            "delay": self.queue_seconds / np.maximum(self.arrived, 1),  # Mean seconds queued per vehicle
+            "queue": self.queue_seconds / elapsed / len(DIRECTIONS),  # Mean vehicles queued per approach
+            "throughput": self.departed / elapsed * 3600,  # Vehicles/hour through the junction
+            "emergency_wait": np.asarray(self.emergency_waits),
+        }
+
+
+def summarize(policy, results, hours, elapsed):
+    waits = results["emergency_wait"]
+    wait = f"{waits.mean():6.1f}s" if len(waits) else "   n/a"
+    seeds = len(results["delay"])
+    return (f"{policy:<13} delay {results['delay'].mean():7.1f}s ±{results['delay'].std():5.1f}  "
+            f"queue {results['queue'].mean():6.1f}  throughput {results['throughput'].mean():7.0f} veh/h  "
+            f"emergency wait {wait}  ({seeds * hours:.0f} sim h in {elapsed:.1f}s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark signal policies on a virtual clock")
+    parser.add_argument("--policies", nargs="+", default=sorted(POLICIES), choices=sorted(POLICIES))
+    parser.add_argument("--seeds", type=int, default=32)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--step", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--forecast", action="store_true", help="Add arrival forecasts to the policies' demand")
+    parser.add_argument("--warmup-days", type=int, default=7, help="Days of history given to each forecaster")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.verbose:
+        # Per-decision switch/emergency/accident logs would dominate the run time
+        logging.getLogger("logic").setLevel(logging.CRITICAL + 1)
+
+    for policy in args.policies:
+        started = time.perf_counter()
+        simulation = HeadlessSimulation(policy, seeds=args.seeds, step=args.step, seed=args.seed,
+                                        forecast=args.forecast, warmup_days=args.warmup_days)
+        results = simulation.run(args.hours * 3600)
+        print(summarize(policy, results, args.hours, time.perf_counter() - started))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -14,7 +14,6 @@ sys.modules['RPi.GPIO'] = MockGPIOModule
 
 import logging
 import random
-import time
 from enum import Enum
 
 # Mock Camera
@@ -59,6 +58,7 @@ from detection.accident import AccidentDetector
 from detection.emergency import EmergencyDetector
 from logic.alert_system import AlertSystem
 from logic.decision import DecisionModule
+from logic.clock import MonotonicClock
 
 # --- Patch TrafficLight to log instead of GPIO ---
 class MockTrafficLight(TrafficLight):
@@ -75,7 +75,8 @@ class MockTrafficLight(TrafficLight):
 
 # --- Simulation System ---
 class SimulatedTrafficSystem:
-    def __init__(self):
+    def __init__(self, clock=None):
+        self.clock = clock or MonotonicClock()
         self.traffic_lights = {
             Direction.NORTH: MockTrafficLight(2, 3, 4),
             Direction.EAST: MockTrafficLight(17, 27, 22),
@@ -88,7 +89,7 @@ class SimulatedTrafficSystem:
         self.vehicle_counter = VehicleCounter()
         self.emergency_detector = EmergencyDetector()
         self.accident_detector = AccidentDetector()
-        self.decision_module = DecisionModule(self.traffic_lights)
+        self.decision_module = DecisionModule(self.traffic_lights, clock=self.clock)
         self.alert_system = None  # Not needed for simulation
 
     def simulate_event(self, direction):
@@ -114,7 +115,7 @@ class SimulatedTrafficSystem:
             print(f"\n=== Simulation Cycle {i+1} ===")
             for direction in Direction:
                 self.simulate_event(direction)
-            time.sleep(1)
+            self.clock.sleep(1)
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
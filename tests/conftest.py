@@ -0,0 +1,20 @@
+import os
+import sys
+import pytest
+
+# Tests import the project's top-level packages (logic, vision, ...) from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.stubs import StubVisionServer, install_mock_gpio  # noqa: E402 (needs the path above)
+
+# app and multi_junction drive RPi.GPIO at import and setup; tests never touch real pins
+install_mock_gpio()
+
+
+@pytest.fixture
+def stub_server():
+    """Local chat-completion and Supabase stand-in answering without delay"""
+    server = StubVisionServer(latency=0.0, jitter=0.0, emergency_rate=0.0)
+    server.start()
+    yield server
+    server.stop()
@@ -0,0 +1,24 @@
+# Traffic light stand-in for tests driving a DecisionModule without GPIO.
+# Kept apart from tests/stubs.py, which the benchmark imports before it mocks
+# RPi.GPIO, so importing the stubs does not bind the real lights module early.
+
+from components.traffic_lights import TrafficLight
+
+
+class RecordingLight(TrafficLight):
+    """TrafficLight that remembers its last state instead of driving GPIO"""
+    def __init__(self):
+        super().__init__(0, 0, 0)
+        self.state = None
+
+    def set_red(self):
+        self.state = "red"
+
+    def set_yellow(self):
+        self.state = "yellow"
+
+    def set_green(self):
+        self.state = "green"
+
+    def turn_off(self):
+        self.state = None
@@ -0,0 +1,172 @@
+# Stand-ins for the hardware and remote services, shared by the tests and the
+# pipeline benchmark: an RPi.GPIO module that records pin writes, a camera
+# returning noise frames and a local server answering chat-completion and
+# Supabase REST requests.
+
+import sys
+import json
+import time
+import types
+import random
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockGPIO(types.ModuleType):
+    """RPi.GPIO stand-in that records pin levels and counts writes"""
+    BCM = "BCM"
+    OUT = "OUT"
+    HIGH = 1
+    LOW = 0
+
+    class PWM:
+        def __init__(self, pin, frequency):
+            self.pin = pin
+            self.frequency = frequency
+
+        def start(self, duty): pass
+        def ChangeDutyCycle(self, duty): pass
+        def stop(self): pass
+
+    def __init__(self):
+        super().__init__("RPi.GPIO")
+        self.pins = {}
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def setmode(self, mode): pass
+
+    def setup(self, pin, mode):
+        self.pins.setdefault(pin, self.LOW)
+
+    def output(self, pin, value):
+        with self.lock:
+            self.pins[pin] = value
+            self.writes += 1
+
+    def cleanup(self): pass
+
+
+def install_mock_gpio():
+    """Route RPi.GPIO imports to a MockGPIO; must run before app is imported"""
+    gpio = MockGPIO()
+    package = types.ModuleType("RPi")
+    package.GPIO = gpio
+    sys.modules["RPi"] = package
+    sys.modules["RPi.GPIO"] = gpio
+    return gpio
+
+
+class NoiseCamera:
+    """cv2.VideoCapture stand-in returning a new random frame on every read"""
+    def __init__(self, width=160, height=120, seed=0):
+        self.shape = (height, width, 3)
+        self.rng = np.random.default_rng(seed)
+        self.reads = 0
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        self.reads += 1
+        return True, self.rng.integers(0, 255, self.shape, dtype=np.uint8)
+
+    def release(self):
+        self.opened = False
+
+
+class StubVisionServer:
+    """
+    Local HTTP server speaking the chat-completion API (structured JSON
+    replies, one entry per direction for batched requests) and accepting
+    Supabase REST inserts, whose rows are kept in rows as (table, row). Each
+    vision reply takes latency +- jitter seconds; error_rate of them fail with 503.
+    """
+    def __init__(self, latency=0.3, jitter=0.1, error_rate=0.0, emergency_rate=0.01, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.emergency_rate = emergency_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+        self.rows = []
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, as with the real API
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+                if self.path.startswith("/rest/v1/"):
+                    table = self.path[len("/rest/v1/"):]
+                    with stub.rng_lock:
+                        stub.rows.extend((table, row) for row in body)
+                    self._reply(201, b"")
+                    return
+                status, reply = stub.complete(body)
+                self._reply(status, json.dumps(reply).encode())
+
+            def _reply(self, status, data):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="stub-vision", daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def _analysis(self, rng):
+        emergency = rng.random() < self.emergency_rate
+        return {
+            "vehicle_count": rng.randint(0, 14),
+            "emergency_vehicle": {"present": emergency, "confidence": 0.9 if emergency else 0.0,
+                                  "type": "ambulance" if emergency else None},
+            "accident": {"detected": False, "indicators": []},
+            "density": rng.choice(("light", "moderate", "heavy")),
+        }
+
+    def complete(self, payload):
+        """Return (status, body) for a chat-completion request, after the simulated latency"""
+        content = payload["messages"][0]["content"]
+        # Batched requests label each image with a "<DIRECTION> direction:" text part
+        names = [part["text"].split()[0] for part in content
+                 if part["type"] == "text" and part["text"].endswith(" direction:")]
+        with self.rng_lock:
+            self.requests += 1
+            delay = max(0.0, self.rng.gauss(self.latency, self.jitter))
+            failed = self.rng.random() < self.error_rate
+            if names:
+                reply = {name: self._analysis(self.rng) for name in names}
+            else:
+                reply = self._analysis(self.rng)
+        time.sleep(delay)
+        if failed:
+            return 503, {"error": {"message": "stub overloaded"}}
+        return 200, {"choices": [{"message": {"role": "assistant", "content": json.dumps(reply)}}]}
@@ -0,0 +1,39 @@
+import json
+import numpy as np
+from logic.direction import Direction
+from vision.analysis import VisionAnalysis
+from vision.client import VisionModelClient
+
+
+def client_for(server, **options):
+    return VisionModelClient(api_url=f"{server.url}/v1/chat/completions", api_key="test",
+                             structured=True, **options)
+
+
+def frame(seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (120, 160, 3), dtype=np.uint8)
+
+
+def test_batch_request_is_split_per_direction(stub_server):
+    client = client_for(stub_server)
+    directions = [Direction.NORTH, Direction.EAST, Direction.WEST]
+    results = client.analyze_frames({direction: frame(i) for i, direction in enumerate(directions)})
+    assert stub_server.requests == 1
+    assert set(results) == set(directions)
+    for response in results.values():
+        assert VisionAnalysis.parse(response).structured
+
+
+def test_split_batch_response_handles_sections_and_missing_directions():
+    reply = "### NORTH\n12 vehicles, heavy traffic\n\n**EAST:**\n2 vehicles"
+    results = VisionModelClient.split_batch_response(reply, [Direction.NORTH, Direction.EAST, Direction.SOUTH])
+    assert results[Direction.NORTH] == "12 vehicles, heavy traffic"
+    assert results[Direction.EAST] == "2 vehicles"
+    assert results[Direction.SOUTH] is None
+
+
+def test_split_batch_response_reads_json_keyed_by_direction():
+    reply = json.dumps({"north": {"vehicle_count": 4}, "WEST": {"vehicle_count": 1}})
+    results = VisionModelClient.split_batch_response(reply, [Direction.NORTH, Direction.WEST])
+    assert json.loads(results[Direction.NORTH]) == {"vehicle_count": 4}
+    assert json.loads(results[Direction.WEST]) == {"vehicle_count": 1}
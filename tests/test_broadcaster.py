@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import app
+from logic.direction import Direction
+from vision.broadcaster import PART_HEADER, FrameBroadcaster
+from vision.encoder import FrameEncoder
+
+
+def frame(seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (120, 160, 3), dtype=np.uint8)
+
+
+@pytest.fixture
+def broadcaster():
+    broadcaster = FrameBroadcaster(FrameEncoder(), max_fps=100, client_timeout=1.0)
+    yield broadcaster
+    broadcaster.stop()
+
+
+def test_every_client_gets_the_same_encoded_part(broadcaster):
+    first, second = broadcaster.subscribe("cam"), broadcaster.subscribe("cam")
+    broadcaster.publish("cam", frame())
+    part = next(first)
+    assert part.startswith(PART_HEADER)
+    assert next(second) is part
+    assert broadcaster.stats()["cam"] == {"subscribers": 2, "encodes": 1}
+    first.close()
+    second.close()
+    assert broadcaster.stats()["cam"]["subscribers"] == 0
+
+
+def test_unwatched_feeds_are_not_encoded(broadcaster):
+    watcher = broadcaster.subscribe("watched")
+    broadcaster.publish("idle", frame(1))
+    broadcaster.publish("watched", frame(2))
+    next(watcher)
+    assert broadcaster.stats()["idle"]["encodes"] == 0
+    watcher.close()
+
+
+def test_slow_client_skips_to_the_newest_frame(broadcaster):
+    client = broadcaster.subscribe("cam")
+    broadcaster.publish("cam", frame(1))
+    next(client)
+    channel = broadcaster.channel("cam")
+    for seed in range(2, 6):
+        broadcaster.publish("cam", frame(seed))
+    # Frames published between reads are not queued; the client moves on to the newest part
+    parts = 1
+    part = next(client)
+    while not (channel.encoded_seq == 5 and part is channel.part):
+        part = next(client)
+        parts += 1
+    assert parts <= 4
+    assert broadcaster.stats()["cam"]["encodes"] <= 5
+    client.close()
+
+
+def test_video_feed_serves_the_north_pipeline_channel(monkeypatch, broadcaster):
+    monkeypatch.setattr(app, "broadcaster", broadcaster)
+    client = app.app.test_client()
+    assert client.get("/video_feed").status_code == 404
+    # The pipeline's capture loop publishes the NORTH camera; the test client reads the first part eagerly
+    broadcaster.publish(Direction.NORTH, frame())
+    response = client.get("/video_feed")
+    assert response.status_code == 200
+    assert response.mimetype == "multipart/x-mixed-replace"
+    assert next(iter(response.response)).startswith(PART_HEADER)
+    response.close()
+    assert client.get("/video_feed/sideways").status_code == 404
@@ -0,0 +1,27 @@
+import numpy as np
+from logic.direction import Direction
+from vision.change_detector import FrameChangeDetector
+
+
+def scene():
+    return np.random.default_rng(0).integers(0, 255, (240, 320, 3), dtype=np.uint8)
+
+
+def test_static_scene_is_skipped_until_stale():
+    detector = FrameChangeDetector(max_staleness=30.0)
+    frame = scene()
+    detector.record(Direction.NORTH, frame, "3 vehicles", now=0.0)
+    assert not detector.should_analyze(Direction.NORTH, frame.copy(), now=10.0)
+    assert detector.should_analyze(Direction.NORTH, frame.copy(), now=30.0)
+
+
+def test_suspected_incident_bypasses_gate_for_its_direction_only():
+    detector = FrameChangeDetector(max_staleness=30.0, suspect_window=20.0)
+    frame = scene()
+    for direction in (Direction.NORTH, Direction.EAST):
+        detector.record(direction, frame, "accident: vehicles stopped", now=0.0)
+    detector.suspect(Direction.NORTH, now=1.0)
+    assert detector.should_analyze(Direction.NORTH, frame.copy(), now=2.0)
+    assert not detector.should_analyze(Direction.EAST, frame.copy(), now=2.0)
+    # The bypass lapses once the suspicion window has passed
+    assert not detector.should_analyze(Direction.NORTH, frame.copy(), now=21.0)
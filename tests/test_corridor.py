@@ -0,0 +1,79 @@
+import threading
+import pytest
+from components.traffic_lights import TrafficLight
+from logic.clock import VirtualClock
+from logic.corridor import CorridorCoordinator
+from logic.decision import DecisionModule
+from logic.direction import Direction
+from logic.policy import (EAST_WEST, NORTH_SOUTH, SINGLE_PHASES, GreedyPolicy, MaxPressurePolicy,
+                          WebsterPolicy)
+from multi_junction import JunctionController
+
+
+def module(policy, clock):
+    lights = {direction: TrafficLight(3 * i, 3 * i + 1, 3 * i + 2) for i, direction in enumerate(Direction)}
+    return DecisionModule(lights, policy=policy, clock=clock)
+
+
+FLOWS = {Direction.NORTH: 600, Direction.SOUTH: 300, Direction.EAST: 200, Direction.WEST: 100}
+
+
+def test_plans_serve_each_junctions_policy_phases():
+    clock = VirtualClock()
+    coordinator = CorridorCoordinator(
+        [("a", module(MaxPressurePolicy(), clock)), ("b", module(GreedyPolicy(), clock))],
+        [30], arterial=Direction.EAST)
+    plans = coordinator.compute_plans({"a": FLOWS, "b": FLOWS})
+    assert [phase for phase, _ in plans["a"].greens] == [EAST_WEST, NORTH_SOUTH]
+    assert [phase for phase, _ in plans["b"].greens][0] == (Direction.EAST,)
+    assert {phase for phase, _ in plans["b"].greens} == set(SINGLE_PHASES)
+    # One common cycle, fully allocated at every junction
+    for plan in plans.values():
+        assert plan.cycle == plans["a"].cycle
+        assert sum(green for _, green in plan.greens) + plan.intergreen * len(plan.greens) == \
+            pytest.approx(plan.cycle)
+    assert plans["b"].offset == 30
+
+
+def test_concurrent_splits_match_webster_policy():
+    clock = VirtualClock()
+    decision = module(WebsterPolicy(), clock)
+    coordinator = CorridorCoordinator([("a", decision)], [], arterial=Direction.NORTH)
+    plan = coordinator.compute_plans({"a": FLOWS})["a"]
+    policy = decision.policy
+    decision.last_vehicle_counts = {direction: flow / 60 for direction, flow in FLOWS.items()}
+    splits = policy.compute_splits(decision)
+    assert plan.cycle == pytest.approx(policy.cycle)
+    assert dict(plan.greens) == pytest.approx(splits)
+
+
+def test_module_follows_plan_phases():
+    clock = VirtualClock()
+    decision = module(MaxPressurePolicy(), clock)
+    decision.initialize_lights()
+    coordinator = CorridorCoordinator([("a", decision)], [], arterial=Direction.NORTH)
+    plan = coordinator.update({"a": FLOWS})["a"]
+    north_south = plan.greens[0][1]
+    clock.advance(north_south + 0.5)
+    decision.process_perception_data({d: 1 for d in Direction}, False, None, False, None)
+    clock.advance(decision.yellow_time + decision.all_red_time)
+    assert decision.current_phase == EAST_WEST
+
+
+def test_controller_pushes_the_first_plan_at_start():
+    controller = JunctionController({}, num_workers=0, corridor_interval=3600)
+    updated = threading.Event()
+
+    class Coordinator:
+        def update(self):
+            updated.set()
+
+    controller.coordinators = [Coordinator()]
+    thread = threading.Thread(target=controller._coordinate, daemon=True)
+    thread.start()
+    try:
+        # Long before the first corridor_interval has passed
+        assert updated.wait(2)
+    finally:
+        controller.stop_event.set()
+        thread.join(2)
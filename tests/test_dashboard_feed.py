@@ -0,0 +1,64 @@
+import json
+import sys
+import pytest
+
+# simulate_frontend installs its own bare RPi.GPIO stand-in; keep the conftest mock for app
+_gpio = sys.modules["RPi.GPIO"]
+import simulate_frontend  # noqa: E402
+from simulate_frontend import LogFeed  # noqa: E402
+sys.modules["RPi.GPIO"] = _gpio
+
+
+def log(direction, cycle, vehicle_count=0, **flags):
+    return {"cycle": cycle, "direction": direction, "vision_response": "", "vehicle_count": vehicle_count,
+            "alerts": [], "is_accident": flags.get("accident", False), "is_emergency": flags.get("emergency", False)}
+
+
+def test_since_returns_only_newer_entries():
+    feed = LogFeed(maxlen=10)
+    for cycle in (1, 2, 3):
+        feed.append(log("NORTH", cycle))
+    last_id, entries = feed.since(1)
+    assert last_id == 3
+    assert [entry_id for entry_id, _, _ in entries] == [2, 3]
+    assert feed.since(3) == (3, [])
+
+
+def test_state_deltas_carry_only_changed_fields():
+    feed = LogFeed()
+    feed.append(log("NORTH", 1, vehicle_count=4))
+    feed.append(log("NORTH", 2, vehicle_count=4, accident=True))
+    _, entries = feed.since(1)
+    assert json.loads(entries[0][2]) == {"direction": "NORTH", "cycle": 2, "is_accident": True}
+    _, states = feed.snapshot()
+    assert json.loads(states)["NORTH"]["vehicle_count"] == 4
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    feed = LogFeed()
+    monkeypatch.setattr(simulate_frontend, "simulation_logs", feed)
+    return feed
+
+
+def test_logs_endpoint_is_newest_first_with_a_cursor(feed):
+    for cycle in (1, 2, 3):
+        feed.append(log("EAST", cycle))
+    client = simulate_frontend.app.test_client()
+    body = client.get("/logs?since=1").get_json()
+    assert body["cursor"] == 3
+    assert [entry["id"] for entry in body["logs"]] == [3, 2]
+
+
+def test_stream_sends_a_snapshot_then_events_from_the_cursor(feed):
+    feed.append(log("WEST", 1, vehicle_count=2))
+    feed.append(log("WEST", 2, vehicle_count=5))
+    response = simulate_frontend.app.test_client().get("/stream", headers={"Last-Event-ID": "1"})
+    assert response.mimetype == "text/event-stream"
+    chunks = iter(response.response)
+    snapshot = next(chunks).decode()
+    assert snapshot.startswith("event: snapshot\n")
+    assert json.loads(snapshot.split("data: ", 1)[1])["WEST"]["vehicle_count"] == 5
+    event = next(chunks).decode()
+    assert event.startswith("id: 2\nevent: log\n")
+    response.close()
@@ -0,0 +1,72 @@
+from logic.clock import VirtualClock
+from logic.decision import ALL_RED, GREEN, YELLOW, DecisionModule
+from logic.direction import Direction
+from tests.lights import RecordingLight
+
+
+def started_module(policy=None):
+    clock = VirtualClock()
+    lights = {direction: RecordingLight() for direction in Direction}
+    module = DecisionModule(lights, policy=policy, clock=clock)
+    module.initialize_lights()
+    clock.advance(module.all_red_time)
+    return module, clock, lights
+
+
+def counts(**by_name):
+    return {direction: by_name.get(direction.name.lower(), 0) for direction in Direction}
+
+
+def test_initial_all_red_then_north_green():
+    module, clock, lights = started_module()
+    assert module.phase == GREEN
+    assert lights[Direction.NORTH].state == "green"
+    assert {lights[d].state for d in Direction if d != Direction.NORTH} == {"red"}
+
+
+def test_min_green_is_held_before_switching():
+    module, clock, lights = started_module()
+    busy_east = counts(north=1, east=10)
+    clock.advance(module.min_green_time - 1)
+    module.process_perception_data(busy_east, False, None, False, None)
+    assert module.phase == GREEN and module.current_green == Direction.NORTH
+
+    clock.advance(1)
+    module.process_perception_data(busy_east, False, None, False, None)
+    assert module.phase == YELLOW
+    assert lights[Direction.NORTH].state == "yellow"
+
+
+def test_timers_run_yellow_then_all_red_then_green():
+    module, clock, lights = started_module()
+    clock.advance(module.min_green_time)
+    switched_at = clock.now()
+    module.process_perception_data(counts(east=10), False, None, False, None)
+    clock.advance(module.yellow_time)
+    assert module.phase == ALL_RED
+    assert {light.state for light in lights.values()} == {"red"}
+    clock.advance(module.all_red_time)
+    assert module.phase == GREEN and module.current_green == Direction.EAST
+    assert lights[Direction.EAST].state == "green"
+    assert module.last_switch_time == switched_at + module.yellow_time + module.all_red_time
+
+
+def test_emergency_retargets_transition_in_progress():
+    module, clock, lights = started_module()
+    clock.advance(module.min_green_time)
+    module.process_perception_data(counts(east=10), False, None, False, None)
+    assert module.phase == YELLOW and module.pending_phase == (Direction.EAST,)
+
+    module.process_perception_data(counts(east=10), True, Direction.WEST, False, None)
+    assert module.pending_phase == (Direction.WEST,)
+    clock.advance(module.yellow_time + module.all_red_time)
+    assert module.current_green == Direction.WEST
+
+
+def test_emergency_preempts_min_green():
+    module, clock, lights = started_module()
+    clock.advance(1)
+    module.process_perception_data(counts(), True, Direction.SOUTH, False, None)
+    assert module.phase == YELLOW
+    clock.advance(module.yellow_time + module.all_red_time)
+    assert module.current_green == Direction.SOUTH
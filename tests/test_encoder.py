@@ -0,0 +1,35 @@
+import numpy as np
+from logic.direction import Direction
+from vision.encoder import FrameEncoder
+
+
+def frame(seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+
+def test_same_frame_is_encoded_once_for_every_consumer_without_roi():
+    encoder = FrameEncoder()
+    image = frame()
+    livestream = encoder.encode(image)
+    assert encoder.encode(image, Direction.NORTH) is livestream
+    assert encoder.encode(image, Direction.EAST) is livestream
+
+
+def test_roi_applies_to_vision_upload_only():
+    encoder = FrameEncoder(rois={Direction.NORTH: (0, 0, 100, 100)})
+    image = frame()
+    cropped = encoder.encode(image, Direction.NORTH)
+    full = encoder.encode(image)
+    assert cropped is not full
+    assert len(cropped) < len(full)
+    # Neither consumer overwrites the other's cached encode
+    assert encoder.encode(image, Direction.NORTH) is cropped
+    assert encoder.encode(image) is full
+
+
+def test_cache_is_keyed_by_frame_not_direction():
+    encoder = FrameEncoder()
+    first, second = frame(1), frame(2)
+    north = encoder.encode(first, Direction.NORTH)
+    encoder.encode(second, Direction.NORTH)
+    assert encoder.encode(first) is north
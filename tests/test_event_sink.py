@@ -0,0 +1,117 @@
+import json
+import os
+import socket
+import pytest
+import logic.event_sink
+from logic.event_sink import EventSink
+from vision.resilience import CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(logic.event_sink, "backoff_delay", lambda attempt: 0.0)
+
+
+def unused_url():
+    """URL of a local port nothing listens on, so posts fail at once"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def sink_at(url, tmp_path, **options):
+    options.setdefault("max_retries", 0)
+    return EventSink(url, "test", spool_path=str(tmp_path / "spool.jsonl"), **options)
+
+
+def spooled(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as spool:
+        return [json.loads(line)["row"] for line in spool]
+
+
+def test_undeliverable_rows_are_spooled_then_replayed(stub_server, tmp_path):
+    sink = sink_at(unused_url(), tmp_path)
+    for i in range(3):
+        sink.submit("traffic_events", {"i": i})
+    sink.flush()
+    assert spooled(sink.spool_path) == [{"i": 0}, {"i": 1}, {"i": 2}]
+
+    sink.base_url = stub_server.url
+    sink.submit("traffic_events", {"i": 3})
+    sink.flush()
+    assert sorted(row["i"] for _, row in stub_server.rows) == [0, 1, 2, 3]
+    assert not os.path.exists(sink.spool_path)
+    assert not os.path.exists(sink.replay_path)
+
+
+def test_failed_replay_keeps_unsent_rows(stub_server, tmp_path):
+    sink = sink_at(unused_url(), tmp_path, max_batch=2, breaker=CircuitBreaker(reset_timeout=0.0))
+    for i in range(5):
+        sink.submit("traffic_events", {"i": i})
+    sink.flush()
+    sink.flush()
+    sink.flush()
+    # Still offline: the replay moved the spool aside and kept every row
+    rows = spooled(sink.spool_path) + spooled(sink.replay_path)
+    assert sorted(row["i"] for row in rows) == [0, 1, 2, 3, 4]
+
+    sink.base_url = stub_server.url
+    sink.flush()
+    assert sorted(row["i"] for _, row in stub_server.rows) == [0, 1, 2, 3, 4]
+    assert not os.path.exists(sink.replay_path)
+
+
+def test_replay_file_left_by_crash_is_sent_first(stub_server, tmp_path):
+    sink = sink_at(stub_server.url, tmp_path)
+    with open(sink.replay_path, "w") as replay:
+        replay.write(json.dumps({"table": "traffic_events", "row": {"i": 0}}) + "\n")
+        replay.write("not json\n")
+    sink.flush()
+    assert [row for _, row in stub_server.rows] == [{"i": 0}]
+    assert not os.path.exists(sink.replay_path)
+
+
+def test_open_breaker_spools_without_posting(tmp_path):
+    sink = sink_at(unused_url(), tmp_path, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60.0))
+    sink.submit("traffic_events", {"i": 0})
+    sink.flush()
+    assert sink.breaker.state == CircuitBreaker.OPEN
+    posts = []
+    sink.session.post = lambda *args, **kwargs: posts.append(args)
+    sink.submit("traffic_events", {"i": 1})
+    sink.flush()
+    assert posts == []
+    rows = spooled(sink.spool_path) + spooled(sink.replay_path)
+    assert sorted(row["i"] for row in rows) == [0, 1]
+
+
+def test_queue_overflow_is_spooled_by_the_flusher(tmp_path):
+    sink = sink_at(unused_url(), tmp_path, max_queue=2)
+    for i in range(4):
+        sink.submit("traffic_events", {"i": i})
+    # Nothing touches the disk on the caller's thread
+    assert not os.path.exists(sink.spool_path)
+    assert len(sink.overflow) == 2
+    sink._spool_overflow()
+    assert spooled(sink.spool_path) == [{"i": 2}, {"i": 3}]
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ""
+
+
+@pytest.mark.parametrize("status, spooled_rows", [(400, []), (422, []), (401, [{"i": 0}]),
+                                                  (403, [{"i": 0}]), (408, [{"i": 0}])])
+def test_only_validation_rejections_are_dropped(tmp_path, status, spooled_rows):
+    sink = sink_at("http://supabase.invalid", tmp_path, breaker=CircuitBreaker(failure_threshold=1))
+    sink.session.post = lambda *args, **kwargs: FakeResponse(status)
+    sink.submit("traffic_events", {"i": 0})
+    sink.flush()
+    assert spooled(sink.spool_path) == spooled_rows
+    assert sink.dropped == (0 if spooled_rows else 1)
+    # Auth and timeout failures count against the breaker; rejections do not
+    assert (sink.breaker.state == CircuitBreaker.OPEN) == bool(spooled_rows)
@@ -0,0 +1,69 @@
+import pytest
+from logic.clock import VirtualClock
+from logic.decision import DecisionModule
+from logic.direction import Direction
+from logic.forecast import DAY, ArrivalForecaster
+from tests.lights import RecordingLight
+
+MONDAY = 1_700_438_400  # 2023-11-20 00:00 UTC
+
+
+def test_without_history_the_recent_rate_is_used():
+    forecaster = ArrivalForecaster(slot_seconds=900)
+    forecaster.observe({Direction.NORTH: 30}, 60, MONDAY)
+    # The slot 8 hours ahead has never been observed
+    predicted = forecaster.predict(MONDAY + 8 * 3600, 60)
+    assert predicted[Direction.NORTH] == pytest.approx(30)
+    assert predicted[Direction.EAST] == 0
+
+
+def test_seasonal_profile_anticipates_the_next_slot():
+    forecaster = ArrivalForecaster(slot_seconds=900, weekly=False, persistence=1.0)
+    for day in range(5):
+        start = MONDAY + day * DAY + 8 * 3600
+        # Quiet until 08:00, busy 08:00-08:15
+        forecaster.observe({Direction.EAST: 6}, 900, start - 900)
+        forecaster.observe({Direction.EAST: 180}, 900, start)
+    rates = forecaster.rates(MONDAY + 5 * DAY + 8 * 3600 - 300, 600)
+    # Half of the horizon falls into the busy slot
+    assert rates[list(Direction).index(Direction.EAST)] == pytest.approx((6 / 900 + 180 / 900) / 2, rel=0.05)
+
+
+def test_today_deviation_from_the_profile_fades():
+    forecaster = ArrivalForecaster(slot_seconds=900, weekly=False, persistence=600.0)
+    south = list(Direction).index(Direction.SOUTH)
+    for day in range(5):
+        for slot in range(4):
+            forecaster.observe({Direction.SOUTH: 90}, 900, MONDAY + day * DAY + slot * 900)
+    today = MONDAY + 5 * DAY
+    forecaster.observe({Direction.SOUTH: 900}, 900, today)  # An unusual surge right now
+    soon = forecaster.rates(today + 60, 60)[south]
+    later = forecaster.rates(today + 60, 2400)[south]
+    # The surge lifts the near term; further ahead the forecast returns to the usual 0.1 veh/s
+    assert soon > later > 0.1
+    assert later < 0.1 + (soon - 0.1) / 2
+
+
+def test_count_increases_are_taken_as_arrivals():
+    forecaster = ArrivalForecaster()
+    forecaster.observe_counts({Direction.WEST: 4}, MONDAY)
+    forecaster.observe_counts({Direction.WEST: 10}, MONDAY + 10)
+    forecaster.observe_counts({Direction.WEST: 7}, MONDAY + 20)
+    # +6 over the first interval, a discharge (no arrivals) over the second
+    assert forecaster.recent[list(Direction).index(Direction.WEST)] == pytest.approx(0.6 * 0.7)
+
+
+def test_decision_demand_includes_forecast_arrivals():
+    clock = VirtualClock(epoch=MONDAY)
+    lights = {direction: RecordingLight() for direction in Direction}
+    module = DecisionModule(lights, clock=clock, forecaster=ArrivalForecaster())
+    module.initialize_lights()
+    counts = {direction: 0 for direction in Direction}
+    module.process_perception_data(counts, False, None, False, None,
+                                   arrivals={Direction.EAST: 0})
+    clock.advance(10)
+    module.process_perception_data(counts, False, None, False, None,
+                                   arrivals={Direction.EAST: 5})
+    assert module.forecast[Direction.EAST] > 0
+    assert module.demand(Direction.EAST, counts) == pytest.approx(module.forecast[Direction.EAST])
+    assert module.demand(Direction.NORTH, counts) == 0
@@ -0,0 +1,55 @@
+import json
+import numpy as np
+import pytest
+from detection.accident import AccidentDetector
+from detection.history import DirectionHistory
+from detection.vehicle_counter import VehicleCounter
+from logic.direction import Direction
+
+
+def test_rolling_mean_covers_only_the_window():
+    history = DirectionHistory(3)
+    means = [history.append(Direction.NORTH, value) for value in (3, 6, 9, 12)]
+    assert means == [3.0, 4.5, 6.0, 9.0]
+    assert history.sum(Direction.NORTH) == 27.0
+    assert history.count(Direction.NORTH) == 3
+    np.testing.assert_array_equal(history.recent(Direction.NORTH), [6, 9, 12])
+
+
+def test_rows_are_independent():
+    history = DirectionHistory(3)
+    history.append(Direction.NORTH, 10)
+    history.append(Direction.EAST, 2)
+    assert history.mean(Direction.NORTH) == 10.0
+    assert history.mean(Direction.SOUTH) == 0.0
+    np.testing.assert_array_equal(history.means(), [10.0, 2.0, 0.0, 0.0])
+    history.reset(Direction.NORTH)
+    assert history.count(Direction.NORTH) == 0
+    assert history.mean(Direction.EAST) == 2.0
+
+
+def test_ema_starts_at_the_first_sample():
+    history = DirectionHistory(5, keys=["lane"], ema_alpha=0.5)
+    history.append("lane", 8)
+    assert history.ema("lane") == 8.0
+    history.append("lane", 4)
+    assert history.ema("lane") == pytest.approx(6.0)
+
+
+def test_vehicle_counts_are_smoothed_per_direction():
+    counter = VehicleCounter(history_length=3)
+    for count in (3, 6, 9):
+        counter.update_count(Direction.NORTH, json.dumps({"vehicle_count": count}))
+    counter.update_count(Direction.EAST, json.dumps({"vehicle_count": 1}))
+    assert counter.get_count(Direction.NORTH) == 6
+    assert counter.get_count(Direction.EAST) == 1
+
+
+def test_accident_needs_confirmations_on_the_same_direction():
+    detector = AccidentDetector(history_length=5, confirmations=3)
+    accident = json.dumps({"vehicle_count": 2, "accident": {"detected": True, "indicators": ["debris"]}})
+    # Detections spread over different approaches do not add up
+    assert not detector.detect_accident(None, accident, Direction.NORTH)
+    assert not detector.detect_accident(None, accident, Direction.EAST)
+    assert not detector.detect_accident(None, accident, Direction.NORTH)
+    assert detector.detect_accident(None, accident, Direction.NORTH)
@@ -0,0 +1,59 @@
+import numpy as np
+from detection.local_detector import BackgroundSubtractionDetector
+
+
+class Street:
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.background = self.rng.integers(60, 120, (240, 320, 3), dtype=np.uint8)
+
+    def frame(self, car=False):
+        noise = self.rng.integers(-2, 3, self.background.shape)
+        frame = np.clip(self.background.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        if car:
+            frame[100:150, 100:180] = (20, 20, 200)
+        return frame
+
+
+def test_stopped_vehicle_is_not_learned_into_background():
+    street = Street()
+    # A short history would absorb a stopped car within ~100 frames without the hold
+    detector = BackgroundSubtractionDetector(history=50)
+    for _ in range(20):
+        detector.detect(street.frame())
+    counts = [len(detector.detect(street.frame(car=True))) for _ in range(300)]
+    assert counts[-1] == 1
+    # No ghost is left behind once it drives off
+    assert len(detector.detect(street.frame())) == 0
+
+
+def test_vehicle_held_past_hold_frames_becomes_background():
+    street = Street()
+    detector = BackgroundSubtractionDetector(history=50, learning_rate=-1, hold_frames=10)
+    for _ in range(20):
+        detector.detect(street.frame())
+    counts = [len(detector.detect(street.frame(car=True))) for _ in range(300)]
+    assert counts[0] == 1
+    assert counts[-1] == 0
+
+
+def test_first_frame_is_applied_once():
+    street = Street()
+    detector = BackgroundSubtractionDetector(history=50)
+    applied = []
+    subtractor = detector.subtractor
+
+    class CountingSubtractor:
+        def apply(self, image, **kwargs):
+            applied.append(kwargs.get("learningRate"))
+            return subtractor.apply(image, **kwargs)
+
+        def getBackgroundImage(self):
+            return subtractor.getBackgroundImage()
+
+    detector.subtractor = CountingSubtractor()
+    assert detector.detect(street.frame()) == []
+    assert applied == [None]
+    detector.detect(street.frame())
+    # Later frames: one detection pass without learning, then one masked learning pass
+    assert applied == [None, 0, detector.learning_rate]
@@ -0,0 +1,43 @@
+import pytest
+from logic.direction import Direction
+from logic.metrics import Metric, MetricsRegistry
+from multi_junction import metrics_app
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.labels("vision").observe(value)
+    lines = registry.render().splitlines()
+    assert 'test_latency_seconds_bucket{stage="vision",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="vision",le="1.0"} 2' in lines
+    assert 'test_latency_seconds_bucket{stage="vision",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{stage="vision"} 3' in lines
+
+
+def test_labels_store_directions_by_name():
+    registry = MetricsRegistry()
+    green = registry.gauge("test_green", "Green", ("junction", "direction"))
+    green.labels("j1", Direction.NORTH).set(True)
+    assert 'test_green{junction="j1",direction="NORTH"} 1.0' in registry.render().splitlines()
+    with pytest.raises(ValueError):
+        green.labels("j1")
+
+
+def test_registry_rejects_a_name_reused_with_another_kind():
+    registry = MetricsRegistry()
+    assert registry.counter("test_total", "Total") is registry.counter("test_total", "Total")
+    with pytest.raises(ValueError):
+        registry.gauge("test_total", "Total")
+
+
+def test_metric_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("test", "Test")
+
+
+def test_multi_junction_process_serves_metrics():
+    response = metrics_app.test_client().get("/metrics")
+    assert response.status_code == 200
+    assert "# TYPE traffic_stage_seconds histogram" in response.get_data(as_text=True)
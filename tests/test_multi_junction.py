@@ -0,0 +1,82 @@
+import json
+import pytest
+from logic.direction import Direction
+from logic.policy import MaxPressurePolicy
+from multi_junction import JunctionController, check_light_pins, load_config
+from tests.stubs import NoiseCamera
+
+NORTH_LIGHTS = {"NORTH": [2, 3, 4], "EAST": [17, 27, 22], "SOUTH": [10, 9, 11], "WEST": [5, 6, 13]}
+SOUTH_LIGHTS = {"NORTH": [14, 15, 18], "EAST": [23, 24, 25], "SOUTH": [8, 7, 12], "WEST": [16, 20, 21]}
+
+
+def write_config(tmp_path, junctions, **extra):
+    path = tmp_path / "junctions.json"
+    path.write_text(json.dumps({"junctions": junctions, **extra}))
+    return str(path)
+
+
+def test_load_config_maps_direction_names(tmp_path):
+    path = write_config(tmp_path, [{"id": "a", "cameras": {"north": 0, "EAST": 1}, "lights": NORTH_LIGHTS}],
+                        corridors=[{"junctions": ["a", "b"], "travel_times": [30], "arterial": "east"}])
+    config = load_config(path)
+    junction = config["junctions"][0]
+    assert junction["cameras"] == {Direction.NORTH: 0, Direction.EAST: 1}
+    assert junction["lights"][Direction.WEST] == (5, 6, 13)
+    assert config["corridors"][0]["arterial"] == Direction.EAST
+
+
+def lights(pins):
+    return {Direction[name]: tuple(values) for name, values in pins.items()}
+
+
+def test_light_pins_must_be_distinct():
+    check_light_pins([{"id": "a", "lights": lights(NORTH_LIGHTS)}, {"id": "b", "lights": lights(SOUTH_LIGHTS)}])
+    # A lone junction may fall back to the default pins
+    check_light_pins([{"id": "a"}])
+    with pytest.raises(ValueError, match="needs its own"):
+        check_light_pins([{"id": "a", "lights": lights(NORTH_LIGHTS)}, {"id": "b"}])
+    with pytest.raises(ValueError, match="GPIO pin 2"):
+        check_light_pins([{"id": "a", "lights": lights(NORTH_LIGHTS)}, {"id": "b", "lights": lights(NORTH_LIGHTS)}])
+
+
+class FakeJunction:
+    """Junction stand-in for the shared worker pool"""
+    def __init__(self, junction_id):
+        self.junction_id = junction_id
+
+
+def test_slots_rotate_round_robin_and_respect_the_inflight_cap():
+    junctions = {junction_id: FakeJunction(junction_id) for junction_id in ("a", "b")}
+    controller = JunctionController(junctions, num_workers=4, max_inflight=1)
+    first, second = controller._acquire_slot(), controller._acquire_slot()
+    assert {first.junction_id, second.junction_id} == {"a", "b"}
+    # Both junctions are at their cap
+    assert controller._acquire_slot() is None
+    controller._release_slot(first, did_work=True)
+    assert controller._acquire_slot() is first
+    assert controller.stats()[first.junction_id] == {"served": 1, "inflight": 1}
+
+
+def test_from_config_builds_independent_junctions():
+    config = {
+        "workers": 3,
+        "junctions": [
+            {"id": "a", "cameras": {Direction.NORTH: NoiseCamera()}, "lights": lights(NORTH_LIGHTS),
+             "batch_vision": True, "policy": "max_pressure"},
+            {"id": "b", "cameras": {Direction.EAST: NoiseCamera(seed=1)}, "lights": lights(SOUTH_LIGHTS)},
+        ],
+    }
+    controller = JunctionController.from_config(config, api_key="test")
+    a, b = controller.junctions["a"], controller.junctions["b"]
+    try:
+        assert controller.num_workers == 3
+        assert a.shared_workers and b.shared_workers
+        assert a.batch_vision and not b.batch_vision
+        assert isinstance(a.decision_module.policy, MaxPressurePolicy)
+        # Encoders cache per-direction buffers and ROIs, so junctions never share one
+        assert a.vision_client.encoder is not b.vision_client.encoder
+        assert set(a.traffic_lights) == set(Direction)
+    finally:
+        for junction in (a, b):
+            junction.stop(cleanup_gpio=False)
+
@@ -0,0 +1,70 @@
+import json
+import threading
+import pytest
+from app import BATCH, IntelligentTrafficSystem
+from logic.clock import VirtualClock
+from logic.direction import Direction
+from tests.stubs import NoiseCamera
+
+
+class BatchCountingClient:
+    """Vision client stand-in recording which directions each batched request carried"""
+    def __init__(self):
+        self.batches = []
+
+    def analyze_frames(self, frames):
+        self.batches.append(sorted(direction.name for direction in frames))
+        return {direction: json.dumps({"vehicle_count": 3}) for direction in frames}
+
+    def analyze_frame(self, frame, direction):
+        raise AssertionError("batch_vision must not send single-direction requests")
+
+
+@pytest.fixture
+def batch_system():
+    clock = VirtualClock()
+    cameras = {direction: NoiseCamera(seed=i) for i, direction in enumerate(Direction)}
+    system = IntelligentTrafficSystem(cameras, "test", batch_vision=True, shared_workers=True, clock=clock,
+                                      vision_client=BatchCountingClient(), min_analysis_interval=5.0)
+    yield system, clock
+    system.stop(cleanup_gpio=False)
+
+
+def capture_all(system):
+    for direction, cap in system.cameras.items():
+        system._capture_once(direction, cap)
+
+
+def test_batch_carries_every_direction_once_per_interval(batch_system):
+    system, clock = batch_system
+    every_direction = sorted(direction.name for direction in Direction)
+    for _ in range(3):
+        capture_all(system)
+        assert system.analyze_pending(timeout=0)
+        # Frames keep arriving, but the junction is not due again until the interval has passed
+        capture_all(system)
+        assert not system.analyze_pending(timeout=0)
+        clock.advance(5.0)
+    assert system.vision_client.batches == [every_direction] * 3
+
+
+def test_only_one_batch_is_queued_or_in_flight(batch_system):
+    system, clock = batch_system
+    system.min_analysis_interval = 0.0
+    capture_all(system)
+    capture_all(system)
+    assert system.pending_directions.qsize() == 1
+    assert system.pending_directions.get_nowait() == BATCH
+
+
+def test_batch_waits_for_the_other_cameras(batch_system):
+    system, clock = batch_system
+    north = system.cameras[Direction.NORTH]
+    system._capture_once(Direction.NORTH, north)
+    others = threading.Timer(0.1, lambda: [system._capture_once(direction, cap)
+                                           for direction, cap in system.cameras.items()
+                                           if direction != Direction.NORTH])
+    others.start()
+    assert system.analyze_pending(timeout=0)
+    others.join()
+    assert system.vision_client.batches == [sorted(direction.name for direction in Direction)]
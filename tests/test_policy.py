@@ -0,0 +1,77 @@
+import pytest
+from logic.clock import VirtualClock
+from logic.decision import DecisionModule
+from logic.direction import Direction
+from logic.policy import (CONCURRENT_PHASES, EAST_WEST, NORTH_SOUTH, GreedyPolicy, MaxPressurePolicy, Policy,
+                          WebsterPolicy, create_policy, green_splits)
+from tests.lights import RecordingLight
+
+
+def started_module(policy=None):
+    clock = VirtualClock()
+    lights = {direction: RecordingLight() for direction in Direction}
+    module = DecisionModule(lights, policy=policy, clock=clock)
+    module.initialize_lights()
+    clock.advance(module.all_red_time)
+    return module, clock, lights
+
+
+def counts(**by_name):
+    return {direction: by_name.get(direction.name.lower(), 0) for direction in Direction}
+
+
+def test_concurrent_phases_switch_together():
+    module, clock, lights = started_module(MaxPressurePolicy())
+    assert module.current_phase == NORTH_SOUTH
+    assert lights[Direction.SOUTH].state == "green"
+    clock.advance(module.min_green_time)
+    module.process_perception_data(counts(east=8, west=6), False, None, False, None)
+    clock.advance(module.yellow_time + module.all_red_time)
+    assert module.current_phase == EAST_WEST
+    assert {lights[d].state for d in EAST_WEST} == {"green"}
+    assert {lights[d].state for d in NORTH_SOUTH} == {"red"}
+
+
+def test_max_pressure_holds_within_hysteresis():
+    module, clock, lights = started_module(MaxPressurePolicy(hysteresis=1.5))
+    clock.advance(module.min_green_time)
+    # East-west pressure 7 against north-south 5: below 1.5x, so north-south keeps green
+    assert module.policy.choose(module, counts(north=3, south=2, east=4, west=3), module.min_green_time) is None
+    assert module.policy.choose(module, counts(north=3, south=2, east=5, west=4), module.min_green_time) == EAST_WEST
+
+
+def test_webster_splits_add_up_to_the_effective_green():
+    splits = green_splits({NORTH_SOUTH: 0.3, EAST_WEST: 0.1}, 60, 7)
+    assert sum(splits.values()) == pytest.approx(60)
+    assert splits[NORTH_SOUTH] > splits[EAST_WEST] >= 7
+
+
+def test_webster_skips_phases_without_demand():
+    module, clock, lights = started_module(WebsterPolicy())
+    module.process_perception_data(counts(north=5), False, None, False, None)
+    assert module.policy.choose(module, counts(north=5), 200) is None
+    assert module.policy.choose(module, counts(north=5, west=1), 200) == EAST_WEST
+
+
+def test_policy_requires_choose():
+    with pytest.raises(TypeError):
+        Policy()
+
+
+def test_create_policy_by_name():
+    assert isinstance(create_policy("greedy"), GreedyPolicy)
+    assert create_policy("max_pressure", hysteresis=2.0).hysteresis == 2.0
+    assert create_policy("webster").phases == CONCURRENT_PHASES
+    with pytest.raises(ValueError):
+        create_policy("fixed_time")
+
+
+class KeyRaisingPhases:
+    def __iter__(self):
+        raise KeyError("phases")
+
+
+def test_create_policy_keeps_key_errors_from_the_constructor():
+    # A KeyError inside a policy's __init__ is a bug in that policy, not an unknown name
+    with pytest.raises(KeyError):
+        create_policy("webster", phases=KeyRaisingPhases())
@@ -0,0 +1,24 @@
+import numpy as np
+from logic.direction import Direction
+from recording.recorder import SessionRecorder
+from recording.replay import Recording
+
+
+def test_response_at_never_returns_a_later_frames_response(tmp_path):
+    recorder = SessionRecorder(str(tmp_path))
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    for t in (100.0, 101.0, 102.0):
+        recorder.record_frame(Direction.NORTH, frame, t)
+    recorder.record_vision(Direction.NORTH, "first", captured_at=101.0)
+    recorder.record_vision(Direction.NORTH, "second", captured_at=102.0)
+    recorder.close()
+
+    recording = Recording(str(tmp_path))
+    try:
+        assert recording.response_at(Direction.NORTH, 100.0) is None
+        assert recording.response_at(Direction.NORTH, 101.0) == "first"
+        assert recording.response_at(Direction.NORTH, 101.5) == "first"
+        assert recording.response_at(Direction.NORTH, 105.0) == "second"
+        assert recording.response_at(Direction.EAST, 105.0) is None
+    finally:
+        recording.close()
@@ -0,0 +1,157 @@
+import threading
+from logic.alert_system import AlertSystem
+from logic.clock import VirtualClock
+from logic.direction import Direction
+from logic.sms_dispatcher import SmsDispatcher, SmsJob
+
+
+class FakeModem:
+    """Serial-like GSM modem answering AT commands from a reply table"""
+    def __init__(self, replies=None):
+        self.replies = {"AT": "OK", "ATE0": "OK", "AT+CMGF=1": "OK", "AT+CMGS": "> ",
+                        "BODY": "+CMGS: 42\r\n\r\nOK"}
+        self.replies.update(replies or {})
+        self.written = []
+        self.output = b""
+        self.lock = threading.Lock()
+
+    @property
+    def in_waiting(self):
+        return len(self.output)
+
+    def write(self, data):
+        text = data.decode()
+        self.written.append(text)
+        if text.endswith("\x1a"):
+            key = "BODY"
+        elif text.startswith("AT+CMGS="):
+            key = "AT+CMGS"
+        else:
+            key = text.strip()
+        reply = self.replies.get(key)
+        if reply is not None:
+            with self.lock:
+                self.output += f"\r\n{reply}\r\n".encode() if reply != "> " else b"\r\n> "
+
+    def read(self, size=1):
+        with self.lock:
+            chunk, self.output = self.output[:size], self.output[size:]
+        return chunk
+
+    def close(self):
+        pass
+
+
+class RecordingSink:
+    def __init__(self):
+        self.rows = []
+
+    def submit(self, table, row):
+        self.rows.append((table, row))
+
+
+def dispatcher(modem, **options):
+    options.setdefault("response_timeout", 0.2)
+    options.setdefault("send_timeout", 0.2)
+    return SmsDispatcher(modem, **options)
+
+
+def test_initialize_puts_modem_in_text_mode():
+    modem = FakeModem()
+    sms = dispatcher(modem)
+    assert sms._initialize()
+    assert sms.state == SmsDispatcher.READY
+    assert modem.written == ["AT\r", "ATE0\r", "AT+CMGF=1\r"]
+
+
+def test_initialize_fails_when_modem_rejects_text_mode():
+    sms = dispatcher(FakeModem({"AT+CMGF=1": "ERROR"}))
+    assert not sms._initialize()
+    assert sms.state == SmsDispatcher.DISCONNECTED
+
+
+def test_send_waits_for_prompt_then_reads_reference():
+    modem = FakeModem()
+    sms = dispatcher(modem)
+    sms._initialize()
+    job = SmsJob("+100", "hello")
+    sms._deliver(job)
+    assert job.status == SmsJob.SENT
+    assert job.reference == "42"
+    assert modem.written[-2:] == ['AT+CMGS="+100"\r', "hello\x1a"]
+    assert sms.state == SmsDispatcher.READY
+
+
+def test_rejected_recipient_fails_after_retries_without_sending_body():
+    modem = FakeModem({"AT+CMGS": "+CMS ERROR: 304"})
+    sms = dispatcher(modem, max_attempts=2)
+    sms._initialize()
+    job = SmsJob("+100", "hello")
+    sms._deliver(job)
+    assert job.status == SmsJob.FAILED
+    assert job.attempts == 2
+    assert "hello\x1a" not in modem.written
+
+
+def test_missing_result_cancels_submission_and_reinitializes():
+    modem = FakeModem({"BODY": None})
+    sms = dispatcher(modem, max_attempts=1)
+    sms._initialize()
+    job = SmsJob("+100", "hello")
+    sms._deliver(job)
+    assert job.status == SmsJob.FAILED
+    assert job.error == "timed out waiting for +CMGS"
+    # The pending submission is cancelled and the modem set up again
+    assert modem.written[-4:] == ["\x1b", "AT\r", "ATE0\r", "AT+CMGF=1\r"]
+    assert sms.state == SmsDispatcher.READY
+
+
+def test_error_result_code_is_reported():
+    sms = dispatcher(FakeModem({"BODY": "+CMS ERROR: 500"}), max_attempts=1)
+    sms._initialize()
+    job = SmsJob("+100", "hello")
+    sms._deliver(job)
+    assert job.status == SmsJob.FAILED
+    assert job.error == "+CMS ERROR: 500"
+
+
+def test_dispatcher_thread_sends_queued_job():
+    sms = dispatcher(FakeModem())
+    sms.start()
+    try:
+        assert sms.send("+100", "hello").wait(timeout=2)
+    finally:
+        sms.stop()
+
+
+def test_identical_message_is_deduplicated():
+    sms = dispatcher(FakeModem())
+    first = sms.send("+100", "hello")
+    assert sms.send("+100", "hello") is first
+
+
+def test_alerts_are_texted_once_per_type_and_direction_within_interval():
+    clock = VirtualClock()
+    alerts = AlertSystem(gsm_port=FakeModem(), event_sink=RecordingSink(), clock=clock, sms_interval=60)
+    sent = []
+    alerts._send_sms = lambda number, message: sent.append(message)
+    try:
+        alerts.send_traffic_alert("accident", Direction.NORTH)
+        clock.advance(1)
+        alerts.send_traffic_alert("accident", Direction.NORTH)
+        alerts.send_traffic_alert("accident", Direction.EAST)
+        clock.advance(60)
+        alerts.send_traffic_alert("accident", Direction.NORTH)
+    finally:
+        alerts.stop()
+    assert len(sent) == 3 * len(alerts.emergency_contacts)
+    assert len(alerts.event_sink.rows) == 4
+
+
+def test_gsm_not_connected_when_port_cannot_open(monkeypatch):
+    monkeypatch.setattr(SmsDispatcher, "open", lambda self: False)
+    alerts = AlertSystem(gsm_port="/dev/missing", event_sink=RecordingSink(), clock=VirtualClock())
+    try:
+        assert not alerts.gsm_connected
+    finally:
+        alerts.stop()
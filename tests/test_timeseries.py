@@ -0,0 +1,56 @@
+import pytest
+from logic.clock import VirtualClock
+from logic.direction import Direction
+from recording.timeseries import TimeSeriesStore
+
+T0 = 1_700_000_000 - 1_700_000_000 % 3600  # Start of an hour, so every rollup bucket is aligned
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / "metrics.db"), clock=VirtualClock(epoch=T0))
+    yield store
+    store.close()
+
+
+def test_samples_roll_up_into_minute_and_hour_buckets(store):
+    for second, value in ((0, 2), (0, 4), (30, 6), (90, 10)):
+        store.record("j1", Direction.NORTH, "vehicle_count", value, T0 + second)
+    assert store.query("vehicle_count", T0, T0 + 120, resolution=1) == [
+        (T0, "NORTH", 3.0), (T0 + 30, "NORTH", 6.0), (T0 + 90, "NORTH", 10.0)]
+    assert store.query("vehicle_count", T0, T0 + 120, resolution=60, agg="max") == [
+        (T0, "NORTH", 6.0), (T0 + 60, "NORTH", 10.0)]
+    assert store.query("vehicle_count", T0, T0 + 3600, resolution=3600, agg="count") == [(T0, "NORTH", 4)]
+
+
+def test_flushes_merge_into_existing_buckets(store):
+    store.record("j1", Direction.EAST, "queue_length", 1, T0 + 5)
+    store.flush()
+    store.record("j1", Direction.EAST, "queue_length", 5, T0 + 5)
+    assert store.query("queue_length", T0, T0 + 60, resolution=60, agg="sum") == [(T0, "EAST", 6.0)]
+    assert store.aggregate("queue_length", T0, T0 + 60, agg="min") == 1.0
+
+
+def test_queries_filter_by_junction_and_direction(store):
+    store.record_many("j1", "vehicle_count", {Direction.NORTH: 4, Direction.SOUTH: 8}, T0)
+    store.record("j2", Direction.NORTH, "vehicle_count", 100, T0)
+    assert store.query("vehicle_count", T0, T0 + 1, junction="j1", resolution=1) == [
+        (T0, "NORTH", 4.0), (T0, "SOUTH", 8.0)]
+    assert store.aggregate("vehicle_count", T0, T0 + 60, direction=Direction.NORTH, agg="max") == 100.0
+
+
+def test_resolution_is_picked_to_bound_the_points(store):
+    assert store.pick_resolution(T0, T0 + 300) == 1
+    assert store.pick_resolution(T0, T0 + 6 * 3600) == 60
+    assert store.pick_resolution(T0, T0 + 90 * 86400) == 3600
+    with pytest.raises(ValueError):
+        store.query("vehicle_count", T0, T0 + 60, agg="median")
+
+
+def test_purge_applies_retention_per_resolution(store):
+    store.record("j1", Direction.WEST, "vehicle_count", 3, T0)
+    store.flush()
+    store.purge(T0 + 3 * 86400)
+    # Raw seconds are kept for two days, minute and hour rollups longer
+    assert store.query("vehicle_count", T0, T0 + 60, resolution=1) == []
+    assert store.query("vehicle_count", T0, T0 + 60, resolution=60) == [(T0, "WEST", 3.0)]
@@ -0,0 +1,27 @@
+import pytest
+from detection.tracker import VehicleTracker
+from logic.clock import VirtualClock
+
+
+def drive(tracker, start_y, step, frames, timestamps):
+    for i, timestamp in zip(range(frames), timestamps):
+        tracker.update([(100, start_y + i * step, 40, 30)], timestamp, frame_height=480)
+
+
+def test_speed_and_throughput_follow_capture_timestamps():
+    tracker = VehicleTracker(min_hits=2, velocity_smoothing=1.0)
+    # 10 px per frame at 10 frames a second is 100 px/s, whenever the frames are processed
+    drive(tracker, 200, 10, 10, [1000.0 + i * 0.1 for i in range(10)])
+    metrics = tracker.metrics(now=1001.0)
+    assert metrics["mean_speed"] == pytest.approx(100.0)
+    assert metrics["throughput"] == 1.0  # One line crossing in the 60 s window
+    assert tracker.metrics(now=1062.0)["throughput"] == 0.0
+
+
+def test_injected_clock_stands_in_for_missing_timestamps():
+    clock = VirtualClock(epoch=1000.0)
+    tracker = VehicleTracker(min_hits=2, velocity_smoothing=1.0, clock=clock)
+    for i in range(5):
+        tracker.update([(100, 200 + i * 20, 40, 30)], frame_height=480)
+        clock.advance(0.5)
+    assert tracker.metrics()["mean_speed"] == pytest.approx(40.0)
@@ -0,0 +1,60 @@
+import numpy as np
+from logic.direction import Direction
+from vision.cache import VisionResponseCache
+
+PROMPT = "Count the vehicles"
+
+
+def scene(seed=0):
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (18, 24, 3), dtype=np.uint8)
+    return np.kron(small, np.ones((20, 20, 1), dtype=np.uint8))
+
+
+def noisy(frame, seed=2):
+    noise = np.random.default_rng(seed).integers(-3, 4, frame.shape)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def test_near_duplicate_frame_hits():
+    cache = VisionResponseCache()
+    frame = scene()
+    cache.put(cache.key(frame, Direction.NORTH, PROMPT), "3 vehicles", now=0.0)
+    near = cache.key(noisy(frame), Direction.NORTH, PROMPT)
+    assert near != cache.key(frame, Direction.NORTH, PROMPT)
+    assert cache.get(near, now=1.0) == "3 vehicles"
+
+
+def test_different_scene_direction_or_prompt_misses():
+    cache = VisionResponseCache()
+    frame = scene()
+    cache.put(cache.key(frame, Direction.NORTH, PROMPT), "3 vehicles", now=0.0)
+    assert cache.get(cache.key(scene(5), Direction.NORTH, PROMPT), now=1.0) is None
+    assert cache.get(cache.key(frame, Direction.EAST, PROMPT), now=1.0) is None
+    assert cache.get(cache.key(frame, Direction.NORTH, "Other prompt"), now=1.0) is None
+
+
+def test_entries_expire_and_are_purged_on_put():
+    cache = VisionResponseCache(ttl=10.0)
+    old = cache.key(scene(1), Direction.NORTH, PROMPT)
+    cache.put(old, "old", now=0.0)
+    assert cache.get(old, now=10.0) is None
+    cache.put(old, "old", now=20.0)
+    cache.put(cache.key(scene(2), Direction.NORTH, PROMPT), "other", now=20.0)
+    assert len(cache.entries) == 2
+    # A put at least ttl after the last purge drops what has expired since
+    cache.put(cache.key(scene(3), Direction.NORTH, PROMPT), "new", now=35.0)
+    assert list(cache.entries) == [cache.key(scene(3), Direction.NORTH, PROMPT)]
+
+
+def test_backing_store_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    frame = scene()
+    cache = VisionResponseCache(db_path=path)
+    cache.put(cache.key(frame, Direction.NORTH, PROMPT), "3 vehicles")
+    cache.close()
+    reopened = VisionResponseCache(db_path=path)
+    try:
+        assert reopened.get(reopened.key(noisy(frame), Direction.NORTH, PROMPT)) == "3 vehicles"
+    finally:
+        reopened.close()
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import vision.client
+from logic.direction import Direction
+from vision.client import StaleResponse, VisionModelClient
+from vision.resilience import CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(vision.client, "backoff_delay", lambda attempt: 0.0)
+
+
+def client_for(server, **options):
+    return VisionModelClient(api_url=f"{server.url}/v1/chat/completions", api_key="test",
+                             structured=True, **options)
+
+
+def frame(seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (120, 160, 3), dtype=np.uint8)
+
+
+def test_failures_are_retried_then_open_the_breaker_and_fall_back(stub_server):
+    client = client_for(stub_server, max_retries=2,
+                        breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60.0))
+    good = client.analyze_frame(frame(), Direction.NORTH)
+    assert good is not None and not getattr(good, "stale", False)
+
+    stub_server.error_rate = 1.0
+    for _ in range(2):
+        before = stub_server.requests
+        fallback = client.analyze_frame(frame(), Direction.NORTH)
+        # Every failed call makes the first attempt plus max_retries retries
+        assert stub_server.requests - before == 3
+        assert isinstance(fallback, StaleResponse) and fallback == good
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    # While open no request is made; the last good result is still served, marked stale
+    before = stub_server.requests
+    assert isinstance(client.analyze_frame(frame(), Direction.NORTH), StaleResponse)
+    assert stub_server.requests == before
+    # A direction that never succeeded has nothing to fall back to
+    assert client.analyze_frame(frame(), Direction.EAST) is None
+
+
+def test_batch_falls_back_per_direction(stub_server):
+    client = client_for(stub_server, max_retries=0)
+    client.analyze_frame(frame(), Direction.NORTH)
+    stub_server.error_rate = 1.0
+    results = client.analyze_frames({Direction.NORTH: frame(1), Direction.EAST: frame(2)})
+    assert isinstance(results[Direction.NORTH], StaleResponse)
+    assert results[Direction.EAST] is None
@@ -0,0 +1,161 @@
+import re
+import json
+import logging
+from functools import lru_cache
+from logic.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Schema requested from the model in structured (JSON) mode
+RESPONSE_SCHEMA = """{
+  "vehicle_count": <integer>,
+  "emergency_vehicle": {"present": <true|false>, "confidence": <0.0-1.0>, "type": <"ambulance"|"police car"|"fire truck"|null>},
+  "accident": {"detected": <true|false>, "indicators": [<short strings>]},
+  "density": <"light"|"moderate"|"heavy">
+}"""
+
+# Free-text fallback patterns, compiled once. Terms preceded by "no " are negations
+# ("no emergency vehicles", "no accident") and are not matches.
+COUNT_PATTERNS = [
+    re.compile(r"(\d+)\s+(?:cars|vehicles|automobiles)"),
+    re.compile(r"(?:count|total of|counted)\s+(\d+)"),
+    re.compile(r"(\d+)\s+(?:cars|vehicles|automobiles)\s+(?:detected|identified|found|present)"),
+]
+EMERGENCY_TERMS = ['ambulance', 'emergency vehicle', 'police car', 'fire truck']
+EMERGENCY_PATTERNS = [
+    (term, re.compile(rf"(?<!no ){re.escape(term)}"), re.compile(rf"{re.escape(term)}.*?(\d+(?:\.\d+)?)%"))
+    for term in EMERGENCY_TERMS
+]
+ACCIDENT_TERMS = ['collision', 'crash', 'accident', 'vehicles colliding',
+                  'damaged vehicle', 'overturned vehicle', 'debris on road']
+ACCIDENT_PATTERNS = [(term, re.compile(rf"(?<!no ){re.escape(term)}")) for term in ACCIDENT_TERMS]
+DENSITY_PATTERN = re.compile(r"\b(light|moderate|heavy)\b")
+CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+class VisionAnalysis:
+    """
+    Typed result of one vision model response, parsed once and shared by the
+    vehicle counter, emergency detector and accident detector. Instances are
+    cached per response text and must be treated as read-only.
+    """
+    def __init__(self, vehicle_count=0, emergency_candidates=(), accident_indicators=(),
+                 density=None, structured=False, raw=None):
+        self.vehicle_count = vehicle_count
+        self.emergency_candidates = tuple(emergency_candidates)  # (term, confidence or None)
+        self.accident_indicators = tuple(accident_indicators)
+        self.density = density  # "light", "moderate", "heavy" or None
+        self.structured = structured  # True if parsed from JSON rather than free text
+        self.raw = raw
+
+    @property
+    def emergency(self):
+        return bool(self.emergency_candidates)
+
+    @property
+    def accident(self):
+        return bool(self.accident_indicators)
+
+    def __repr__(self):
+        return (f"VisionAnalysis(count={self.vehicle_count}, emergency={list(self.emergency_candidates)}, "
+                f"accident={list(self.accident_indicators)}, density={self.density})")
+
+    @classmethod
+    def parse(cls, response):
+        """Return the analysis for a response (text, JSON text or an existing VisionAnalysis)"""
+        if isinstance(response, VisionAnalysis):
+            return response
+        if not response:
+            return EMPTY_ANALYSIS
+        return _parse_cached(response)
+
+    @classmethod
+    @timed("parse_json")
+    def from_json(cls, text):
+        """Parse a structured response; returns None if it is not valid JSON of the expected shape"""
+        try:
+            data = json.loads(CODE_FENCE.sub("", text.strip()))
+        except ValueError:
+            return None
+        if not isinstance(data, dict) or "vehicle_count" not in data:
+            return None
+
+        try:
+            count = max(0, int(data.get("vehicle_count") or 0))
+        except (TypeError, ValueError):
+            count = 0
+
+        candidates = []
+        emergency = data.get("emergency_vehicle") or {}
+        if isinstance(emergency, dict) and emergency.get("present"):
+            try:
+                confidence = float(emergency["confidence"])
+            except (KeyError, TypeError, ValueError):
+                confidence = None
+            candidates.append((emergency.get("type") or "emergency vehicle", confidence))
+
+        indicators = []
+        accident = data.get("accident") or {}
+        if isinstance(accident, dict) and accident.get("detected"):
+            indicators = [str(i) for i in accident.get("indicators") or []] or ["accident"]
+
+        density = data.get("density")
+        if density not in ("light", "moderate", "heavy"):
+            density = None
+        return cls(count, candidates, indicators, density, structured=True, raw=text)
+
+    @classmethod
+    @timed("parse_text")
+    def from_text(cls, text):
+        """Precompiled regex fallback for free-text responses"""
+        lowered = text.lower()
+
+        candidates = []
+        for term, term_pattern, confidence_pattern in EMERGENCY_PATTERNS:
+            if term_pattern.search(lowered):
+                match = confidence_pattern.search(lowered)
+                candidates.append((term, float(match.group(1)) / 100.0 if match else None))
+
+        indicators = [term for term, pattern in ACCIDENT_PATTERNS if pattern.search(lowered)][:1]
+
+        density = None
+        if "heavy traffic" in lowered or "congested" in lowered:
+            density = "heavy"
+        else:
+            match = DENSITY_PATTERN.search(lowered)
+            density = match.group(1) if match else None
+
+        return cls(_count_from_text(lowered), candidates, indicators, density, structured=False, raw=text)
+
+
+def _count_from_text(lowered):
+    # Look for patterns like "5 cars", "10 vehicles", etc.
+    for pattern in COUNT_PATTERNS:
+        match = pattern.search(lowered)
+        if match:
+            return int(match.group(1))
+
+    # If no specific count is found, estimate from the text
+    if "no cars" in lowered or "empty" in lowered:
+        return 0
+    elif "few cars" in lowered or "light traffic" in lowered:
+        return 2
+    elif "moderate" in lowered:
+        return 5
+    elif "heavy traffic" in lowered or "congested" in lowered:
+        return 10
+    return 0
+
+
+@lru_cache(maxsize=256)
+def _parse_cached(text):
+    stripped = text.lstrip()
+    if stripped.startswith(("{", "```")):
+        analysis = VisionAnalysis.from_json(text)
+        if analysis is not None:
+            return analysis
+        logger.warning("Structured vision response was not valid JSON, using text fallback")
+    return VisionAnalysis.from_text(text)
+
+
+EMPTY_ANALYSIS = VisionAnalysis()
@@ -0,0 +1,161 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+MJPEG_BOUNDARY = "frame"
+MJPEG_MIMETYPE = f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}"
+PART_HEADER = f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n\r\n".encode()
+
+
+class FrameChannel:
+    """Latest raw and encoded frame of one feed, plus the clients watching it"""
+    def __init__(self, name):
+        self.name = name
+        self.condition = threading.Condition()
+        self.raw = None  # Newest published frame, not yet encoded
+        self.raw_seq = 0
+        self.encoded_seq = 0  # raw_seq of the frame behind part
+        self.part = None  # Multipart chunk with the JPEG, shared by every client
+        self.seq = 0  # Incremented on every new part
+        self.subscribers = 0
+        self.encodes = 0
+        self.source = None  # Optional capture read by a dedicated thread
+        self.reader = None  # Thread reading source
+
+
+class FrameBroadcaster:
+    """
+    Fans camera frames out to any number of MJPEG clients. Producers publish
+    raw frames (a reference swap, no copy or encode); one background thread
+    JPEG-encodes the newest frame of each watched feed at most max_fps times a
+    second and every client yields the same bytes. A slow client simply skips
+    to the newest part, so encoding cost is independent of the viewer count.
+    """
+    def __init__(self, encoder, max_fps=15, client_timeout=5.0):
+        self.encoder = encoder
+        self.frame_interval = 1.0 / max_fps
+        self.client_timeout = client_timeout  # Seconds a client waits for a frame before re-checking
+        self.channels = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.started = False
+
+    def channel(self, name):
+        with self.lock:
+            channel = self.channels.get(name)
+            if channel is None:
+                channel = self.channels[name] = FrameChannel(name)
+            return channel
+
+    def has_channel(self, name):
+        return name in self.channels
+
+    def publish(self, name, frame):
+        """Offer the newest frame of a feed; cheap enough to call from capture loops"""
+        channel = self.channel(name)
+        with channel.condition:
+            channel.raw = frame
+            channel.raw_seq += 1
+            watched = channel.subscribers > 0
+        if watched:
+            self.wakeup.set()
+
+    def add_source(self, name, capture):
+        """Read a capture in a dedicated thread while the feed has viewers"""
+        channel = self.channel(name)
+        channel.source = capture
+
+    def _ensure_started(self, channel):
+        with self.lock:
+            if not self.started:
+                self.started = True
+                self.stop_event.clear()
+                self._spawn(self._encode_loop, "mjpeg-encoder")
+            if channel.source is not None and channel.reader is None:
+                channel.reader = self._spawn(self._read_loop, f"mjpeg-source-{channel.name}", channel)
+
+    def _spawn(self, target, name, *args):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        self.threads.append(thread)
+        thread.start()
+        return thread
+
+    def _read_loop(self, channel):
+        while not self.stop_event.is_set():
+            if channel.subscribers == 0:
+                self.stop_event.wait(self.frame_interval)
+                continue
+            success, frame = channel.source.read()
+            if not success:
+                logger.warning(f"Livestream source {channel.name} returned no frame")
+                self.stop_event.wait(0.5)
+                continue
+            self.publish(channel.name, frame)
+
+    def _encode_loop(self):
+        while not self.stop_event.is_set():
+            self.wakeup.wait(self.client_timeout)
+            self.wakeup.clear()
+            with self.lock:
+                channels = list(self.channels.values())
+            for channel in channels:
+                with channel.condition:
+                    if channel.subscribers == 0 or channel.raw_seq == channel.encoded_seq:
+                        continue
+                    frame, raw_seq = channel.raw, channel.raw_seq
+                # Full view: ROIs only apply to the vision upload
+                data = self.encoder.encode(frame)
+                if data is None:
+                    continue
+                part = PART_HEADER + data + b"\r\n"
+                with channel.condition:
+                    channel.part = part
+                    channel.encoded_seq = raw_seq
+                    channel.seq += 1
+                    channel.encodes += 1
+                    channel.condition.notify_all()
+            # Caps the encode rate of every feed
+            self.stop_event.wait(self.frame_interval)
+
+    def subscribe(self, name):
+        """Generator of multipart MJPEG chunks for one client"""
+        channel = self.channel(name)
+        with channel.condition:
+            channel.subscribers += 1
+        self._ensure_started(channel)
+        self.wakeup.set()
+        last_seq = 0
+        try:
+            while not self.stop_event.is_set():
+                with channel.condition:
+                    channel.condition.wait_for(lambda: channel.seq > last_seq or self.stop_event.is_set(),
+                                               self.client_timeout)
+                    if channel.seq == last_seq:
+                        continue
+                    last_seq, part = channel.seq, channel.part
+                yield part
+        finally:
+            with channel.condition:
+                channel.subscribers -= 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.wakeup.set()
+        for channel in list(self.channels.values()):
+            with channel.condition:
+                channel.condition.notify_all()
+        for thread in self.threads:
+            thread.join(timeout=2)
+        self.threads = []
+        self.started = False
+        for channel in self.channels.values():
+            channel.reader = None
+
+    def stats(self):
+        """Subscribers and encodes per feed"""
+        with self.lock:
+            return {name: {"subscribers": channel.subscribers, "encodes": channel.encodes}
+                    for name, channel in self.channels.items()}
@@ -0,0 +1,174 @@
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+from vision.change_detector import difference_hash
+
+logger = logging.getLogger(__name__)
+
+
+class VisionResponseCache:
+    """
+    LRU + TTL cache of vision model responses keyed by a perceptual hash of the
+    frame, its direction and the prompt. A lookup also matches an entry of the
+    same direction and prompt whose hash is within max_distance bits, so
+    near-duplicate frames (sensor noise, compression) hit. Optionally backed by
+    a SQLite file so entries survive restarts.
+    """
+    def __init__(self, max_entries=1024, ttl=300.0, hash_size=16, max_distance=8, db_path=None):
+        self.max_entries = max_entries  # Entries kept in memory
+        self.ttl = ttl  # Seconds before an entry expires
+        self.hash_size = hash_size  # dHash grid size; 16 gives a 256-bit hash
+        self.max_distance = max_distance  # Hamming distance still treated as the same frame
+        self.entries = OrderedDict()  # key -> (response, created_at)
+        self.scopes = {}  # direction/prompt digest -> {hash int: key}, for near matches
+        self.lock = threading.Lock()
+        self.last_purge = None  # Time of the last purge_expired(); put() purges once per ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS vision_cache "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)")
+            self.db.commit()
+            self.purge_expired()
+            self._load()
+
+    def key(self, frame, direction, prompt):
+        """Build the content address for a frame/direction/prompt combination: '<scope>:<hash>'"""
+        bits = np.packbits(difference_hash(frame, self.hash_size)).tobytes()
+        scope = hashlib.sha1(direction.name.encode())
+        scope.update(prompt.encode())
+        return f"{scope.hexdigest()}:{bits.hex()}"
+
+    @staticmethod
+    def _split(key):
+        scope, _, bits = key.partition(":")
+        try:
+            return scope, int(bits, 16)
+        except ValueError:
+            return scope, None  # Entry written before keys carried the hash
+
+    def _load(self):
+        """Warm the in-memory LRU from the backing store so near matches survive restarts"""
+        rows = self.db.execute(
+            "SELECT key, response, created_at FROM vision_cache ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,)).fetchall()
+        with self.lock:
+            for key, response, created_at in reversed(rows):
+                self._store(key, response, created_at)
+
+    def _nearest(self, key):
+        """Key of the closest cached hash in the same scope within max_distance, or None"""
+        scope, value = self._split(key)
+        candidates = self.scopes.get(scope)
+        if value is None or not candidates:
+            return None
+        best, best_distance = None, self.max_distance + 1
+        for other, other_key in candidates.items():
+            distance = (value ^ other).bit_count()
+            if distance < best_distance:
+                best, best_distance = other_key, distance
+        return best
+
+    def get(self, key, now=None):
+        """Return a cached response for this or a near-duplicate frame, or None on a miss"""
+        now = time.time() if now is None else now
+        with self.lock:
+            match = key if key in self.entries else self._nearest(key)
+            if match is not None:
+                response, created_at = self.entries[match]
+                if now - created_at < self.ttl:
+                    self.entries.move_to_end(match)
+                    self.hits += 1
+                    return response
+                self._remove(match)
+                self.evictions += 1
+
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT response, created_at FROM vision_cache WHERE key = ?", (key,)).fetchone()
+                if row and now - row[1] < self.ttl:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key, response, now=None):
+        """Store a response; None responses are never cached. Expired entries are purged once per ttl"""
+        if response is None:
+            return
+        now = time.time() if now is None else now
+        if self.last_purge is None:
+            self.last_purge = now
+        elif now - self.last_purge >= self.ttl:
+            self.purge_expired(now)
+        with self.lock:
+            self._store(key, response, now)
+            if self.db is not None:
+                try:
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO vision_cache (key, response, created_at) VALUES (?, ?, ?)",
+                        (key, response, now))
+                    self.db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to persist vision cache entry: {e}")
+
+    def _store(self, key, response, created_at):
+        """Insert into the in-memory LRU, evicting the least recently used entry if full"""
+        self.entries[key] = (response, created_at)
+        self.entries.move_to_end(key)
+        scope, value = self._split(key)
+        if value is not None:
+            self.scopes.setdefault(scope, {})[value] = key
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        del self.entries[key]
+        scope, value = self._split(key)
+        candidates = self.scopes.get(scope)
+        if candidates is not None:
+            candidates.pop(value, None)
+            if not candidates:
+                del self.scopes[scope]
+
+    def purge_expired(self, now=None):
+        """Drop expired entries from memory and from the backing store"""
+        now = time.time() if now is None else now
+        with self.lock:
+            self.last_purge = now
+            expired = [k for k, (_, created_at) in self.entries.items() if now - created_at >= self.ttl]
+            for k in expired:
+                self._remove(k)
+            self.evictions += len(expired)
+            if self.db is not None:
+                self.db.execute("DELETE FROM vision_cache WHERE created_at <= ?", (now - self.ttl,))
+                self.db.commit()
+    def stats(self):
+        """Return hit/miss/eviction counters and current size"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
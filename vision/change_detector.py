@@ -0,0 +1,107 @@
+import time
+import logging
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def to_gray(frame, max_side=160):
+    """
+    Return a small single-channel copy of a BGR or greyscale frame. The frame is
+    first nearest-neighbour subsampled so full-resolution frames cost tens of microseconds
+    """
+    height, width = frame.shape[:2]
+    step = max(1, max(height, width) // max_side)
+    small = cv2.resize(frame, (width // step, height // step), interpolation=cv2.INTER_NEAREST)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+
+def difference_hash(frame, hash_size=8):
+    """
+    Perceptual difference hash: compares horizontally adjacent pixels of a
+    (hash_size + 1) x hash_size thumbnail. Returns a boolean array of hash_size**2 bits
+    """
+    small = cv2.resize(to_gray(frame), (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    small = small.astype(np.int16)
+    return (small[:, 1:] > small[:, :-1]).ravel()
+
+
+class FrameChangeDetector:
+    """
+    Decides whether a camera frame differs enough from the last analysed frame
+    of its direction to justify a fresh vision model call. A direction with a
+    suspected accident or emergency is always analysed, since a static scene
+    is exactly what a stopped crash looks like and confirmation needs
+    repeated observations.
+    """
+    def __init__(self, diff_threshold=8.0, hash_threshold=6, max_staleness=30.0, thumb_size=(32, 32),
+                 suspect_window=60.0):
+        self.diff_threshold = diff_threshold  # Mean absolute grey-level difference (0-255)
+        self.hash_threshold = hash_threshold  # Hamming distance between difference hashes (0-64)
+        self.max_staleness = max_staleness  # Seconds before a result is refreshed regardless
+        self.thumb_size = thumb_size  # (width, height) of the comparison thumbnail
+        self.suspect_window = suspect_window  # Seconds the gate stays open after a suspected incident
+        self.signatures = {}  # Direction -> (thumbnail, hash bits, analysed_at)
+        self.suspected_until = {}  # Direction -> time until which every frame is analysed
+        self.results = {}  # Direction -> last vision response
+        self.skipped = 0
+        self.analysed = 0
+
+    def signature(self, frame):
+        """Return a downscaled greyscale thumbnail and its 64-bit difference hash"""
+        gray = to_gray(frame)
+        thumb = cv2.resize(gray, self.thumb_size, interpolation=cv2.INTER_AREA).astype(np.int16)
+        return thumb, difference_hash(gray)
+
+    def should_analyze(self, direction, frame, now=None):
+        """Return True if the frame needs a fresh vision call, False if the last result can be reused"""
+        previous = self.signatures.get(direction)
+        if previous is None or direction not in self.results:
+            return True
+
+        now = time.time() if now is None else now
+        if now < self.suspected_until.get(direction, 0.0):
+            return True
+        prev_thumb, prev_bits, analysed_at = previous
+        if now - analysed_at >= self.max_staleness:
+            return True
+
+        thumb, bits = self.signature(frame)
+        mean_diff = float(np.abs(thumb - prev_thumb).mean())
+        hash_distance = int(np.count_nonzero(bits != prev_bits))
+        if mean_diff >= self.diff_threshold or hash_distance >= self.hash_threshold:
+            return True
+
+        self.skipped += 1
+        return False
+
+    def record(self, direction, frame, result, now=None):
+        """Remember the frame that produced a fresh vision result for a direction"""
+        if result is None:
+            # Failed calls are not cached so the next frame is retried
+            return
+        thumb, bits = self.signature(frame)
+        self.signatures[direction] = (thumb, bits, time.time() if now is None else now)
+        self.results[direction] = result
+        self.analysed += 1
+
+    def suspect(self, direction, now=None):
+        """Bypass the gate for a direction while an accident or emergency there is unconfirmed"""
+        now = time.time() if now is None else now
+        self.suspected_until[direction] = now + self.suspect_window
+
+    def last_result(self, direction):
+        """Get the most recent vision result for a direction"""
+        return self.results.get(direction)
+
+    def reset(self, direction=None):
+        """Forget stored signatures for one direction or all of them"""
+        if direction is None:
+            self.signatures.clear()
+            self.results.clear()
+            self.suspected_until.clear()
+        else:
+            self.signatures.pop(direction, None)
+            self.results.pop(direction, None)
+            self.suspected_until.pop(direction, None)
@@ -1,36 +1,84 @@
 import base64
-import cv2
+import re
+import json
+import time
+import threading
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from vision.encoder import FrameEncoder
+from vision.resilience import CircuitBreaker, backoff_delay
+from vision.analysis import RESPONSE_SCHEMA
+from logic.metrics import REGISTRY, timed, stage_timer
 
 logger = logging.getLogger(__name__)
 
+API_CALLS = REGISTRY.counter("traffic_vision_requests_total",
+                             "Vision model HTTP attempts by outcome (success, retry, failure, circuit_open)",
+                             ("outcome",))
+CACHE_LOOKUPS = REGISTRY.counter("traffic_vision_cache_lookups_total",
+                                 "Vision response cache lookups by result", ("result",))
+FALLBACKS = REGISTRY.counter("traffic_vision_fallbacks_total",
+                             "Failed vision calls answered with the last good result", ("direction",))
+
+# Matches the per-direction section headers requested by analyze_frames,
+# tolerating markdown decoration such as "### NORTH", "**NORTH:**" or "NORTH:"
+SECTION_HEADER = re.compile(r"^[ \t#*]*(NORTH|EAST|SOUTH|WEST)(?:[ \t]+direction)?\b[ \t*:]*$", re.IGNORECASE | re.MULTILINE)
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class StaleResponse(str):
+    """
+    The last good response of a direction, returned while the API is failing.
+    It can keep counts populated but is not a new observation: detectors and
+    the change detector must not consume it again.
+    """
+    stale = True
 
 
 class VisionModelClient:
     """Client to interact with a Vision Language Model API"""
-    def __init__(self, api_url=None, api_key=None, model="gpt-4o"):
+    def __init__(self, api_url=None, api_key=None, model="gpt-4o", cache=None, encoder=None,
+                 timeout=(5, 30), max_retries=2, max_concurrency=4, breaker=None, structured=False):
         self.api_url = api_url or "https://api.openai.com/v1/chat/completions"
         self.api_key = api_key
         self.model = model
+        self.cache = cache  # Optional VisionResponseCache
+        self.encoder = encoder or FrameEncoder()
+        self.timeout = timeout  # (connect, read) seconds
+        self.max_retries = max_retries  # Extra attempts after the first failure
+        self.structured = structured  # Ask for JSON matching RESPONSE_SCHEMA instead of prose
+
+        # Keep-alive session sized for the number of concurrent requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        })
+        self.concurrency = threading.BoundedSemaphore(max_concurrency)
+        self.breaker = breaker or CircuitBreaker(name="vision model")
+        self.last_good = {}  # Direction -> last successful response
         
     def encode_image(self, image_path):
         """Encode image to base64 for API transmission"""
         with open(image_path, "rb") as image_file:
             return base64.b64encode(image_file.read()).decode('utf-8')
             
-    def encode_frame(self, frame):
+    def encode_frame(self, frame, direction=None):
         """Encode CV2 frame to base64 for API transmission"""
-        _, buffer = cv2.imencode(".jpg", frame)
-        return base64.b64encode(buffer).decode('utf-8')
+        return self.encoder.encode_base64(frame, direction)
     
+    @timed("vision_frame")
     def analyze_frame(self, frame, direction):
         """
         Send frame to vision model API and get analysis
         Returns the model's textual response
         """
-        base64_image = self.encode_frame(frame)
-        
         # Prepare prompt based on direction
         prompt = f"""
         Analyze this traffic camera image showing the {direction.name} direction.
@@ -45,36 +93,193 @@ class VisionModelClient:
         - Traffic density assessment (light/moderate/heavy)
         - Any accident indicators
         """
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
+        if self.structured:
+            prompt = f"""
+        Analyze this traffic camera image showing the {direction.name} direction.
+        Count all vehicles, check for emergency vehicles (ambulances, police cars,
+        fire trucks) and look for any signs of accidents or hazardous conditions.
+
+        Reply with a single JSON object and nothing else, using this schema:
+        {RESPONSE_SCHEMA}
+        """
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key(frame, direction, prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                CACHE_LOOKUPS.labels("hit").inc()
+                return cached
+            CACHE_LOOKUPS.labels("miss").inc()
+
+        base64_image = self.encode_frame(frame, direction)
+        content = [
+            {"type": "text", "text": prompt},
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/jpeg;base64,{base64_image}"
+                }
+            }
+        ]
+        response = self._chat_completion(content, max_tokens=300, json_mode=self.structured)
+        if response is None:
+            return self._fallback(direction)
+        self.last_good[direction] = response
+        if cache_key is not None:
+            self.cache.put(cache_key, response)
+        return response
+
+    def _fallback(self, direction):
+        """Return the last good result for a direction, marked stale, when the API is unavailable"""
+        response = self.last_good.get(direction)
+        if response is None:
+            return None
+        FALLBACKS.labels(direction).inc()
+        logger.warning(f"Using last good vision result for {direction.name}")
+        return StaleResponse(response)
+
+    @timed("vision_batch")
+    def analyze_frames(self, frames_by_direction):
+        """
+        Send frames from several directions to the vision model in a single request
+        Returns a dict of Direction -> textual response (None if missing from the reply)
+        """
+        if not frames_by_direction:
+            return {}
+
+        names = ", ".join(direction.name for direction in frames_by_direction)
+        prompt = f"""
+        Analyze these traffic camera images from one junction. Each image is
+        preceded by the direction it shows ({names}).
+
+        For each direction:
+        1. Count all vehicles visible in the image.
+        2. Check for emergency vehicles (ambulances, police cars, fire trucks).
+        3. Look for any signs of accidents or hazardous conditions.
+
+        Answer with one section per direction, in the same order, each starting
+        with a line containing only "### <DIRECTION>" (for example "### NORTH"),
+        followed by a structured response with:
+        - Total vehicle count
+        - Presence of emergency vehicles (yes/no with confidence)
+        - Traffic density assessment (light/moderate/heavy)
+        - Any accident indicators
+        """
+        if self.structured:
+            prompt = f"""
+        Analyze these traffic camera images from one junction. Each image is
+        preceded by the direction it shows ({names}). For each direction count all
+        vehicles, check for emergency vehicles and look for signs of accidents.
+
+        Reply with a single JSON object and nothing else, keyed by direction name
+        (for example "NORTH"), where each value follows this schema:
+        {RESPONSE_SCHEMA}
+        """
+
+        content = [{"type": "text", "text": prompt}]
+        for direction, frame in frames_by_direction.items():
+            content.append({"type": "text", "text": f"{direction.name} direction:"})
+            content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/jpeg;base64,{self.encode_frame(frame, direction)}"
+                }
+            })
+
+        reply = self._chat_completion(content, max_tokens=300 * len(frames_by_direction),
+                                      json_mode=self.structured)
+        results = self.split_batch_response(reply, frames_by_direction)
+        for direction, response in results.items():
+            if response is None:
+                results[direction] = self._fallback(direction)
+            else:
+                self.last_good[direction] = response
+        return results
+
+    @staticmethod
+    def split_batch_response(reply, directions):
+        """Split a batched reply (JSON keyed by direction, or '### <DIRECTION>' sections) per Direction"""
+        results = {direction: None for direction in directions}
+        if not reply:
+            return results
+
+        by_name = {direction.name: direction for direction in directions}
+        try:
+            data = json.loads(reply)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            for name, section in data.items():
+                direction = by_name.get(str(name).upper())
+                if direction is not None and isinstance(section, dict):
+                    results[direction] = json.dumps(section)
+            return results
+
+        headers = [m for m in SECTION_HEADER.finditer(reply) if m.group(1).upper() in by_name]
+        for i, match in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(reply)
+            section = reply[match.end():end].strip()
+            direction = by_name[match.group(1).upper()]
+            if section and results[direction] is None:
+                results[direction] = section
+
+        missing = [direction.name for direction, text in results.items() if text is None]
+        if missing:
+            logger.warning(f"Batched vision reply had no section for: {', '.join(missing)}")
+        return results
+
+    def _chat_completion(self, content, max_tokens, json_mode=False):
+        """
+        Post a single user message to the chat-completion API and return the reply text.
+        Transient failures are retried with jittered backoff; None is returned on failure
+        or while the circuit breaker is open.
+        """
+        if not self.breaker.allow():
+            API_CALLS.labels("circuit_open").inc()
+            logger.debug("Vision model circuit open, skipping request")
+            return None
+
         payload = {
             "model": self.model,
             "messages": [
                 {
                     "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
+                    "content": content
                 }
             ],
-            "max_tokens": 300
+            "max_tokens": max_tokens
         }
-        
-        try:
-            response = requests.post(self.api_url, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-        except Exception as e:
-            logger.error(f"Error querying vision model: {e}")
-            return None
\ No newline at end of file
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.concurrency, stage_timer("vision_request"):
+                    response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+                if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                    raise requests.exceptions.HTTPError(f"{response.status_code} from vision model")
+                response.raise_for_status()
+                result = response.json()
+                content = result["choices"][0]["message"]["content"]
+                self.breaker.record_success()
+                API_CALLS.labels("success").inc()
+                return content
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.HTTPError) as e:
+                retryable = not isinstance(e, requests.exceptions.HTTPError) or (
+                    e.response is None or e.response.status_code in RETRYABLE_STATUS)
+                if retryable and attempt < self.max_retries:
+                    API_CALLS.labels("retry").inc()
+                    delay = backoff_delay(attempt)
+                    logger.warning(f"Vision model request failed ({e}), retrying in {delay:.2f}s")
+                    time.sleep(delay)
+                    continue
+                logger.error(f"Error querying vision model: {e}")
+            except Exception as e:
+                logger.error(f"Error querying vision model: {e}")
+            break
+
+        API_CALLS.labels("failure").inc()
+        self.breaker.record_failure()
+        return None
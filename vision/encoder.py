@@ -0,0 +1,88 @@
+import base64
+import logging
+import threading
+from collections import deque
+import cv2
+from logic.metrics import REGISTRY, stage_timer
+
+logger = logging.getLogger(__name__)
+
+ENCODES = REGISTRY.counter("traffic_encoder_frames_total",
+                           "Frames requested from the encoder, by whether the previous encode was reused",
+                           ("result",))
+ENCODE_REUSED = ENCODES.labels("reused")
+ENCODE_ENCODED = ENCODES.labels("encoded")
+
+
+class FrameEncoder:
+    """
+    Prepares camera frames for upload and streaming: per-direction ROI cropping,
+    downscaling, optional greyscale and JPEG quality control. Recent encodes are
+    cached by source frame and crop, whoever asked for them, so the livestream
+    and the vision upload share a single encode of the same frame when no ROI
+    applies.
+    """
+    def __init__(self, max_width=960, max_height=None, jpeg_quality=80, grayscale=False, rois=None,
+                 cache_size=8):
+        self.max_width = max_width  # Frames wider than this are downscaled (None to keep)
+        self.max_height = max_height  # Frames taller than this are downscaled (None to keep)
+        self.jpeg_quality = jpeg_quality  # 0-100, OpenCV defaults to 95
+        self.grayscale = grayscale
+        self.rois = rois or {}  # Direction -> (x, y, width, height) crop
+        self.recent = deque(maxlen=cache_size)  # (frame, roi, jpeg bytes), newest last
+        self.lock = threading.Lock()
+
+    def prepare(self, frame, direction=None):
+        """Crop to the direction's ROI (if any), downscale and optionally greyscale a frame"""
+        return self._prepare(frame, self.rois.get(direction))
+
+    def _prepare(self, frame, roi):
+        if roi is not None:
+            x, y, w, h = roi
+            frame = frame[y:y + h, x:x + w]
+
+        height, width = frame.shape[:2]
+        scale = 1.0
+        if self.max_width and width > self.max_width:
+            scale = self.max_width / width
+        if self.max_height and height * scale > self.max_height:
+            scale = self.max_height / height
+        if scale < 1.0:
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+        if self.grayscale and frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
+
+    def encode(self, frame, direction=None):
+        """
+        Return JPEG bytes for a frame, cropped to the direction's ROI when one
+        is set (the livestream passes no direction and gets the full view).
+        A recent encode of the same frame object and crop is reused.
+        """
+        roi = self.rois.get(direction)
+        with self.lock:
+            for cached_frame, cached_roi, data in reversed(self.recent):
+                if cached_frame is frame and cached_roi == roi:
+                    ENCODE_REUSED.inc()
+                    return data
+
+        ENCODE_ENCODED.inc()
+        with stage_timer("encode"):
+            success, buffer = cv2.imencode(
+                ".jpg", self._prepare(frame, roi), [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)])
+        if not success:
+            logger.error("Failed to JPEG-encode frame")
+            return None
+        data = buffer.tobytes()
+
+        with self.lock:
+            # Holding a reference to the frame keeps its identity unique while cached
+            self.recent.append((frame, roi, data))
+        return data
+
+    def encode_base64(self, frame, direction=None):
+        """Return the JPEG encoding of a frame as a base64 string"""
+        data = self.encode(frame, direction)
+        return base64.b64encode(data).decode('utf-8') if data is not None else None